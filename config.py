@@ -6,3 +6,41 @@ QUERY_SEM = asyncio.Semaphore(3)
 INITIAL_PATH = os.path.join(DOWNLOAD_PATH, 'Initials')
 os.makedirs(DOWNLOAD_PATH, exist_ok=True)
 os.makedirs(INITIAL_PATH, exist_ok=True)
+
+# Bandwidth caps in bytes per second (None = unlimited)
+BANDWIDTH_LIMIT = None
+HOST_BANDWIDTH_LIMITS = {}  # e.g. {"cdn.example.com": 5 * 1024 * 1024}
+JOB_BANDWIDTH_LIMIT = None
+
+# Disk writer threads and how often to fdatasync (bytes per file, None = let the OS decide)
+WRITER_THREADS = 1
+WRITER_SYNC_BYTES = None
+
+# Segment cache shared by every video and run (None disables it) and its size budget in bytes
+SEGMENT_CACHE_PATH = os.path.join(DOWNLOAD_PATH, 'SegmentCache')
+SEGMENT_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+# Cache of pages and playlists (None disables it), its size budget in bytes, and seconds each
+# content type is reused without asking the server (0 = revalidate with ETag / Last-Modified every time)
+HTTP_CACHE_PATH = os.path.join(DOWNLOAD_PATH, 'HTTPCache')
+HTTP_CACHE_BYTES = 256 * 1024 * 1024
+HTTP_CACHE_TTLS = {
+    "text/html": 0,
+    "text/plain": 0,
+    "application/json": 0,
+    "application/vnd.apple.mpegurl": 600,
+    "application/x-mpegurl": 600,
+    "audio/mpegurl": 600,
+}
+# Fetch everything afresh (still refreshing the cache) instead of reusing it
+HTTP_CACHE_BYPASS = False
+
+# Concurrent re-encode/thumbnail jobs (None = one per 4 cores); each gets its share of the cores as ffmpeg threads
+POSTPROCESS_WORKERS = None
+
+# HTML parser for the extractors: "selectolax", "lxml" or "html.parser" (None = fastest installed)
+HTML_PARSER = None
+
+# Where pages are parsed: "thread", "process" (parallel, on PARSE_POOL_WORKERS cores) or "inline" (on the event loop)
+PARSE_POOL_MODE = "thread"
+PARSE_POOL_WORKERS = None
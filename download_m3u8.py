@@ -2,8 +2,8 @@ import aiohttp, asyncio, os, aiofiles, time, shutil, logging, re, random
 from rich import print
 from uuid import uuid4
 from tqdm import tqdm
-from datetime import datetime
-from urllib.parse import urljoin
+from tools.hls import load_playlist
+from tools.logs import log_event, setup_queue_loggers
 
 try:
     from .consts import LOG_FORMAT, LOG_PATH, DATE_FORMAT
@@ -18,50 +18,20 @@ except:
     DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 
-# Set up loggers for different tasks
+# Set up loggers for different tasks; records go through a queue to a
+# background thread and each file is only opened once something is logged
 def setup_task_loggers():
-    os.makedirs(LOG_PATH, exist_ok=True)
-
-    now = datetime.now()
-    date_suffix = f"{now.month:02d}-{now.day:02d}-{now.year:02d}-{now.hour:02d}"
-
-    # Main logger (keep your existing one)
-    main_logger = logging.getLogger(__name__)
-    main_handler = logging.FileHandler(
-        os.path.join(LOG_PATH, "main" + f"-{date_suffix}.log")
-    )
-    main_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
-    main_logger.addHandler(main_handler)
-    main_logger.setLevel(logging.DEBUG)
-
-    # Logger for gathering segments
-    gather_logger = logging.getLogger("gathering_segments")
-    gather_handler = logging.FileHandler(
-        os.path.join(LOG_PATH, f"gathering-segments-{date_suffix}.log")
-    )
-    gather_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
-    gather_logger.addHandler(gather_handler)
-    gather_logger.setLevel(logging.DEBUG)
-
-    # Logger for downloading segments
-    download_logger = logging.getLogger("downloading_segments")
-    download_handler = logging.FileHandler(
-        os.path.join(LOG_PATH, f"downloading-segments-{date_suffix}.log")
+    return setup_queue_loggers(
+        LOG_PATH,
+        {
+            __name__: "main",
+            "gathering_segments": "gathering-segments",
+            "downloading_segments": "downloading-segments",
+            "concatenating_segments": "concatenating-segments",
+        },
+        LOG_FORMAT,
+        DATE_FORMAT,
     )
-    download_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
-    download_logger.addHandler(download_handler)
-    download_logger.setLevel(logging.DEBUG)
-
-    # Logger for concatenating segments
-    concat_logger = logging.getLogger("concatenating_segments")
-    concat_handler = logging.FileHandler(
-        os.path.join(LOG_PATH, f"concatenating-segments-{date_suffix}.log")
-    )
-    concat_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
-    concat_logger.addHandler(concat_handler)
-    concat_logger.setLevel(logging.DEBUG)
-
-    return main_logger, gather_logger, download_logger, concat_logger
 
 
 # Initialize loggers at module level
@@ -78,10 +48,21 @@ async def download_segment(
     name=None,
     retry_limit: int = 5,
     fixed_backoff: int | float = 2.0,
+    byterange: tuple[int, int] | None = None,
 ):
     async with sem:
         try:
-            DownloadLog.debug(f"GET: { segment_url = }; { download_dir = }")
+            log_event(
+                DownloadLog,
+                logging.DEBUG,
+                "GET",
+                segment_url=segment_url,
+                download_dir=download_dir,
+            )
+            headers = {}
+            if byterange:
+                length, offset = byterange
+                headers["Range"] = f"bytes={offset}-{offset + length - 1}"
             if not name:
                 segment_name = (
                     segment_url.split("/")[-1].split("?")[0]
@@ -94,11 +75,19 @@ async def download_segment(
             is_succesfull = False
             for i in range(1, retry_limit + 1):
                 try:
-                    async with session.get(segment_url) as r:
+                    async with session.get(segment_url, headers=headers) as r:
                         r.raise_for_status()
-                        DownloadLog.info(f"GET: { segment_url = } [{ r.status = }]")
+                        log_event(
+                            DownloadLog, logging.INFO, "GET", segment_url=segment_url, status=r.status
+                        )
 
-                        DownloadLog.debug(f"{ download_path = }; { segment_name = }")
+                        log_event(
+                            DownloadLog,
+                            logging.DEBUG,
+                            "Writing",
+                            download_path=download_path,
+                            segment_name=segment_name,
+                        )
                         with tqdm(
                             dynamic_ncols=True,
                             total=int(r.headers.get("content-length", 0)),
@@ -113,8 +102,13 @@ async def download_segment(
                                     await file.write(chunk)
                                     segment_pbar.update(len(chunk))
 
-                        DownloadLog.info(
-                            f"File Saved at { download_path = } under { segment_name = } [ {os.path.getsize(download_path) if os.path.exists(download_path) else 0} ]"
+                        log_event(
+                            DownloadLog,
+                            logging.INFO,
+                            "File Saved",
+                            download_path=download_path,
+                            segment_name=segment_name,
+                            size=segment_pbar.n,
                         )
                         await asyncio.sleep(0.1)
                         pbar.update(1)
@@ -124,8 +118,15 @@ async def download_segment(
                 except Exception as e:
                     retry_after = fixed_backoff * i + random.random()
                     status = getattr(r, "status", "N/A")
-                    DownloadLog.error(
-                        f"[Failed] GET: { segment_url = } [{status}] [exception = {e}] [{ retry_after = }; { retry_limit - i =  }]"
+                    log_event(
+                        DownloadLog,
+                        logging.ERROR,
+                        "[Failed] GET",
+                        segment_url=segment_url,
+                        status=status,
+                        exception=e,
+                        retry_after=retry_after,
+                        retries_left=retry_limit - i,
                     )
                     await asyncio.sleep(retry_after)
 
@@ -301,19 +302,17 @@ async def download_video_with_ffmpeg(
                     break
 
                 if duration_match := duration_pattern.search(line):
-                    DownloadLog.debug(
-                        f"[{line = }] Line matched { duration_pattern = }"
-                    )
+                    log_event(DownloadLog, logging.DEBUG, "Duration line", line=line)
                     h, m, s, ms = map(int, duration_match.groups())
                     total = h * 3600 + m * 60 + s + ms / 100
-                    DownloadLog.info(f"Total duration found: {total =}")
+                    log_event(DownloadLog, logging.INFO, "Total duration found", total=total)
                     pbar.total = total
 
                 if line_match := pattern.match(line):
-                    DownloadLog.debug(f"[{line =}] Line matched { pattern = }")
+                    log_event(DownloadLog, logging.DEBUG, "Progress line", line=line)
                     h, m, s, ms = map(int, line_match.groups())
                     elapsed = h * 3600 + m * 60 + s + ms / 100
-                    DownloadLog.info(f"Elapsed: { elapsed = }")
+                    log_event(DownloadLog, logging.INFO, "Elapsed", elapsed=elapsed)
                     pbar.n = min(elapsed, pbar.total or elapsed)
                     pbar.refresh()
 
@@ -385,44 +384,16 @@ async def download_video(
                     f"GET: {video_url} [{ m3u8_r.status = }; { m3u8_r.headers['content-type'] = }]"
                 )
                 m3u8_r.raise_for_status()
-                raw = await m3u8_r.text()
-
-                data = ""
-                for line in raw.splitlines():
-                    if line.startswith("#"):
-                        data += ("\n" if line[0] != "\n" else "") + line
-
-                # Remove trailing slash if present
-                base_url = video_url.rsplit("/", 1)[0] + "/"  # Ensures trailing slash
-                m3u8_urls = []
-
-                for i, line in enumerate(raw.splitlines(), start=1):
-                    line = line.strip()
-
-                    if not line or line.startswith("#"):
-                        GatherLog.debug(f"Skipping line {i}: Empty or comment [{line}]")
-
-                        # Handle init segment (EXT-X-MAP)
-                        if line.startswith("#EXT-X-MAP:"):
-                            match = re.search(r'URI="(.+?)"', line)
-                            if match:
-                                init_path = match.group(1)
-                                full_url = urljoin(base_url, init_path)
-                                segment_name = "init_seg.ts"
-                                GatherLog.debug(
-                                    f"Adding init segment {segment_name} from {full_url}"
-                                )
-                                m3u8_urls.append((segment_name, full_url))
-                        continue
-
-                    # This is a media segment (e.g., .ts)
-                    segment_url = urljoin(base_url, line)
-                    segment_name = "segment_{i}.ts"
-
-                    GatherLog.debug(
-                        f"Adding segment {i}: {segment_name} from {segment_url}"
-                    )
-                    m3u8_urls.append((segment_name, segment_url))
+                playlist = load_playlist(
+                    await m3u8_r.text(),
+                    video_url,
+                    m3u8_r.headers.get("ETag"),
+                    m3u8_r.headers.get("Last-Modified"),
+                )
+                m3u8_urls = [
+                    (segment.name, segment.uri, segment.byterange)
+                    for segment in playlist.segments
+                ]
 
                 GatherLog.info(
                     f"{len(m3u8_urls)} segments url found for video: {video_title}"
@@ -439,11 +410,17 @@ async def download_video(
             ) as pbar:
                 tasks = []
                 filenames = []
-                for name, link in m3u8_urls:
+                for name, link, byterange in m3u8_urls:
                     tasks.append(
                         asyncio.create_task(
                             download_segment(
-                                download_sem, session, link, temp_dir, pbar, name=name
+                                download_sem,
+                                session,
+                                link,
+                                temp_dir,
+                                pbar,
+                                name=name,
+                                byterange=byterange,
                             )
                         )
                     )
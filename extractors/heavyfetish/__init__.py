@@ -1,6 +1,8 @@
 import aiohttp, re
 from fake_useragent import UserAgent
 from contextlib import asynccontextmanager
+from tools.retry import RetryingSession
+from tools.httpcache import CachingSession
 
 DOMAIN = "https://okxxx1.com"
 link_pattern = re.compile(
@@ -10,7 +12,11 @@ link_pattern = re.compile(
 
 @asynccontextmanager
 async def make_session():
-    session = aiohttp.ClientSession(headers={"User-Agent": UserAgent().random})
+    session = CachingSession(
+        RetryingSession(
+            aiohttp.ClientSession(headers={"User-Agent": UserAgent().random})
+        )
+    )
     try:
         yield session
     finally:
@@ -1,11 +1,27 @@
-from bs4 import BeautifulSoup
-import aiohttp, re, json
+from ..parsing import run_parser
+from ..jsdata import assigned_json
+import aiohttp
 from ..models import Video
 from rich import print
 from http.cookies import SimpleCookie
 
 
-async def extract_video_info(sem, session: aiohttp.ClientSession, url: str, **kwargs):
+def parse_video_page(text: str) -> dict:
+    """The parse half of `extract_video_info`, run on the parse pool."""
+    return assigned_json(text, "flashvars")
+
+
+async def extract_video_info(
+    sem,
+    session: aiohttp.ClientSession,
+    url: str,
+    fields: set[str] | None = None,
+    **kwargs,
+):
+    """
+    Prints the page's raw flashvars. `fields` is not supported yet: it is
+    accepted like the other extractors' but everything is always parsed.
+    """
     async with sem:
         async with session.get(url, **kwargs) as webpage:
             set_cookie_header = webpage.headers.getall("Set-Cookie", [])
@@ -20,12 +36,5 @@ async def extract_video_info(sem, session: aiohttp.ClientSession, url: str, **kw
                 session.cookie_jar.update_cookies(webpage.cookies)
             webpage.raise_for_status()
 
-            text = await webpage.text()
-            soup = BeautifulSoup(text, "html.parser")
-            flashvars = re.search(r"flashvars\s*=\s*({[^;]*});", text)
-
-            if not flashvars:
-                raise ValueError("Unable to find flashvars")
-
-            data = json.loads(flashvars.group(1))
+            data = await run_parser(parse_video_page, await webpage.text())
             print(data)
@@ -0,0 +1,134 @@
+import json
+from typing import Any
+
+DECODER = json.JSONDecoder()
+WHITESPACE = " \t\r\n"
+
+
+def assigned_json(page: str, marker: str, start: int = 0, window: int = 64) -> Any:
+    """
+    The JSON value an inline script assigns after `marker`, like
+    `var flashvars_123 = {...};` or `window.initials = {...};`.
+
+    Finds the marker with `str.find` and decodes exactly one value from the
+    `=` on with `raw_decode`: one pass over the page, no backtracking, and
+    braces inside strings cannot end the value early. A numeric id (the
+    `123` above) may sit between the marker and the `=`, up to `window`
+    characters. Raises `ValueError` if no occurrence decodes.
+    """
+    pos = page.find(marker, start)
+    while pos != -1:
+        after = pos + len(marker)
+        equals = page.find("=", after, after + window)
+        suffix = page[after:equals].rstrip() if equals != -1 else ""
+        if (
+            equals != -1
+            and page[equals + 1 : equals + 2] != "="
+            and (not suffix or suffix.isdigit())
+        ):
+            value_at = equals + 1
+            while value_at < len(page) and page[value_at] in WHITESPACE:
+                value_at += 1
+            try:
+                return DECODER.raw_decode(page, value_at)[0]
+            except json.JSONDecodeError:
+                pass
+        pos = page.find(marker, after)
+    raise ValueError(f"No JSON value assigned to {marker!r}")
+
+
+if __name__ == "__main__":
+    # Benchmark: the old regexes against `assigned_json`, and pornhub's full
+    # parse against a media-only projection (no HTML tree)
+    # python -m extractors.jsdata [page.html ...] [-n repeats]
+    import re
+    import sys
+    import time
+
+    from .pornhub.video import parse_video_page
+
+    args = sys.argv[1:]
+    repeats = 20
+    if "-n" in args:
+        index = args.index("-n")
+        repeats = int(args[index + 1])
+        del args[index : index + 2]
+
+    if args:
+        pages = {}
+        for path in args:
+            with open(path, "rb") as file:
+                pages[path] = file.read().decode("utf-8", "replace")
+    else:
+        # No pages given: a video page shaped like the ones we crawl, a few MB
+        # of markup and scripts around one big flashvars / initials object
+        flash_vars = {
+            "video_title": "Video {} with braces",
+            "video_duration": 754,
+            "image_url": "https://example.com/poster.jpg",
+            "mediaDefinitions": [
+                {"videoUrl": f"https://cdn.example.com/{q}/master.m3u8", "quality": str(q), "format": "hls"}
+                for q in (1080, 720, 480, 240)
+            ],
+            "thumbs": [{"url": f"https://example.com/{i}.jpg", "text": "}; var x = {"} for i in range(2000)],
+        }
+        # The old lazy regex stops at the first "};", so keep those out of this one
+        initials = {
+            "videoModel": {key: value for key, value in flash_vars.items() if key != "thumbs"},
+            "relatedVideos": [{"url": f"https://example.com/{i}.jpg"} for i in range(2000)],
+        }
+        filler = "".join(
+            f'<div class="row"><a href="/v/{i}">Video {i}</a><script>var s{i} = {{"i": {i}}};</script></div>\n'
+            for i in range(20000)
+        )
+        page = (
+            "<html><head><title>Video</title>"
+            '<meta property="og:image" content="https://example.com/og.jpg"></head><body>'
+            + filler
+            + f"<script>var flashvars_1234 = {json.dumps(flash_vars)};\n"
+            + f"window.initials = {json.dumps(initials)};</script>"
+            + filler
+            + "</body></html>"
+        )
+        pages = {"synthetic video page": page}
+
+    cases = {
+        "flashvars": (
+            lambda page: json.loads(
+                re.search(r"""var (flashvars_\d*) = (?P<dict>{.*});\n""", page).group("dict")
+            ),
+            lambda page: assigned_json(page, "var flashvars_"),
+        ),
+        "initials": (
+            lambda page: json.loads(
+                re.compile(r"window\.initials\s*=\s*(\{.*?\});", re.DOTALL).search(page).group(1)
+            ),
+            lambda page: assigned_json(page, "window.initials"),
+        ),
+        "pornhub media": (
+            lambda page: parse_video_page(page, "https://www.pornhub.org/view_video.php?viewkey=1").media,
+            lambda page: parse_video_page(
+                page, "https://www.pornhub.org/view_video.php?viewkey=1", fields={"media"}
+            ).media,
+        ),
+    }
+
+    def timed(func, page) -> float:
+        func(page)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            func(page)
+        return (time.perf_counter() - start) / repeats
+
+    for name, page in pages.items():
+        print(f"{name} ({len(page) / 1024:.0f} KiB, {repeats} runs)")
+        for case, (old, new) in cases.items():
+            try:
+                before, after = timed(old, page), timed(new, page)
+            except Exception as e:
+                print(f"{case:>14}: skipped ({e})")
+                continue
+            print(
+                f"{case:>14}: {before * 1000:8.2f} ms -> {after * 1000:7.2f} ms | "
+                f"{before / after:5.1f}x"
+            )
@@ -6,6 +6,8 @@ FILES = {
 import aiohttp, re
 from fake_useragent import UserAgent
 from contextlib import asynccontextmanager
+from tools.retry import RetryingSession
+from tools.httpcache import CachingSession
 
 DOMAIN = "PLACEHOLDER"
 link_pattern = re.compile(
@@ -17,7 +19,11 @@ if DOMAIN == "PLACEHOLDER":
 
 @asynccontextmanager
 async def make_session():
-    session = aiohttp.ClientSession(headers={"User-Agent": UserAgent().random})
+    session = CachingSession(
+        RetryingSession(
+            aiohttp.ClientSession(headers={"User-Agent": UserAgent().random})
+        )
+    )
     try:
         yield session
     finally:
@@ -37,7 +43,7 @@ def is_page_link(link: str) -> bool:
 
     """,
     "video.py": """
-from bs4 import BeautifulSoup, NavigableString
+from ..parsing import parse_html, run_parser
 import re, aiohttp
 from http.cookies import SimpleCookie
 from ..converters import convert_duration
@@ -51,12 +57,33 @@ from ..models import (
     Thumbnail,
     VideoLinks,
     Recommendations,
+    wants,
 )
 from . import DOMAIN
 
 
+def parse_video_page(
+    page: str,
+    video_url: str,
+    with_recommendations: bool = True,
+    fields: set[str] | None = None,
+) -> Video:
+    # Runs on the parse pool: no awaits here, just return the models
+    soup = parse_html(page)
+
+    # Add the extraction logic here, skipping what `fields` does not ask for
+    recommendations = []
+    if with_recommendations and wants(fields, "recommendations"):
+        pass  # e.g. recommendations.append(Recommendations(...))
+
+    video = Video(..., recommendations=recommendations)
+
+    # return the Video object
+    return video
+
+
 async def extract_video_info(
-    sem, session: aiohttp.ClientSession, video_url: str, with_recommendations: bool = True, **request_kwargs
+    sem, session: aiohttp.ClientSession, video_url: str, with_recommendations: bool = True, fields: set[str] | None = None, **request_kwargs
 ) -> Video | None:
     async with sem:
         async with session.get(video_url, **request_kwargs) as response:
@@ -74,29 +101,38 @@ async def extract_video_info(
 
                 if response.cookies:
                     session.cookie_jar.update_cookies(response.cookies)
-                
-                # Add the extraction logic here
-                video = Video(...)
 
-                # return the Video object
-                return video
+                return await run_parser(
+                    parse_video_page, await response.text(), video_url, with_recommendations, fields
+                )
             except Exception as e:
                 print(f"Unable to extract info from '{video_url}': {e}")
                 return None
 
     """,
     "page.py": """
-from bs4 import BeautifulSoup, Tag
+from ..parsing import HTMLNode, parse_html, run_parser
 from http.cookies import SimpleCookie
 from . import DOMAIN
 from ..converters import convert_views, convert_duration
 from ..models import ThumbVideo, Metadata, ExternalLink, Thumbnail
 import aiohttp
 
-async def extract_thumb_info(thumb_list: list[Tag]) -> list[dict]:
+def extract_thumb_info(thumb: HTMLNode) -> dict:
     # Implement the logic for extracting info from a thumbnail 
     raise NotImplementedError()
 
+def parse_videos_page(webpage: str) -> list[ThumbVideo | None]:
+    # Runs on the parse pool: no awaits here, just return the models
+    thumbnail_selector = "" # Add CSS thumbnail selector
+
+    soup = parse_html(webpage)
+    thumbnails = [extract_thumb_info(thumb) for thumb in soup.select(thumbnail_selector)]
+    return [
+       ThumbVideo(...)  # Fill this thing
+       for thumb in thumbnails
+    ]
+
 async def extract_videos_from_page(
     sem, session: aiohttp.ClientSession, page_url: str, **request_kwargs
 ) -> list[ThumbVideo | None]:
@@ -116,15 +152,7 @@ async def extract_videos_from_page(
                 if response.cookies:
                     session.cookie_jar.update_cookies(response.cookies)
 
-                webpage = await response.text()
-                thumbnail_selector = "" # Add CSS thumbnail selector
-                
-                soup = BeautifulSoup(webpage, 'html.parser')
-                thumbnails = await asyncio.gather(*[asyncio.create_task(extract_thumb_info(thumb)) for thumb in soup.select(thumbnail_selector)])
-                return [
-                   ThumbVideo(...)  # Fill this thing
-                   for thumb in thumbnails
-                ]
+                return await run_parser(parse_videos_page, await response.text())
             except Exception as e:
                 print('Unable to extract videos from page "{}":'.format(page_url), e)
             return []
@@ -106,3 +106,14 @@ class Video(BaseModel):
     extras: dict = Field(
         default_factory=dict, description="Extra info relevent to the video"
     )
+
+
+# What `fields=` can ask an extractor for; None (the default) means everything
+VIDEO_FIELDS = frozenset(Video.model_fields)
+# All a download needs: the name, the streams and the cover
+DOWNLOAD_FIELDS = frozenset({"title", "media", "thumbnail"})
+
+
+def wants(fields: set[str] | frozenset[str] | None, name: str) -> bool:
+    """Whether a `fields` projection includes `name`; a skipped field keeps its default."""
+    return fields is None or name in fields
@@ -1,12 +1,12 @@
-from bs4 import BeautifulSoup
+from ..parsing import HTMLNode, parse_html, run_parser
 from http.cookies import SimpleCookie
 from . import DOMAIN
 from ..converters import convert_views, convert_duration
 from ..models import ThumbVideo, Metadata, ExternalLink, Thumbnail
 
 
-async def extract_all_thumb_bl_info(
-    page_soup: BeautifulSoup,
+def extract_all_thumb_bl_info(
+    page_soup: HTMLNode,
 ) -> list[ThumbVideo | None]:
     results = []
     for thumb_video in page_soup.select('div[class*="item thumb-bl thumb-bl-video"]'):
@@ -72,6 +72,11 @@ async def extract_all_thumb_bl_info(
     return results
 
 
+def parse_videos_page(page: str) -> list[ThumbVideo | None]:
+    """The parse half of `extract_videos_from_webpage`, run on the parse pool."""
+    return extract_all_thumb_bl_info(parse_html(page))
+
+
 async def extract_videos_from_webpage(
     sem, session, page_url: str
 ) -> list[ThumbVideo | None]:
@@ -90,8 +95,7 @@ async def extract_videos_from_webpage(
 
             try:
                 r.raise_for_status()
-                soup = BeautifulSoup(await r.text(), "html.parser")
-                return await extract_all_thumb_bl_info(soup)
+                return await run_parser(parse_videos_page, await r.text())
             except Exception as e:
                 print(f"Unable to extract videos: {e}")
                 return []
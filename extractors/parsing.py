@@ -0,0 +1,321 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Protocol, TypeVar
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml  # noqa: F401 (only needed as BeautifulSoup's tree builder)
+except ImportError:
+    lxml = None
+
+T = TypeVar("T")
+
+# Fastest first; "html.parser" is pure Python and always there
+BACKENDS = ("selectolax", "lxml", "html.parser")
+# Attributes BeautifulSoup splits into a list of values
+MULTI_VALUED = frozenset({"class", "rel", "rev", "accept-charset", "headers", "accesskey", "dropzone"})
+
+
+class HTMLNode(Protocol):
+    """What the extractors use of a parsed page, whichever backend built it."""
+
+    attrs: dict[str, Any]
+    text: str
+    parent: "HTMLNode | None"
+    contents: list["HTMLNode | str"]
+
+    def select(self, selector: str) -> list["HTMLNode"]: ...
+    def select_one(self, selector: str) -> "HTMLNode | None": ...
+    def find(self, name: str | None = None, class_: str | None = None) -> "HTMLNode | None": ...
+    def get(self, key: str, default=None): ...
+    def get_text(self, separator: str = "", strip: bool = False) -> str: ...
+    def prettify(self) -> str: ...
+
+
+class TextNode(str):
+    """A text child in `contents`, a `str` like BeautifulSoup's NavigableString."""
+
+    @property
+    def text(self) -> str:
+        return str(self)
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        return self.strip() if strip else str(self)
+
+
+class LexborNode:
+    """
+    A selectolax (lexbor) node behind the subset of BeautifulSoup's Tag API
+    the extractors use. Selectors run in lexbor's C engine, not soupsieve.
+    """
+
+    __slots__ = ("node", "_attrs")
+
+    def __init__(self, node):
+        self.node = node
+        self._attrs = None
+
+    @property
+    def name(self) -> str:
+        return self.node.tag
+
+    @property
+    def attrs(self) -> dict[str, Any]:
+        if self._attrs is None:
+            self._attrs = {
+                key: (value or "").split() if key in MULTI_VALUED else (value or "")
+                for key, value in self.node.attributes.items()
+            }
+        return self._attrs
+
+    def get(self, key: str, default=None):
+        return self.attrs.get(key, default)
+
+    def __getitem__(self, key: str):
+        return self.attrs[key]
+
+    def select(self, selector: str) -> list["LexborNode"]:
+        # lexbor matches the node itself too; BeautifulSoup only its descendants
+        own = self.node.mem_id
+        return [LexborNode(node) for node in self.node.css(selector) if node.mem_id != own]
+
+    def select_one(self, selector: str) -> "LexborNode | None":
+        node = self.node.css_first(selector)
+        if node is not None and node.mem_id == self.node.mem_id:
+            return next(iter(self.select(selector)), None)
+        return LexborNode(node) if node is not None else None
+
+    def find(self, name: str | None = None, class_: str | None = None) -> "LexborNode | None":
+        return self.select_one(_find_selector(name, class_))
+
+    def find_all(self, name: str | None = None, class_: str | None = None) -> list["LexborNode"]:
+        return self.select(_find_selector(name, class_))
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        return self.node.text(deep=True, separator=separator, strip=strip)
+
+    @property
+    def text(self) -> str:
+        return self.node.text(deep=True)
+
+    @property
+    def parent(self) -> "LexborNode | None":
+        parent = self.node.parent
+        return LexborNode(parent) if parent is not None else None
+
+    @property
+    def contents(self) -> list["LexborNode | TextNode"]:
+        return list(self.children)
+
+    @property
+    def children(self) -> Iterator["LexborNode | TextNode"]:
+        for child in self.node.iter(include_text=True):
+            if child.tag == "-text":
+                yield TextNode(child.text(deep=False))
+            elif child.tag != "-comment":
+                yield LexborNode(child)
+
+    def prettify(self) -> str:
+        return self.node.html or ""
+
+    def __str__(self) -> str:
+        return self.node.html or ""
+
+    def __repr__(self) -> str:
+        return f"<LexborNode {self.node.tag}>"
+
+
+def _find_selector(name: str | None, class_: str | None) -> str:
+    """`find(name, class_=...)` as a selector: one class matches any of the
+    element's classes, several must match the attribute exactly."""
+    selector = name or "*"
+    if class_ and " " in class_.strip():
+        return f'{selector}[class="{class_}"]'
+    return f"{selector}.{class_.strip()}" if class_ else selector
+
+
+def available_backends() -> list[str]:
+    return [
+        backend
+        for backend in BACKENDS
+        if (backend != "selectolax" or LexborHTMLParser is not None)
+        and (backend != "lxml" or lxml is not None)
+    ]
+
+
+class HTMLParser:
+    """Builds page trees with the configured (or the fastest installed) backend."""
+
+    def __init__(self, backend: str | None = None):
+        self.configure(backend)
+
+    def configure(self, backend: str | None = None):
+        if backend is not None and backend not in available_backends():
+            raise ValueError(
+                f"HTML parser backend {backend!r} is not available "
+                f"(installed: {', '.join(available_backends())})"
+            )
+        self.backend = backend or available_backends()[0]
+
+    def parse(self, markup: str | bytes, backend: str | None = None) -> HTMLNode:
+        backend = backend or self.backend
+        if backend == "selectolax":
+            return LexborNode(LexborHTMLParser(markup).root)
+        return BeautifulSoup(markup, backend)
+
+
+PARSER = HTMLParser()
+
+
+def parse_html(markup: str | bytes, backend: str | None = None) -> HTMLNode:
+    """The page's root, selectable with CSS like a BeautifulSoup tree."""
+    return PARSER.parse(markup, backend)
+
+
+def configure_parser(backend: str | None = None):
+    """Pick the backend: "selectolax", "lxml" or "html.parser" (None = fastest installed)."""
+    PARSER.configure(backend)
+
+
+class ParsePool:
+    """
+    Runs the parse half of the extractors (tree building, selectors, big
+    `json.loads`) off the event loop, so a heavy page does not stall every
+    download in flight.
+
+    "thread" mode keeps the loop responsive (the GIL is handed over every
+    few milliseconds); "process" mode parses truly in parallel on `workers`
+    cores, at the cost of pickling the page in and the result out, so parse
+    functions there must be module level and return plain models or data.
+    "inline" parses on the loop, as before.
+    """
+
+    MODES = ("thread", "process", "inline")
+
+    def __init__(self, mode: str = "thread", workers: int | None = None):
+        self._executor: Executor | None = None
+        self.configure(mode, workers)
+
+    def configure(self, mode: str = "thread", workers: int | None = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Parse pool mode must be one of {self.MODES}, not {mode!r}")
+        self.close()
+        self.mode = mode
+        self.workers = workers
+
+    def _get_executor(self) -> Executor | None:
+        if self.mode == "inline":
+            return None
+        if self._executor is None:
+            if self.mode == "process":
+                # Spawned, not forked: the parent runs writer and executor threads
+                self._executor = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=configure_parser,
+                    initargs=(PARSER.backend,),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="parse")
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        executor = self._get_executor()
+        if executor is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+PARSE_POOL = ParsePool()
+
+
+async def run_parser(func: Callable[..., T], *args) -> T:
+    """`func(*args)` on the parse pool; the extractors' way to parse a fetched page."""
+    return await PARSE_POOL.run(func, *args)
+
+
+def configure_parse_pool(mode: str = "thread", workers: int | None = None):
+    """Where parsing runs: "thread", "process" or "inline" (None workers = executor default)."""
+    PARSE_POOL.configure(mode, workers)
+
+
+if __name__ == "__main__":
+    # Benchmark: parse and query saved pages with every installed backend
+    # python -m extractors.parsing [page.html ...] [-n repeats]
+    import sys
+    import time
+
+    args = sys.argv[1:]
+    repeats = 20
+    if "-n" in args:
+        index = args.index("-n")
+        repeats = int(args[index + 1])
+        del args[index : index + 2]
+
+    if args:
+        pages = {}
+        for path in args:
+            with open(path, "rb") as file:
+                pages[path] = file.read().decode("utf-8", "replace")
+    else:
+        # No pages given: a listing page shaped like the ones we crawl
+        block = (
+            '<li class="pcVideoListItem videoblock" data-video-vkey="ph{0}">'
+            '<div class="phimage"><img src="https://example.com/{0}.jpg"></div>'
+            '<span class="title"><a href="/view_video.php?viewkey=ph{0}">Video {0}</a></span>'
+            '<div class="usernameWrap"><a href="/model/{0}">Model {0}</a></div>'
+            '<span class="views"><var>{0}K</var></span><var class="duration">12:{0:02d}</var>'
+            '<var class="added">2 days ago</var><div class="value">9{0}%</div></li>'
+        )
+        thumbs = "".join(
+            f'<div class="item thumb-bl thumb-bl-video" id="video_{i}"><a href="/v/{i}" title="T{i}">'
+            f'<img data-original="//example.com/{i}.jpg"></a><ul class="video-meta">'
+            f'<li><i class="fa fa-eye"></i><span>{i}</span></li></ul></div>'
+            for i in range(60)
+        )
+        pages = {
+            "synthetic listing": "<html><head><title>Listing</title></head><body><ul>"
+            + "".join(block.format(i % 60) for i in range(120))
+            + f"</ul>{thumbs}</body></html>"
+        }
+
+    selectors = ("li.videoblock", 'div[class*="item thumb-bl thumb-bl-video"]', 'div[id^="video_"]')
+
+    def run(backend: str, markup: str) -> int:
+        root = parse_html(markup, backend)
+        found = 0
+        for selector in selectors:
+            for node in root.select(selector):
+                found += 1
+                link = node.select_one("a")
+                if link is not None:
+                    link.get_text(strip=True)
+                    link.attrs.get("href")
+        return found
+
+    for name, markup in pages.items():
+        print(f"{name} ({len(markup) / 1024:.0f} KiB, {repeats} runs)")
+        baseline = None
+        for backend in reversed(available_backends()):
+            run(backend, markup)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                found = run(backend, markup)
+            elapsed = (time.perf_counter() - start) / repeats
+            baseline = baseline or elapsed
+            print(
+                f"{backend:>12}: {elapsed * 1000:8.2f} ms/page | "
+                f"{baseline / elapsed:5.1f}x | {found} nodes"
+            )
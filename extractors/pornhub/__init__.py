@@ -1,6 +1,8 @@
 import aiohttp, re, ssl
 from fake_useragent import UserAgent
 from contextlib import asynccontextmanager
+from tools.retry import RetryingSession
+from tools.httpcache import CachingSession
 
 IP_ADDR = "66.254.114.41"
 DOMAIN = "www.pornhub.org"
@@ -13,10 +15,14 @@ async def make_session():
     context = ssl.create_default_context()
     context.check_hostname = False
     context.verify_mode = ssl.CERT_NONE
-    session = aiohttp.ClientSession(
-        base_url=f"https://{IP_ADDR}",
-        headers=headers,
-        connector=aiohttp.TCPConnector(ssl=context),
+    session = CachingSession(
+        RetryingSession(
+            aiohttp.ClientSession(
+                base_url=f"https://{IP_ADDR}",
+                headers=headers,
+                connector=aiohttp.TCPConnector(ssl=context),
+            )
+        )
     )
     try:
         yield session
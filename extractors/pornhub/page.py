@@ -1,4 +1,4 @@
-from bs4 import BeautifulSoup, Tag
+from ..parsing import HTMLNode, parse_html, run_parser
 from . import DOMAIN, get_text_wrapper
 from uuid import uuid4
 from ..converters import convert_views, convert_duration
@@ -7,8 +7,8 @@ from ..models import Thumbnail, ThumbVideo, Metadata, VideoLinks, ExternalLink
 from http.cookies import SimpleCookie
 
 
-async def extract_all_thumb_videos(
-    webpage: BeautifulSoup | Tag,
+def extract_all_thumb_videos(
+    webpage: HTMLNode,
 ) -> list[ThumbVideo | None]:
     results = []
     for li in webpage.select("li.videoblock"):
@@ -83,6 +83,11 @@ async def extract_all_thumb_videos(
     return results
 
 
+def parse_videos_page(page: str) -> list[ThumbVideo | None]:
+    """The parse half of `extract_videos_from_webpage`, run on the parse pool."""
+    return extract_all_thumb_videos(parse_html(page))
+
+
 async def extract_videos_from_webpage(
     sem, session: aiohttp.ClientSession, page_link: str, **kwargs
 ):
@@ -102,8 +107,7 @@ async def extract_videos_from_webpage(
                 r.raise_for_status()
                 page = await r.text()
 
-                soup = BeautifulSoup(page, "html.parser")
-                return await extract_all_thumb_videos(soup)
+                return await run_parser(parse_videos_page, page)
             except Exception as e:
                 print(f'Unable to get videos from page "{page_link}": {e}')
                 return []
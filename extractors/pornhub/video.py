@@ -1,6 +1,7 @@
-from bs4 import BeautifulSoup
+from ..parsing import parse_html, run_parser
+from functools import cache
+from ..jsdata import assigned_json
 import aiohttp
-import json
 import re
 from ..converters import convert_views
 from datetime import datetime
@@ -15,6 +16,7 @@ from ..models import (
     Metadata,
     Video,
     Thumbnail,
+    wants,
 )
 from http.cookies import SimpleCookie
 
@@ -31,13 +33,194 @@ def get_resolutions(flash_var: dict) -> dict:
     return dict(sorted(res.items(), key=lambda x: x[0], reverse=True))
 
 
-async def extract_video(
+def media_from_flash_vars(flash_var: dict) -> Media:
+    media = Media(base_url="No BaseUrl For this!", items=[])
+    for defination in flash_var.get("mediaDefinitions", [])[:-1]:
+        if defination.get("remote"):
+            continue
+        media.items.append(
+            MediaItem(
+                idx=len(media.items) + 1,
+                url=defination.get("videoUrl", None),
+                resolution=defination.get("quality") + "p",
+            )
+        )
+    return media
+
+
+def parse_video_page(
+    page: str,
+    video_link: str,
+    recommendations: bool = True,
+    include_var: bool = False,
+    fields: set[str] | None = None,
+) -> Video:
+    """
+    The parse half of `extract_video`, run on the parse pool. Only the
+    `fields` asked for are extracted (None: all of them). Title, media and
+    thumbnail come from the flashvars; the HTML tree is only built when
+    another field (or a fallback) needs it.
+    """
+    flash_var = assigned_json(page, "var flashvars_")
+    soup = cache(lambda: parse_html(page))
+
+    # Extract metadata
+    metadata = Metadata()
+    if wants(fields, "metadata"):
+        metadata = Metadata(
+            duration=flash_var.get("video_duration") or 0,
+            upload_date=datetime.fromtimestamp(
+                flash_var.get("playbackTracking", {}).get(
+                    "video_timestamp")
+                or 0
+            ).strftime("%d/%m/%Y, %H:%M:%S"),
+            views=convert_views(
+                get_text_wrapper(
+                    lambda: soup().select_one("div.views span.count").get_text(
+                        strip=True
+                    ),
+                    default=0,
+                )
+            ),
+            extras={
+                "likes": get_text_wrapper(
+                    lambda: soup().select_one("span.votesUp").get_text(
+                        strip=True
+                    ),
+                    0,
+                )
+            },
+        )
+
+    # Tags, Categories, PornStars, Model Attribution, Production
+    links = []
+    if wants(fields, "links"):
+        for info_raw in soup().select(
+            "div.video-detailed-info div.video-info-row"
+        ):
+            if not info_raw:
+                continue
+
+            if (
+                info_raw.select_one("div.userInfoBlock")
+                or (not info_raw.select_one("p"))
+                or (not info_raw.select("a"))
+            ):
+                continue
+
+            vidlinks = VideoLinks(
+                title=get_text_wrapper(
+                    lambda: info_raw.select_one("p").get_text(strip=True),
+                    "Unknowm Links Category",
+                ),
+                links=[],
+            )
+            for a in info_raw.select("a"):
+                try:
+                    vidlinks.links.append(
+                        ExternalLink(
+                            name=get_text_wrapper(
+                                lambda: a.get_text(
+                                    strip=True), "Unknown Name"
+                            ),
+                            url="https://" + DOMAIN + a.attrs.get("href"),
+                        )
+                    )
+                except:
+                    pass
+            links.append(vidlinks)
+
+    # User Related Info
+    userinfo = soup().select_one("div.userInfoBlock") if wants(fields, "extras") else None
+    if userinfo:
+        user = {
+            "avatar": get_text_wrapper(lambda: userinfo.select_one("div.userAvatar img").attrs.get(
+                "src"
+            ), "NoAvatar"),
+            "name": get_text_wrapper(
+                lambda: userinfo.select_one(
+                    "div.userInfo span.usernameBadgesWrapper a"
+                ).get_text(strip=True),
+                "Unknown User",
+            ),
+            "url": "https://"
+            + DOMAIN
+            + get_text_wrapper(lambda: userinfo.select_one(
+                "div.userInfo span.usernameBadgesWrapper a"
+            ).attrs.get("href", "/"), ""),
+            "titles": [
+                i.attrs.get("data-title")
+                for i in userinfo.select(
+                    "div.userInfo span.usernameBadgesWrapper i"
+                ) if hasattr(i, "attrs") and i
+            ],
+            "total_videos": get_text_wrapper(
+                lambda: userinfo.select(
+                    "div.userInfo span:not(.line):not(.usernameBadgesWrapper)"
+                )[0].get_text(strip=True),
+                "N/A",
+            ),
+            "total_subs": get_text_wrapper(
+                lambda: userinfo.select(
+                    "div.userInfo span:not(.line):not(.usernameBadgesWrapper)"
+                )[1].get_text(strip=True),
+                "N/A",
+            ),
+        }
+    else:
+        user = {}
+
+    # Recommendations
+    relateds = []
+    if recommendations and wants(fields, "recommendations"):
+        for recomends in soup().select('div[data-tab-content*="re"]'):
+            try:
+                r = Recommendations(
+                    title=recomends.attrs.get(
+                        "data-tab-content", "N/A"
+                    ).upper(),
+                    contents=extract_all_thumb_videos(recomends),
+                )
+                relateds.append(r)
+            except:
+                pass
+
+    return Video(
+        title=flash_var.get("video_title")
+        or get_text_wrapper(
+            lambda: soup().select_one("title").get_text(strip=True),
+            "Unnamed Video!",
+        ),
+        url=video_link,
+        metadata=metadata,
+        thumbnail=Thumbnail(
+            url=flash_var.get("image_url")
+            or get_text_wrapper(
+                lambda: soup().select_one('meta[property="og:image"]').attrs["content"],
+                "https://google.com/",
+            )
+        ),
+        media=(
+            media_from_flash_vars(flash_var)
+            if wants(fields, "media")
+            else Media(base_url="No BaseUrl For this!")
+        ),
+        tags=[],
+        links=links,
+        recommendations=relateds,
+        extras={
+            "user": user,
+            "flash_vars": flash_var if include_var else None,
+        },
+    )
+
+
+async def fetch_video_page(
     sem,
     session: aiohttp.ClientSession,
     video_link: str,
-    include_var: bool = False,
     **kwargs,
-):
+) -> str:
     async with sem:
         async with session.get(
             re.sub(r"https?://[^/]+", "", video_link), **kwargs
@@ -64,164 +247,23 @@ async def extract_video(
             if not page:
                 raise ValueError("Empty Response!")
 
-            soup = BeautifulSoup(page, "html.parser")
-            flash_var_match = re.search(
-                r"""var (flashvars_\d*) = (?P<dict>{.*});\n""", page
-            )
-            if not flash_var_match:
-                raise ValueError("Unable to find flash vars")
-            flash_var = json.loads(flash_var_match.group("dict"))
-
-            # Extract metadata
-            metadata = Metadata(
-                duration=flash_var.get("video_duration") or 0,
-                upload_date=datetime.fromtimestamp(
-                    flash_var.get("playbackTracking", {}).get(
-                        "video_timestamp")
-                    or 0
-                ).strftime("%d/%m/%Y, %H:%M:%S"),
-                views=convert_views(
-                    get_text_wrapper(
-                        lambda: soup.select_one("div.views span.count").get_text(
-                            strip=True
-                        ),
-                        default=0,
-                    )
-                ),
-                extras={
-                    "likes": get_text_wrapper(
-                        lambda: soup.select_one("span.votesUp").get_text(
-                            strip=True
-                        ),
-                        0,
-                    )
-                },
-            )
+            return page
 
-            # Tags, Categories, PornStars, Model Attribution, Production
-            links = []
-            for info_raw in soup.select(
-                "div.video-detailed-info div.video-info-row"
-            ):
-                if not info_raw:
-                    continue
-
-                if (
-                    info_raw.select_one("div.userInfoBlock")
-                    or (not info_raw.select_one("p"))
-                    or (not info_raw.select("a"))
-                ):
-                    continue
-
-                vidlinks = VideoLinks(
-                    title=get_text_wrapper(
-                        lambda: info_raw.select_one("p").get_text(strip=True),
-                        "Unknowm Links Category",
-                    ),
-                    links=[],
-                )
-                for a in info_raw.select("a"):
-                    try:
-                        vidlinks.links.append(
-                            ExternalLink(
-                                name=get_text_wrapper(
-                                    lambda: a.get_text(
-                                        strip=True), "Unknown Name"
-                                ),
-                                url="https://" + DOMAIN + a.attrs.get("href"),
-                            )
-                        )
-                    except:
-                        pass
-                links.append(vidlinks)
-
-            # User Related Info
-            userinfo = soup.select_one("div.userInfoBlock")
-            if userinfo:
-                user = {
-                    "avatar": get_text_wrapper(lambda: userinfo.select_one("div.userAvatar img").attrs.get(
-                        "src"
-                    ), "NoAvatar"),
-                    "name": get_text_wrapper(
-                        lambda: userinfo.select_one(
-                            "div.userInfo span.usernameBadgesWrapper a"
-                        ).get_text(strip=True),
-                        "Unknown User",
-                    ),
-                    "url": "https://"
-                    + DOMAIN
-                    + get_text_wrapper(lambda: userinfo.select_one(
-                        "div.userInfo span.usernameBadgesWrapper a"
-                    ).attrs.get("href", "/"), ""),
-                    "titles": [
-                        i.attrs.get("data-title")
-                        for i in userinfo.select(
-                            "div.userInfo span.usernameBadgesWrapper i"
-                        ) if hasattr(i, "attrs") and i
-                    ],
-                    "total_videos": get_text_wrapper(
-                        lambda: userinfo.select(
-                            "div.userInfo span:not(.line):not(.usernameBadgesWrapper)"
-                        )[0].get_text(strip=True),
-                        "N/A",
-                    ),
-                    "total_subs": get_text_wrapper(
-                        lambda: userinfo.select(
-                            "div.userInfo span:not(.line):not(.usernameBadgesWrapper)"
-                        )[1].get_text(strip=True),
-                        "N/A",
-                    ),
-                }
-            else:
-                user = {}
-
-            # Recommendations
-            relateds = []
-            if kwargs.get("recommendations", True):
-                for recomends in soup.select('div[data-tab-content*="re"]'):
-                    try:
-                        r = Recommendations(
-                            title=recomends.attrs.get(
-                                "data-tab-content", "N/A"
-                            ).upper(),
-                            contents=await extract_all_thumb_videos(recomends),
-                        )
-                        relateds.append(r)
-                    except:
-                        pass
-
-            # Media
-            media = Media(base_url="No BaseUrl For this!", items=[])
-            for defination in flash_var.get("mediaDefinitions", [])[:-1]:
-                if defination.get("remote"):
-                    continue
-                media.items.append(
-                    MediaItem(
-                        idx=len(media.items) + 1,
-                        url=defination.get("videoUrl", None),
-                        resolution=defination.get("quality") + "p",
-                    )
-                )
 
-            return Video(
-                title=flash_var.get("video_title")
-                or get_text_wrapper(
-                    lambda: soup.select_one("title").get_text(strip=True),
-                    "Unnamed Video!",
-                ),
-                url=video_link,
-                metadata=metadata,
-                thumbnail=Thumbnail(
-                    url=get_text_wrapper(soup.select_one('meta[property="og:image"]').attrs.get(
-                        "content"
-                    ), "https://google.com/")
-                ),
-                media=media,
-                tags=[],
-                links=links,
-                recommendations=relateds,
-                extras={
-                    "user": user,
-                    "flash_vars": flash_var if include_var else None,
-                },
-            )
+async def extract_video(
+    sem,
+    session: aiohttp.ClientSession,
+    video_link: str,
+    include_var: bool = False,
+    fields: set[str] | None = None,
+    **kwargs,
+):
+    page = await fetch_video_page(sem, session, video_link, **kwargs)
+    return await run_parser(
+        parse_video_page,
+        page,
+        video_link,
+        kwargs.get("recommendations", True),
+        include_var,
+        fields,
+    )
@@ -1,7 +1,9 @@
 
-import re
+import aiohttp, re
 from fake_useragent import UserAgent
 from contextlib import asynccontextmanager
+from tools.retry import RetryingSession
+from tools.httpcache import CachingSession
 
 DOMAIN = "PLACEHOLDER"
 link_pattern = re.compile(
@@ -13,7 +15,11 @@ if DOMAIN == "PLACEHOLDER":
 
 @asynccontextmanager
 async def make_session():
-    session = aiohttp.ClientSession(headers={"User-Agent": UserAgent().random})
+    session = CachingSession(
+        RetryingSession(
+            aiohttp.ClientSession(headers={"User-Agent": UserAgent().random})
+        )
+    )
     try:
         yield session
     finally:
@@ -1,15 +1,26 @@
 
-from bs4 import BeautifulSoup, Tag
+from ..parsing import HTMLNode, parse_html, run_parser
 from http.cookies import SimpleCookie
 from . import DOMAIN
 from ..converters import convert_views, convert_duration
 from ..models import ThumbVideo, Metadata, ExternalLink, Thumbnail
 import aiohttp
 
-async def extract_thumb_info(thumb_list: list[Tag]) -> list[dict]:
+def extract_thumb_info(thumb: HTMLNode) -> dict:
     # Implement the logic for extracting info from a thumbnail 
     raise NotImplementedError()
 
+def parse_videos_page(webpage: str) -> list[ThumbVideo | None]:
+    # Runs on the parse pool: no awaits here, just return the models
+    thumbnail_selector = "" # Add CSS thumbnail selector
+
+    soup = parse_html(webpage)
+    thumbnails = [extract_thumb_info(thumb) for thumb in soup.select(thumbnail_selector)]
+    return [
+       ThumbVideo(...)  # Fill this thing
+       for thumb in thumbnails
+    ]
+
 async def extract_videos_from_page(
     sem, session: aiohttp.ClientSession, page_url: str, **request_kwargs
 ) -> list[ThumbVideo | None]:
@@ -29,15 +40,7 @@ async def extract_videos_from_page(
                 if response.cookies:
                     session.cookie_jar.update_cookies(response.cookies)
 
-                webpage = await response.text()
-                thumbnail_selector = "" # Add CSS thumbnail selector
-                
-                soup = BeautifulSoup(webpage, 'html.parser')
-                thumbnails = await asyncio.gather(*[asyncio.create_task(extract_thumb_info(thumb)) for thumb in soup.select(thumbnail_selector)])
-                return [
-                   ThumbVideo(...)  # Fill this thing
-                   for thumb in thumbnails
-                ]
+                return await run_parser(parse_videos_page, await response.text())
             except Exception as e:
                 print('Unable to extract videos from page "{}":'.format(page_url), e)
             return []
@@ -1,5 +1,5 @@
 
-from bs4 import BeautifulSoup, NavigableString
+from ..parsing import parse_html, run_parser
 import re, aiohttp
 from http.cookies import SimpleCookie
 from ..converters import convert_duration
@@ -13,12 +13,33 @@ from ..models import (
     Thumbnail,
     VideoLinks,
     Recommendations,
+    wants,
 )
 from . import DOMAIN
 
 
+def parse_video_page(
+    page: str,
+    video_url: str,
+    with_recommendations: bool = True,
+    fields: set[str] | None = None,
+) -> Video:
+    # Runs on the parse pool: no awaits here, just return the models
+    soup = parse_html(page)
+
+    # Add the extraction logic here, skipping what `fields` does not ask for
+    recommendations = []
+    if with_recommendations and wants(fields, "recommendations"):
+        pass  # e.g. recommendations.append(Recommendations(...))
+
+    video = Video(..., recommendations=recommendations)
+
+    # return the Video object
+    return video
+
+
 async def extract_video_info(
-    sem, session: aiohttp.ClientSession, video_url: str, with_recommendations: bool = True, **request_kwargs
+    sem, session: aiohttp.ClientSession, video_url: str, with_recommendations: bool = True, fields: set[str] | None = None, **request_kwargs
 ) -> Video | None:
     async with sem:
         async with session.get(video_url, **request_kwargs) as response:
@@ -36,12 +57,10 @@ async def extract_video_info(
 
                 if response.cookies:
                     session.cookie_jar.update_cookies(response.cookies)
-                
-                # Add the extraction logic here
-                video = Video(...)
 
-                # return the Video object
-                return video
+                return await run_parser(
+                    parse_video_page, await response.text(), video_url, with_recommendations, fields
+                )
             except Exception as e:
                 print(f"Unable to extract info from '{video_url}': {e}")
                 return None
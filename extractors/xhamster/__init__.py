@@ -1,13 +1,19 @@
 import aiohttp, re
 from fake_useragent import UserAgent
 from contextlib import asynccontextmanager
+from tools.retry import RetryingSession
+from tools.httpcache import CachingSession
 
 link_pattern = re.compile(r"""^https?://(?:[a-z0-9-]+\.)*xhamster\.desi.*?$""")
 
 
 @asynccontextmanager
 async def make_session():
-    session = aiohttp.ClientSession(headers={"User-Agent": UserAgent().random})
+    session = CachingSession(
+        RetryingSession(
+            aiohttp.ClientSession(headers={"User-Agent": UserAgent().random})
+        )
+    )
     try:
         yield session
     finally:
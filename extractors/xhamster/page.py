@@ -1,7 +1,32 @@
-import json, re
 from rich import print
 from http.cookies import SimpleCookie
 
+from ..jsdata import assigned_json
+from ..parsing import run_parser
+
+
+def parse_videos_page(webpage: str, initial_dict: bool = False):
+    """The parse half of `extract_videos_from_webpage`, run on the parse pool."""
+    initial_props = assigned_json(webpage, "window.initials")
+    layoutPage = initial_props.get("layoutPage", {})
+    listPropsKey = [
+        key
+        for key in layoutPage.keys()
+        if "videoListProps".lower() in key.lower()
+    ]
+
+    if not initial_dict:
+        thums = []
+        for key in listPropsKey:
+            thumbData = layoutPage.get(key)
+            if thumbData and isinstance(thumbData, dict):
+                thumbsItem = thumbData.get("videoThumbProps", [])
+                if thumbsItem and isinstance(thumbsItem, list):
+                    thums.extend(thumbsItem)
+        return thums
+    else:
+        return initial_props
+
 
 async def extract_videos_from_webpage(
     sem, session, url, initial_dict: bool = False, **kwargs
@@ -22,33 +47,7 @@ async def extract_videos_from_webpage(
 
             try:
                 webpage = await response.text()
-                initial_data_pattern = re.compile(
-                    r"window\.initials\s*=\s*(\{.*?\});", re.DOTALL
-                )
-
-                initial_prop_found = initial_data_pattern.search(webpage)
-                if not initial_prop_found:
-                    raise ValueError("Unable to find initial data!")
-
-                initial_props = json.loads(initial_prop_found.group(1))
-                layoutPage = initial_props.get("layoutPage", {})
-                listPropsKey = [
-                    key
-                    for key in layoutPage.keys()
-                    if "videoListProps".lower() in key.lower()
-                ]
-
-                if not initial_dict:
-                    thums = []
-                    for key in listPropsKey:
-                        thumbData = layoutPage.get(key)
-                        if thumbData and isinstance(thumbData, dict):
-                            thumbsItem = thumbData.get("videoThumbProps", [])
-                            if thumbsItem and isinstance(thumbsItem, list):
-                                thums.extend(thumbsItem)
-                    return thums
-                else:
-                    return initial_props
+                return await run_parser(parse_videos_page, webpage, initial_dict)
             except Exception as e:
                 print("Scrapping Error:", e)
                 return []
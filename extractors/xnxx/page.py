@@ -1,4 +1,4 @@
-from bs4 import BeautifulSoup, Tag
+from ..parsing import HTMLNode, parse_html, run_parser
 from rich import print
 from http.cookies import SimpleCookie
 
@@ -15,7 +15,7 @@ def get_text(elem):
         return "Field Not Found!"
 
 
-async def parse_video_element(video_element: Tag) -> ThumbVideo | None:
+def parse_video_element(video_element: HTMLNode) -> ThumbVideo | None:
     try:
         title = get_text(video_element.select_one("div.thumb-under p a"))
         url = "https://xnxx.health" + video_element.select_one(
@@ -57,6 +57,17 @@ async def parse_video_element(video_element: Tag) -> ThumbVideo | None:
         print("Error While Getting info:", e)
 
 
+def parse_videos_page(html: str) -> list[ThumbVideo]:
+    """The parse half of `get_videos_from_webpage`, run on the parse pool."""
+    soup = parse_html(html)
+    videos = (
+        parse_video_element(video_div)
+        for video_div in soup.select('div[id^="video_"]')
+        if video_div
+    )
+    return [data for data in videos if data]
+
+
 async def get_videos_from_webpage(
     sem, session: aiohttp.ClientSession, page_url: str, **kwargs
 ) -> list[ThumbVideo]:
@@ -76,13 +87,7 @@ async def get_videos_from_webpage(
                     session.cookie_jar.update_cookies(response.cookies)
                 html = await response.text()
 
-                soup = BeautifulSoup(html, "html.parser")
-                tasks = [
-                    asyncio.create_task(parse_video_element(video_div))
-                    for video_div in soup.select('div[id^="video_"]')
-                    if video_div
-                ]
-                return [data for data in await asyncio.gather(*tasks) if data]
+                return await run_parser(parse_videos_page, html)
         except Exception as e:
             print(f"[Parsing Error]:", e)
 
@@ -1,6 +1,7 @@
 import aiohttp
-from bs4 import BeautifulSoup
-import re, json
+from ..parsing import parse_html, run_parser
+from ..jsdata import assigned_json
+import re
 from urllib.parse import urljoin
 from http.cookies import SimpleCookie
 from ..converters import convert_duration, convert_views
@@ -13,6 +14,7 @@ from ..models import (
     ThumbVideo,
     Thumbnail,
     Recommendations,
+    wants,
 )
 
 
@@ -83,49 +85,36 @@ def convert_var(vars: list[dict[str, str | int]]) -> list[ThumbVideo]:
     return new_data
 
 
-async def extract_video_info(
-    sem,
-    session: aiohttp.ClientSession,
+def parse_video_page(
+    text: str,
     video_url: str,
     recommendation: bool = True,
-    **kwargs,
-) -> dict:
-    async with sem:
+    fields: set[str] | None = None,
+) -> tuple[Video | None, str | None]:
+    """
+    The parse half of `extract_video_info`, run on the parse pool: the
+    video without its media, and the master playlist to read them from.
+    Only the `fields` asked for are extracted (None: all of them).
+    """
+    soup = parse_html(text)
+    wrapper = soup.select_one("div.wrapper")
+    if not wrapper:
+        print("[Parse Error] Missing .wrapper")
+        return None, None
+
+    def wrap(expression, default=None):
         try:
-            async with session.get(video_url, **kwargs) as r:
-                r.raise_for_status()
-                set_cookie_header = r.headers.getall("Set-Cookie", [])
-                for cookie_str in set_cookie_header:
-                    cookie = SimpleCookie()
-                    cookie.load(cookie_str)
-                    # Convert to a dict that aiohttp can understand
-                    cookies_dict = {key: morsel.value for key, morsel in cookie.items()}
-                    session.cookie_jar.update_cookies(cookies_dict, r.url)
-
-                if r.cookies:
-                    session.cookie_jar.update_cookies(r.cookies)
-                text = await r.text()
-        except Exception as e:
-            print(f"[Fetch Error] {e}")
-            return {}
-
-        soup = BeautifulSoup(text, "html.parser")
-        wrapper = soup.select_one("div.wrapper")
-        if not wrapper:
-            print("[Parse Error] Missing .wrapper")
-            return
-
-        def wrap(expression, default=None):
-            try:
-                return expression()
-            except:
-                return default
+            return expression()
+        except:
+            return default
 
-        try:
-            title = wrapper.select_one("h1").text.strip()
+    try:
+        title = wrapper.select_one("h1").text.strip()
 
-            metadata = wrapper.select_one("span.metadata").text.strip()
-            parts = [part.strip() for part in metadata.split("-")]
+        metadata = Metadata()
+        if wants(fields, "metadata"):
+            metadata_text = wrapper.select_one("span.metadata").text.strip()
+            parts = [part.strip() for part in metadata_text.split("-")]
             duration = wrap(lambda: convert_duration(parts[0]), 0)
             is_hd = wrap(
                 lambda: (
@@ -158,6 +147,20 @@ async def extract_video_info(
             dislikes = get_int_value('a[class*="vote-action-bad"] span.value')
             comments = get_int_value('a[title*="Comments"] span.value')
 
+            metadata = Metadata(
+                views=views,
+                duration=duration,
+                extras={
+                    "is_hd": is_hd,
+                    "rating": rating,
+                    "likes": likes,
+                    "dislikes": dislikes,
+                    "comments": comments,
+                },
+            )
+
+        tags = []
+        if wants(fields, "tags"):
             tag_els = wrapper.select('div[class*="video-tags"] a')
             tags = [
                 ExternalLink(
@@ -172,54 +175,81 @@ async def extract_video_info(
                 if a.get("href", "#") != "#"
             ]
 
-            # media playlist
-            bg_div = soup.select_one("div#video-player-bg")
+        # media playlist
+        bg_div = soup.select_one("div#video-player-bg")
+        hls_match = None
+        if wants(fields, "media"):
             hls_match = re.search(
                 r"""setVideoHLS\(['"](.+?)['"]\);""",
                 bg_div.prettify() if bg_div else "",
             )
-            media = Media(base_url="Nope", items=[])
-            if hls_match:
-                media = await get_resolutions(session, hls_match.group(1))
-            else:
+            if not hls_match:
                 print(f'[media Error] No hls match found in "\n{bg_div.prettify()}\n"')
 
-            # recommendations
-            recom = Recommendations()
-            if recommendation and bg_div:
-                try:
-                    related_match = re.search(
-                        r"""var\s+video_related\s*=\s*(\[.*?\]);""", bg_div.text
-                    )
-                    if related_match:
-                        data = json.loads(related_match.group(1))
-                        recom = Recommendations(items=convert_var(data))
-                except Exception as e:
-                    print(f"[Recommendation Error] {e}")
+        # recommendations
+        recom = Recommendations()
+        if (
+            recommendation
+            and wants(fields, "recommendations")
+            and bg_div
+            and "var video_related" in bg_div.text
+        ):
+            try:
+                data = assigned_json(bg_div.text, "var video_related")
+                recom = Recommendations(items=convert_var(data))
+            except Exception as e:
+                print(f"[Recommendation Error] {e}")
+
+        video = Video(
+            title=title,
+            url=video_url,
+            metadata=metadata,
+            thumbnail=Thumbnail(
+                url=soup.select_one('meta[property*="og:image"]').get("content")
+            ),
+            media=Media(base_url="Nope", items=[]),
+            tags=tags,
+            links=[],
+            recommendations=[recom],
+        )
+        return video, hls_match.group(1) if hls_match else None
+    except Exception as e:
+        print(f"[Parse Exception] {e}")
+        return None, None
 
-            metadata = Metadata(
-                views=views,
-                duration=duration,
-                extras={
-                    "is_hd": is_hd,
-                    "rating": rating,
-                    "likes": likes,
-                    "dislikes": dislikes,
-                    "comments": comments,
-                },
-            )
 
-            return Video(
-                title=title,
-                url=video_url,
-                metadata=metadata,
-                thumbnail=Thumbnail(
-                    url=soup.select_one('meta[property*="og:image"]').get("content")
-                ),
-                media=media,
-                tags=tags,
-                links=[],
-                recommendations=[recom],
-            )
+async def extract_video_info(
+    sem,
+    session: aiohttp.ClientSession,
+    video_url: str,
+    recommendation: bool = True,
+    fields: set[str] | None = None,
+    **kwargs,
+) -> dict:
+    async with sem:
+        try:
+            async with session.get(video_url, **kwargs) as r:
+                r.raise_for_status()
+                set_cookie_header = r.headers.getall("Set-Cookie", [])
+                for cookie_str in set_cookie_header:
+                    cookie = SimpleCookie()
+                    cookie.load(cookie_str)
+                    # Convert to a dict that aiohttp can understand
+                    cookies_dict = {key: morsel.value for key, morsel in cookie.items()}
+                    session.cookie_jar.update_cookies(cookies_dict, r.url)
+
+                if r.cookies:
+                    session.cookie_jar.update_cookies(r.cookies)
+                text = await r.text()
         except Exception as e:
-            print(f"[Parse Exception] {e}")
+            print(f"[Fetch Error] {e}")
+            return {}
+
+        video, hls_url = await run_parser(
+            parse_video_page, text, video_url, recommendation, fields
+        )
+        if video is not None and hls_url:
+            media = await get_resolutions(session, hls_url)
+            if isinstance(media, Media):
+                video.media = media
+        return video
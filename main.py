@@ -9,7 +9,7 @@ from aiohttp import ClientSession
 from datetime import datetime
 from typing import Callable, List
 
-from extractors.models import ThumbVideo, Video, Media, MediaItem
+from extractors.models import ThumbVideo, Video, Media, MediaItem, DOWNLOAD_FIELDS
 from tools.utils import (
     clear,
     read_until,
@@ -20,6 +20,13 @@ from tools.utils import (
     format_elapsed_time,
 )
 from tools.downloader import download_video, download_video_with_ffmpeg, add_thumbnail
+from tools.bandwidth import GOVERNOR, configure_bandwidth
+from tools.writer import configure_writer
+from tools.cache import configure_cache
+from tools.httpcache import CachingSession, configure_http_cache
+from tools.postprocess import configure_postprocess
+from extractors.parsing import configure_parser, configure_parse_pool
+from tools.retry import RetryBudget, RetryPolicy, retry_call
 from config import *
 
 
@@ -78,6 +85,90 @@ def get_highest_media_dict(media_dict: Media) -> MediaItem | None:
         return None
 
 
+async def retry_async(
+    label: str,
+    func: Callable,
+    attempts: int,
+    backoff_base: float = 2.0,
+    prefix: str = "",
+    budget: RetryBudget | None = None,
+):
+    """
+    Awaits `func()` up to `attempts` times with jittered `backoff_base**attempt`
+    waits, drawing retries from the job's `budget`. HTTP errors are retried
+    only for statuses that may change (5xx, 429, ...).
+    """
+    attempt = 0
+
+    async def attempt_once():
+        nonlocal attempt
+        attempt += 1
+        print(f"[blue]{prefix}▶ Attempt {attempt}: {label}...[/blue]")
+        try:
+            return await func()
+        except Exception as e:
+            print(f"[red]{prefix}⚠ {label} failed: {e}[/red]")
+            raise
+
+    def on_retry(_attempt, _error, wait):
+        print(f"[yellow]{prefix}↻ Retrying in {wait:.2f}s...[/yellow]")
+
+    policy = RetryPolicy(
+        attempts=attempts,
+        base=backoff_base,
+        multiplier=backoff_base,
+        exceptions=(Exception,),
+    )
+    return await retry_call(attempt_once, policy=policy, budget=budget, on_retry=on_retry)
+
+
+async def run_pipeline(
+    items: list,
+    stages: list[tuple[Callable, int]],
+    queue_size: int = 4,
+):
+    """
+    Runs `items` through `stages`, a list of `(handler, workers)` pairs.
+
+    Every stage has its own pool of workers and the stages are connected by
+    bounded queues, so a slow stage pushes back on the ones before it instead
+    of letting work pile up. A handler returns the item for the next stage,
+    or None to drop it (it is expected to record the failure itself); an
+    exception it lets escape is printed and drops the item the same way.
+    """
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+
+    async def feed():
+        for item in items:
+            await queues[0].put(item)
+        for _ in range(stages[0][1]):
+            await queues[0].put(None)
+
+    async def stage(index: int):
+        handler, workers = stages[index]
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(queues) else None
+
+        async def worker():
+            while (item := await inbox.get()) is not None:
+                try:
+                    result = await handler(item)
+                except Exception as e:
+                    # A dead worker would never pass its sentinel on and stall
+                    # the stages around it, so an escaped error just drops the item
+                    print(f"[red]❌ {getattr(handler, '__name__', 'stage')} failed: {e!r}[/red]")
+                    result = None
+                if result is not None and outbox is not None:
+                    await outbox.put(result)
+
+        await asyncio.gather(*[worker() for _ in range(workers)])
+        if outbox is not None:
+            for _ in range(stages[index + 1][1]):
+                await outbox.put(None)
+
+    await asyncio.gather(feed(), *[stage(i) for i in range(len(stages))])
+
+
 async def download_videos(
     sem,
     session,
@@ -94,9 +185,16 @@ async def download_videos(
     download_session: ClientSession = None,
     skip_custom_downloader: bool = False,
     thumbnail_url_extract_func: Callable = None,
+    download_sem: asyncio.Semaphore = None,
+    extract_workers: int = 3,
+    resolve_workers: int = 3,
+    download_workers: int = 2,
+    post_workers: int = 2,
+    queue_size: int = 4,
+    fields: set[str] | None = DOWNLOAD_FIELDS,
 ):
     os.makedirs(root_download_path, exist_ok=True)
-    save_data([vid.model_dump_json() for vid in videos], os.path.join(INITIAL_PATH, f"{datetime.now().strftime("%d-%m-%Y %H.%M.%S")}-Videos-List.json")
+    save_data([vid.model_dump_json() for vid in videos], os.path.join(INITIAL_PATH, f"{datetime.now().strftime("%d-%m-%Y %H.%M.%S")}-Videos-List.json"))
 
 
     name_suffix=(
@@ -117,192 +215,172 @@ async def download_videos(
             os.path.abspath(root_download_path)}[/cyan]"'
     )
 
-    new_videos, videos_failed=[], []
-    total_size=total_time=0
+    media_session=session if download_session is None else download_session
+    download_sem=download_sem or DOWNLOAD_SEM
+    post_sem=asyncio.Semaphore(post_workers)
 
-    for idx, video in enumerate(videos, 1):
-        clear()
+    new_videos, videos_failed=[], []
+    totals={"size": 0, "time": 0}
 
+    async def extract(job):
+        idx, video=job["idx"], job["video"]
+        prefix=f"[{idx}/{len(videos)}] "
         video_id=video.url.rstrip("/").split("/")[-1]
-        print(
-            f"[bold]{
-                idx}/{len(videos)}[/bold] Extracting: [yellow]{video_id}[/yellow]"
-        )
+        print(f"[bold]{prefix}[/bold]Extracting: [yellow]{video_id}[/yellow]")
+        # Retries this video may spend across every stage and request
+        budget=RetryBudget()
 
-        try:
-            video_extracted=None
-            for attempt in range(1, max_retries + 1):
-                try:
-                    print(
-                        f"[blue]🔍 Attempt {
-                            attempt}: Extracting video details...[/blue]"
-                    )
-                    video_extracted: Video=await extract_details_func(
-                        sem, session, video.url
-                    )
-                    if not video_extracted:
-                        raise ValueError("No details extracted")
-                    break  # Success
-                except Exception as e:
-                    print(f"[red]⚠ Extract failed: {e}[/red]")
-                    if attempt < max_retries:
-                        wait=backoff_base**attempt
-                        print(
-                            f"[yellow]↻ Retrying extraction in {
-                                wait:.2f}s...[/yellow]"
-                        )
-                        await asyncio.sleep(wait)
-                    else:
-                        print(
-                            "[red]❌ Max retries reached for extraction. Skipping video.[/red]"
-                        )
-                        video_extracted=None
-
-            if not video_extracted:
-                print(f"[red]❌ Extraction failed[/red]")
-                videos_failed.append(video)
-                continue
-
-            json_path=os.path.join(
-                INITIAL_PATH,
-                sanitize_filename(video_extracted.title)[
-                    :80] + name_suffix + ".json",
+        async def extract_once():
+            video_extracted: Video=await extract_details_func(
+                sem, session, video.url, fields=fields
             )
-            save_data(video_extracted, json_path)
-            videos_failed.append(video_extracted)
+            if not video_extracted:
+                raise ValueError("No details extracted")
+            return video_extracted
 
-            print(
-                f"[green]✅ Info gathered![/green] Downloading: [italic cyan]{
-                    video_extracted.title}[/italic cyan]"
+        try:
+            video_extracted=await retry_async(
+                "Extracting video details",
+                extract_once,
+                max_retries,
+                backoff_base,
+                prefix,
+                budget,
             )
+        except Exception:
+            print(f"[red]{prefix}❌ Extraction failed[/red]")
+            videos_failed.append(video)
+            return None
+
+        json_path=os.path.join(
+            INITIAL_PATH,
+            sanitize_filename(video_extracted.title)[
+                :80] + name_suffix + ".json",
+        )
+        save_data(video_extracted, json_path)
+        print(
+            f"[green]{prefix}✅ Info gathered![/green] [italic cyan]{
+                video_extracted.title}[/italic cyan]"
+        )
+        return {**job, "prefix": prefix, "info": video_extracted, "budget": budget}
 
+    async def resolve(job):
+        prefix, video_extracted=job["prefix"], job["info"]
+        try:
             media=(
                 get_media_dict_func(video_extracted)
                 if get_media_dict_func
                 else get_highest_media_dict(video_extracted.media)
             )
             if not media:
-                print(f"[red]❌ Unable to retrieve media dict[/red]")
-                continue
+                raise ValueError("Unable to retrieve media dict")
 
             download_url=media.url
             if not download_url.startswith("http"):
-                print(
-                    f"[red]❌ Invalid media URL:[/red] [yellow]{
-                        download_url}[/yellow]"
-                )
-                continue
+                raise ValueError(f"Invalid media URL: {download_url}")
 
             if pre_meida_url_func:
-                print(f"[blue]» Initilizing media url...[/blue]")
+                print(f"[blue]{prefix}» Initilizing media url...[/blue]")
                 download_url=await pre_meida_url_func(
-                    session=(
-                        session
-                        if not isinstance(download_session, ClientSession)
-                        else download_session
-                    ),
+                    session=media_session,
                     url=download_url,
                 )
+        except Exception as e:
+            print(f"[red]{prefix}❌ {e}[/red]")
+            videos_failed.append(video_extracted)
+            return None
+
+        return {**job, "download_url": download_url}
+
+    async def download(job):
+        prefix, video_extracted, budget=job["prefix"], job["info"], job["budget"]
 
+        async def with_ffmpeg():
+            return await download_video_with_ffmpeg(
+                download_sem,
+                video_extracted.title,
+                job["download_url"],
+                ".mp4",
+                root_download_path,
+            )
+
+        async def with_custom_downloader():
+            return await download_video(
+                download_sem,
+                media_session,
+                video_extracted.title,
+                job["download_url"],
+                ".mp4",
+                root_download_path,
+                cleanup=True,
+                retry_budget=budget,
+            )
+
+        try:
             if skip_custom_downloader:
-                print(f"[blue]▶ Using ffmpeg...[/blue]")
-                size_downloaded, time_taken, output_file=(
-                    await download_video_with_ffmpeg(
-                        sem,
-                        video_extracted.title,
-                        download_url,
-                        ".mp4",
-                        root_download_path,
-                    )
+                result=await retry_async(
+                    "Using ffmpeg", with_ffmpeg, max_retries, backoff_base, prefix, budget
                 )
             else:
-                for attempt in range(1, download_retries + 1):
-                    try:
-                        print(
-                            f"[blue]▶ Attempt {
-                                attempt}: Using custom downloader...[/blue]"
-                        )
-                        size_downloaded, time_taken, output_file=await download_video(
-                            sem,
-                            (
-                                session
-                                if not isinstance(download_session, ClientSession)
-                                else download_session
-                            ),
-                            video_extracted.title,
-                            download_url,
-                            ".mp4",
-                            root_download_path,
-                            cleanup=True,
-                        )
-                        break  # success
-                    except Exception as e:
-                        print(f"[red]⚠ Custom download failed: {e}[/red]")
-                        if attempt < max_retries:
-                            wait=backoff_base**attempt
-                            print(f"[yellow]↻ Retrying in {
-                                  wait:.2f}s...[/yellow]")
-                            await asyncio.sleep(wait)
-                        else:
-                            print("[blue]↪ Falling back to ffmpeg...[/blue]")
-                            for ff_attempt in range(1, max_retries + 1):
-                                try:
-                                    print(
-                                        f"[blue]▶ Attempt {
-                                            ff_attempt}: Using ffmpeg...[/blue]"
-                                    )
-                                    size_downloaded, time_taken, output_file=(
-                                        await download_video_with_ffmpeg(
-                                            sem,
-                                            video_extracted.title,
-                                            download_url,
-                                            ".mp4",
-                                            root_download_path,
-                                        )
-                                    )
-                                    break
-                                except Exception as e:
-                                    print(f"[red]❌ ffmpeg failed: {e}[/red]")
-                                    if ff_attempt < max_retries:
-                                        wait=backoff_base**ff_attempt
-                                        print(
-                                            f"[yellow]↻ Retrying in {
-                                                wait:.2f}s...[/yellow]"
-                                        )
-                                        await asyncio.sleep(wait)
-                                    else:
-                                        raise Exception("All methods failed")
-
-            if thumbnail_url_extract_func:
-                thumbnail_url=thumbnail_url_extract_func(video_extracted)
-                if not thumbnail_url:
-                    continue
-                print(f"[green]▶ Adding Thumbnail...")
-                await add_thumbnail(
-                    sem,
-                    (
-                        session
-                        if not isinstance(download_session, ClientSession)
-                        else download_session
-                    ),
-                    thumbnail_url,
-                    output_file,
-                )
+                try:
+                    result=await retry_async(
+                        "Using custom downloader",
+                        with_custom_downloader,
+                        download_retries,
+                        backoff_base,
+                        prefix,
+                        budget,
+                    )
+                except Exception:
+                    print(f"[blue]{prefix}↪ Falling back to ffmpeg...[/blue]")
+                    result=await retry_async(
+                        "Using ffmpeg",
+                        with_ffmpeg,
+                        max_retries,
+                        backoff_base,
+                        prefix,
+                        budget,
+                    )
+        except Exception as e:
+            print(f"[red bold]{prefix}❌ All methods failed: {e}[/red bold]")
+            videos_failed.append(video_extracted)
+            return None
+
+        return {**job, "result": result}
 
-            total_size += size_downloaded
-            total_time += time_taken
-            videos_failed.pop(-1)
-            new_videos.append(video_extracted)
+    async def post_process(job):
+        prefix, video_extracted=job["prefix"], job["info"]
+        size_downloaded, time_taken, output_file=job["result"]
 
-        except KeyboardInterrupt:
-            if is_user_quit():
-                break
+        try:
+            if thumbnail_url_extract_func and (
+                thumbnail_url := thumbnail_url_extract_func(video_extracted)
+            ):
+                print(f"[green]{prefix}▶ Adding Thumbnail...")
+                await add_thumbnail(post_sem, media_session, thumbnail_url, output_file)
         except Exception as e:
-            print(f"[red bold]❌ Unexpected error: {e}[/red bold]")
-            print("[dim]Press enter to continue...[/dim]")
-            input("")
-        finally:
-            await asyncio.sleep(0.02 * idx)
+            # The video itself is fine; only the cover art is missing
+            print(f"[red]{prefix}⚠ Thumbnail failed: {e}[/red]")
+
+        totals["size"] += size_downloaded
+        totals["time"] += time_taken
+        new_videos.append(video_extracted)
+        print(f"[bold green]{prefix}✔ Done:[/bold green] {video_extracted.title}")
+        return None
+
+    try:
+        await run_pipeline(
+            [{"idx": idx, "video": video} for idx, video in enumerate(videos, 1)],
+            [
+                (extract, extract_workers),
+                (resolve, resolve_workers),
+                (download, download_workers),
+                (post_process, post_workers),
+            ],
+            queue_size=queue_size,
+        )
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("[yellow]Interrupted; summarising what finished so far.[/yellow]")
 
     print(
         f"\n[bold green]✔ Completed:[/bold green] {len(new_videos)} downloaded")
@@ -319,9 +397,11 @@ async def download_videos(
         print(f"[yellow]Saved failed video info to:[/yellow] {fail_file}")
 
     print(
-        f"[bold cyan]⏱ Total time:[/bold cyan] {format_elapsed_time(total_time)}")
+        f"[bold cyan]⏱ Total time:[/bold cyan] {format_elapsed_time(totals["time"])}")
     print(
-        f"[bold cyan]💾 Total data:[/bold cyan] {format_bytes_readable(total_size)}")
+        f"[bold cyan]💾 Total data:[/bold cyan] {format_bytes_readable(totals["size"])}")
+    print(
+        f"[bold cyan]📶 Average rate:[/bold cyan] {format_bytes_readable(int(GOVERNOR.meter.average))}/s")
     return new_videos
 
 
@@ -396,7 +476,9 @@ async def pornhub_handler():
 
     async with (
         make_session() as session,
-        ClientSession(headers={"User-Agent": UserAgent().random}) as download_session,
+        CachingSession(
+            ClientSession(headers={"User-Agent": UserAgent().random})
+        ) as download_session,
     ):
         while True:
             clear()
@@ -553,6 +635,17 @@ async def xhamster_handler():
 
 
 async def main():
+    configure_bandwidth(
+        global_limit=BANDWIDTH_LIMIT,
+        host_limits=HOST_BANDWIDTH_LIMITS,
+        job_limit=JOB_BANDWIDTH_LIMIT,
+    )
+    configure_writer(threads=WRITER_THREADS, sync_bytes=WRITER_SYNC_BYTES)
+    configure_cache(SEGMENT_CACHE_PATH, SEGMENT_CACHE_BYTES)
+    configure_http_cache(HTTP_CACHE_PATH, HTTP_CACHE_BYTES, HTTP_CACHE_TTLS, HTTP_CACHE_BYPASS)
+    configure_postprocess(workers=POSTPROCESS_WORKERS)
+    configure_parser(HTML_PARSER)
+    configure_parse_pool(PARSE_POOL_MODE, PARSE_POOL_WORKERS)
 
     available_domains={
         "xnxx": xnxx_handler,
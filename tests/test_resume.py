@@ -0,0 +1,116 @@
+import os
+import sys
+import signal
+import asyncio
+import tempfile
+import unittest
+import subprocess
+
+import aiohttp
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools.downloader import download_video  # noqa: E402
+
+DATA = os.urandom(12 * 1024 * 1024 + 5)
+CHUNK = 256 * 1024
+# Large enough that the single-connection (manifest-resumed) path is used
+NO_RANGED = 1 << 40
+
+CHILD = """
+import sys, asyncio, aiohttp
+sys.path.insert(0, sys.argv[1])
+from tools.downloader import download_video
+
+async def main():
+    async with aiohttp.ClientSession() as session:
+        await download_video(
+            asyncio.Semaphore(2), session, "vid", sys.argv[2], ".mp4", sys.argv[3],
+            ranged_min_size=int(sys.argv[4]),
+        )
+
+asyncio.run(main())
+"""
+
+
+@unittest.skipUnless(hasattr(signal, "SIGKILL"), "needs SIGKILL")
+class CrashResumeTest(unittest.IsolatedAsyncioTestCase):
+    """A download killed mid-transfer resumes from the bytes really on disk."""
+
+    async def asyncSetUp(self):
+        self.sent = 0
+        self.slow = True
+        self.ranges = []
+        app = web.Application()
+        app.router.add_get("/v.mp4", self.serve)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/v.mp4"
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    async def serve(self, request: web.Request) -> web.StreamResponse:
+        header = request.headers.get("Range")
+        self.ranges.append(header)
+        start = int(header[6:].split("-")[0]) if header else 0
+        body = DATA[start:]
+        headers = {"Content-Type": "video/mp4", "Content-Length": str(len(body)), "ETag": '"v1"'}
+        if header:
+            headers["Content-Range"] = f"bytes {start}-{len(DATA) - 1}/{len(DATA)}"
+        response = web.StreamResponse(status=206 if header else 200, headers=headers)
+        await response.prepare(request)
+        try:
+            for i in range(0, len(body), CHUNK):
+                await response.write(body[i : i + CHUNK])
+                self.sent += 1
+                if self.slow:
+                    await asyncio.sleep(0.05)
+        except ConnectionError:
+            pass
+        return response
+
+    async def test_resumes_after_sigkill(self):
+        download_dir = tempfile.mkdtemp()
+        child = subprocess.Popen(
+            [sys.executable, "-c", CHILD, ROOT, self.url, download_dir, str(NO_RANGED)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            # Past the writer's first coalesced buffer, well short of the end
+            while self.sent < 40:
+                self.assertIsNone(child.poll(), "download finished before the crash")
+                await asyncio.sleep(0.05)
+        finally:
+            child.send_signal(signal.SIGKILL)
+            child.wait()
+
+        partial = [
+            name for name in os.listdir(os.path.join(download_dir, "videos")) if name.endswith("_vid.mp4")
+        ]
+        self.assertEqual(len(partial), 1)
+        on_disk = os.path.getsize(os.path.join(download_dir, "videos", partial[0]))
+        # Not preallocated: the size is what was written, never the full length
+        self.assertLess(on_disk, len(DATA))
+
+        self.slow = False
+        async with aiohttp.ClientSession() as session:
+            _, _, path = await download_video(
+                asyncio.Semaphore(2), session, "vid", self.url, ".mp4", download_dir,
+                ranged_min_size=NO_RANGED,
+            )
+
+        with open(path, "rb") as file:
+            self.assertTrue(file.read() == DATA, "resumed file differs from the source")
+        if on_disk:
+            self.assertEqual(self.ranges[-1], f"bytes={on_disk}-")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import asyncio
+import math
+import time
+
+
+class RateMeter:
+    """Byte counter with an exponentially decaying instantaneous rate."""
+
+    def __init__(self, tau: float = 2.0):
+        self.tau = tau
+        self.total = 0
+        self.started = time.monotonic()
+        self._rate = 0.0
+        self._last = self.started
+
+    def _decay(self, now: float):
+        if (dt := now - self._last) > 0:
+            self._rate *= math.exp(-dt / self.tau)
+            self._last = now
+
+    def add(self, nbytes: int):
+        self._decay(time.monotonic())
+        self._rate += nbytes / self.tau
+        self.total += nbytes
+
+    @property
+    def instant(self) -> float:
+        # Read-only, so a display thread can poll it while the loop adds
+        return self._rate * math.exp(-max(time.monotonic() - self._last, 0) / self.tau)
+
+    @property
+    def average(self) -> float:
+        return self.total / max(time.monotonic() - self.started, 1e-6)
+
+    def report(self) -> dict:
+        return {"instant": self.instant, "average": self.average, "total": self.total}
+
+
+class TokenBucket:
+    """
+    Token bucket in bytes per second; `rate=None` means unlimited.
+
+    Consumers may overdraw the bucket (a single read can be larger than the
+    burst) and then wait until the debt is paid back, which keeps the long
+    run average at `rate` no matter how the reads are sized.
+    """
+
+    def __init__(self, rate: float | None, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else (rate or 0)
+        self.tokens = self.burst
+        self._last = time.monotonic()
+
+    def reserve(self, nbytes: int) -> float:
+        """Take `nbytes` now and return how long the caller should wait."""
+        if not self.rate:
+            return 0.0
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+        self.tokens -= nbytes
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class BandwidthJob:
+    """Bandwidth share of a single download (one video)."""
+
+    def __init__(self, governor: "BandwidthGovernor", name: str, limit: float | None):
+        self.governor = governor
+        self.name = name
+        self.bucket = TokenBucket(limit)
+        self.meter = RateMeter()
+
+    def close(self):
+        self.governor.jobs.pop(self.name, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class BandwidthGovernor:
+    """
+    Process wide bandwidth caps: one global bucket, one per host and one per
+    job. Every byte read from the network is charged to all three, and the
+    reader waits for whichever is furthest in debt.
+    """
+
+    def __init__(self):
+        self.configure()
+
+    def configure(
+        self,
+        global_limit: float | None = None,
+        host_limits: dict[str, float] | None = None,
+        default_host_limit: float | None = None,
+        job_limit: float | None = None,
+    ):
+        self.global_bucket = TokenBucket(global_limit)
+        self.host_limits = dict(host_limits or {})
+        self.default_host_limit = default_host_limit
+        self.job_limit = job_limit
+        self.host_buckets: dict[str, TokenBucket] = {}
+        self.meter = RateMeter()
+        self.host_meters: dict[str, RateMeter] = {}
+        self.jobs: dict[str, BandwidthJob] = {}
+
+    def job(self, name: str, limit: float | None = None) -> BandwidthJob:
+        job = BandwidthJob(self, name, limit if limit is not None else self.job_limit)
+        self.jobs[name] = job
+        return job
+
+    def reserve(
+        self, nbytes: int, host: str | None = None, job: BandwidthJob | None = None
+    ) -> float:
+        self.meter.add(nbytes)
+        delay = self.global_bucket.reserve(nbytes)
+
+        if host:
+            if host not in self.host_buckets:
+                self.host_buckets[host] = TokenBucket(
+                    self.host_limits.get(host, self.default_host_limit)
+                )
+                self.host_meters[host] = RateMeter()
+            self.host_meters[host].add(nbytes)
+            delay = max(delay, self.host_buckets[host].reserve(nbytes))
+
+        if job is not None:
+            job.meter.add(nbytes)
+            delay = max(delay, job.bucket.reserve(nbytes))
+
+        return delay
+
+    async def consume(
+        self, nbytes: int, host: str | None = None, job: BandwidthJob | None = None
+    ):
+        if delay := self.reserve(nbytes, host, job):
+            await asyncio.sleep(delay)
+
+    def report(self) -> dict:
+        return {
+            "global": self.meter.report(),
+            "hosts": {host: meter.report() for host, meter in self.host_meters.items()},
+            "jobs": {name: job.meter.report() for name, job in self.jobs.items()},
+        }
+
+
+GOVERNOR = BandwidthGovernor()
+
+
+def configure_bandwidth(
+    global_limit: float | None = None,
+    host_limits: dict[str, float] | None = None,
+    default_host_limit: float | None = None,
+    job_limit: float | None = None,
+):
+    """Set the process wide caps (bytes per second, None for unlimited)."""
+    GOVERNOR.configure(global_limit, host_limits, default_host_limit, job_limit)
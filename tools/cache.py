@@ -0,0 +1,283 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl that makes a copy-on-write clone (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+# Query parameters that sign or expire a url instead of naming its content
+VOLATILE_PARAMS = frozenset(
+    {
+        "token",
+        "expires",
+        "expire",
+        "exp",
+        "signature",
+        "sig",
+        "policy",
+        "key-pair-id",
+        "hdnts",
+        "hdnea",
+        "hmac",
+        "validfrom",
+        "validto",
+        "x-amz-algorithm",
+        "x-amz-credential",
+        "x-amz-date",
+        "x-amz-expires",
+        "x-amz-security-token",
+        "x-amz-signature",
+        "x-amz-signedheaders",
+    }
+)
+
+
+def cache_key(
+    url: str,
+    byterange: tuple[int, int] | None = None,
+    cipher: tuple[bytes, bytes] | None = None,
+) -> str:
+    """
+    Key of a segment in the cache: its url without volatile query tokens,
+    plus the byte range and the AES key/IV it was decrypted with.
+    """
+    parts = urlparse(url)
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in VOLATILE_PARAMS
+    )
+    digest = hashlib.sha1(
+        urlunparse(parts._replace(query=urlencode(query), fragment="")).encode("utf-8")
+    )
+    if byterange:
+        digest.update(f"\n{byterange[0]}@{byterange[1]}".encode())
+    if cipher:
+        digest.update(b"\n" + cipher[0] + cipher[1])
+    return digest.hexdigest()
+
+
+def link_file(source: str, destination: str):
+    """Reflink, else hard link, else copy `source` to `destination`."""
+    if os.path.exists(destination):
+        os.remove(destination)
+    if fcntl is not None:
+        try:
+            with open(source, "rb") as src, open(destination, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return
+        except OSError:
+            os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+class SegmentCache:
+    """
+    On-disk cache of downloaded segments shared by every video and run.
+
+    Segment bytes are stored once per content hash under `objects/`, and an
+    append-only `index.jsonl` maps each `cache_key` to a hash, so the init
+    section or intro that many videos share takes space once. Hits are
+    linked into the job's temp directory rather than copied.
+
+    Objects are evicted least recently used first (by mtime, bumped on every
+    hit) once they take more than `max_bytes`. The cache never fails a
+    download: any OS error is just a miss.
+    """
+
+    def __init__(self, root: str | None = None, max_bytes: int = 2 * 1024**3):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index: dict[str, str] = {}
+        self.size = 0
+        self._loaded = False
+        self._index_file = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def configure(self, root: str | None, max_bytes: int = 2 * 1024**3):
+        with self._lock:
+            if self._index_file is not None:
+                self._index_file.close()
+                self._index_file = None
+            self.root = root
+            self.max_bytes = max_bytes
+            self.index = {}
+            self.size = 0
+            self._loaded = False
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _load(self):
+        if self._loaded:
+            return
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        index_path = os.path.join(self.root, "index.jsonl")
+        lines = 0
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8", errors="ignore") as file:
+                for line in file:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("hash"):
+                        self.index[record["key"]] = record["hash"]
+                    else:
+                        self.index.pop(record.get("key"), None)
+
+        self.index = {
+            key: digest
+            for key, digest in self.index.items()
+            if os.path.exists(self._object_path(digest))
+        }
+        # Rewrite the journal once it is mostly superseded or evicted records
+        if lines > 2 * len(self.index) + 1000:
+            with open(index_path + ".tmp", "w", encoding="utf-8") as file:
+                for key, digest in self.index.items():
+                    file.write(json.dumps({"key": key, "hash": digest}) + "\n")
+            os.replace(index_path + ".tmp", index_path)
+        self._index_file = open(index_path, "a", encoding="utf-8")
+
+        for entry in os.scandir(os.path.join(self.root, "objects")):
+            if entry.is_dir():
+                self.size += sum(obj.stat().st_size for obj in os.scandir(entry.path))
+        self._loaded = True
+
+    def _record(self, key: str, digest: str | None):
+        self._index_file.write(json.dumps({"key": key, "hash": digest}) + "\n")
+        self._index_file.flush()
+        if digest:
+            self.index[key] = digest
+        else:
+            self.index.pop(key, None)
+
+    def lookup(self, key: str) -> str | None:
+        """Path of the cached object for `key`, marked as just used."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            try:
+                self._load()
+                if (digest := self.index.get(key)) is None:
+                    return None
+                path = self._object_path(digest)
+                os.utime(path)
+                return path
+            except OSError:
+                return None
+
+    def link(self, key: str, destination: str) -> bool:
+        """Puts the cached segment at `destination`; False on a miss."""
+        if (path := self.lookup(key)) is None:
+            return False
+        try:
+            link_file(path, destination)
+            return True
+        except OSError:
+            return False
+
+    def read(self, key: str) -> bytes | None:
+        if (path := self.lookup(key)) is None:
+            return None
+        try:
+            with open(path, "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def _store(self, key: str, digest: str, place) -> bool:
+        with self._lock:
+            try:
+                self._load()
+                path = self._object_path(digest)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    place(path + ".tmp")
+                    os.replace(path + ".tmp", path)
+                    self.size += os.path.getsize(path)
+                if self.index.get(key) != digest:
+                    self._record(key, digest)
+                self._evict()
+                return True
+            except OSError:
+                return False
+
+    def store_file(self, key: str, path: str) -> bool:
+        """Adds a finished segment file (linked, not copied, where possible)."""
+        if not self.enabled:
+            return False
+        try:
+            with open(path, "rb") as file:
+                digest = hashlib.file_digest(file, "sha256").hexdigest()
+        except OSError:
+            return False
+        return self._store(key, digest, lambda target: link_file(path, target))
+
+    def store_bytes(self, key: str, data) -> bool:
+        if not self.enabled:
+            return False
+
+        def place(target: str):
+            with open(target, "wb") as file:
+                file.write(data)
+
+        return self._store(key, hashlib.sha256(data).hexdigest(), place)
+
+    def forget(self, key: str):
+        """Drops `key` (e.g. its bytes failed verification)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            try:
+                self._load()
+                if key in self.index:
+                    self._record(key, None)
+            except OSError:
+                pass
+
+    def _evict(self):
+        if self.size <= self.max_bytes:
+            return
+        objects = [
+            obj
+            for entry in os.scandir(os.path.join(self.root, "objects"))
+            if entry.is_dir()
+            for obj in os.scandir(entry.path)
+        ]
+        objects.sort(key=lambda obj: obj.stat().st_mtime)
+        # Down to 90% of the budget, so every store does not trigger a scan
+        for obj in objects:
+            if self.size <= self.max_bytes * 0.9:
+                break
+            size = obj.stat().st_size
+            os.remove(obj.path)
+            self.size -= size
+        live = {obj.name for obj in objects if os.path.exists(obj.path)}
+        for key, digest in list(self.index.items()):
+            if digest not in live:
+                self._record(key, None)
+
+
+CACHE = SegmentCache()
+
+
+def configure_cache(root: str | None, max_bytes: int = 2 * 1024**3):
+    """Enable the shared segment cache at `root` (None disables it)."""
+    CACHE.configure(root, max_bytes)
@@ -0,0 +1,81 @@
+import asyncio
+
+try:
+    from cryptography.hazmat.primitives import padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = None
+
+from .hls import HLSKey, HLSSegment
+from .retry import request
+
+
+class DecryptionUnsupported(Exception):
+    """The segment is encrypted in a way that cannot be handled in-process."""
+
+
+class SegmentDecryptor:
+    """
+    AES-128-CBC decryption of one segment, fed chunk by chunk as it arrives.
+
+    Only whole 16 byte blocks are released by `update`; the PKCS7 padding of
+    the last block is removed by `finalize`.
+    """
+
+    def __init__(self, key: bytes, iv: bytes):
+        if Cipher is None:
+            raise DecryptionUnsupported("AES-128 segments need the `cryptography` package")
+        self._decryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).decryptor()
+        self._unpadder = padding.PKCS7(128).unpadder()
+
+    def update(self, chunk: bytes) -> bytes:
+        return self._unpadder.update(self._decryptor.update(chunk))
+
+    def finalize(self) -> bytes:
+        return self._unpadder.update(self._decryptor.finalize()) + self._unpadder.finalize()
+
+
+# Key bytes by key url; a key is fetched once per rotation, however many
+# segments are waiting for it
+_KEYS: dict[str, asyncio.Future] = {}
+
+
+async def fetch_key(session, uri: str) -> bytes:
+    if uri not in _KEYS:
+        _KEYS[uri] = asyncio.ensure_future(_fetch_key(session, uri))
+    try:
+        return await asyncio.shield(_KEYS[uri])
+    except Exception:
+        # Let the next segment try again instead of caching the failure
+        _KEYS.pop(uri, None)
+        raise
+
+
+async def _fetch_key(session, uri: str) -> bytes:
+    async with await request(session, "GET", uri) as r:
+        r.raise_for_status()
+        key = await r.read()
+    if len(key) != 16:
+        raise ValueError(f"AES-128 key from {uri} is {len(key)} bytes, expected 16")
+    return key
+
+
+def segment_iv(key: HLSKey, sequence: int) -> bytes:
+    """The explicit IV of the key, or the media sequence number as a 128 bit big-endian int."""
+    if key.iv:
+        return bytes.fromhex(key.iv[2:] if key.iv.lower().startswith("0x") else key.iv).rjust(
+            16, b"\0"
+        )
+    return max(sequence, 0).to_bytes(16, "big")
+
+
+async def segment_cipher(session, segment: HLSSegment) -> tuple[bytes, bytes] | None:
+    """`(key, iv)` to decrypt `segment` with, or None if it is in the clear."""
+    key = segment.key
+    if key is None or key.method == "NONE":
+        return None
+    if key.method != "AES-128" or key.keyformat != "identity" or not key.uri:
+        raise DecryptionUnsupported(f"Unsupported EXT-X-KEY {key.method} ({key.keyformat})")
+    if Cipher is None:
+        raise DecryptionUnsupported("AES-128 segments need the `cryptography` package")
+    return await fetch_key(session, key.uri), segment_iv(key, segment.sequence)
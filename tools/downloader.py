@@ -8,13 +8,11 @@ import time
 import shutil
 import logging
 import re
-import random
+import signal
+import contextlib
 from rich import print
-from uuid import uuid4
-from tqdm import tqdm
-from datetime import datetime
-from urllib.parse import urljoin
-from typing import Any
+from urllib.parse import urlparse
+from typing import Any, AsyncIterator
 
 try:
     from .consts import LOG_FORMAT, LOG_PATH, DATE_FORMAT
@@ -28,133 +26,559 @@ except:
     LOG_FORMAT = "[%(asctime)s] [%(levelname)s] [PID:%(process)d] [%(threadName)s] [%(funcName)s@%(filename)s:%(lineno)d] - %(message)s"
     DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-
-# Set up loggers for different tasks
+from .manifest import SegmentManifest
+from .streaming import OrderedSegmentWriter
+from .bandwidth import GOVERNOR, BandwidthJob
+from .hls import (
+    HLSSegment,
+    cached_playlist,
+    conditional_headers,
+    fetch_playlist,
+    follow_playlist,
+    is_playlist,
+    load_playlist,
+)
+from .decrypt import SegmentDecryptor, segment_cipher
+from .ranged import RangeIgnored, download_ranged, supports_ranges
+from .writer import WRITER
+from .progress import BOARD, ProgressJob
+from .logs import log_event, setup_queue_loggers
+from .ffmpeg import FFmpegError, FFmpegProcess, FFmpegProgress, run_ffmpeg
+from .cache import CACHE, cache_key
+from .httpcache import media_type
+from .hedge import Hedger, SilentProgress
+from .retry import (
+    RetryBudget,
+    RetryPolicy,
+    request,
+    retry_after_of,
+    retry_call,
+    unwrap_session,
+)
+from .verify import SegmentCheck, check_segment_data, verify_segments
+from .mp4 import MP4_EXTENSIONS, MP4Error, embed_cover
+from .postprocess import POSTPROCESS, PRIORITY_REENCODE, PRIORITY_THUMBNAIL
+
+
+# Set up loggers for different tasks; records go through a queue to a
+# background thread and each file is only opened once something is logged
 def setup_task_loggers():
-    os.makedirs(LOG_PATH, exist_ok=True)
-
-    now = datetime.now()
-    date_suffix = f"{
-        now.month:02d}-{now.day:02d}-{now.year:02d}-{now.hour:02d}"
-
-    # Main logger (keep your existing one)
-    main_logger = logging.getLogger(__name__)
-    main_handler = logging.FileHandler(
-        os.path.join(LOG_PATH, "main" + f"-{date_suffix}.log")
-    )
-    main_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
-    main_logger.addHandler(main_handler)
-    main_logger.setLevel(logging.DEBUG)
-
-    # Logger for gathering segments
-    gather_logger = logging.getLogger("gathering_segments")
-    gather_handler = logging.FileHandler(
-        os.path.join(LOG_PATH, f"gathering-segments-{date_suffix}.log")
+    return setup_queue_loggers(
+        LOG_PATH,
+        {
+            __name__: "main",
+            "gathering_segments": "gathering-segments",
+            "downloading_segments": "downloading-segments",
+            "concatenating_segments": "concatenating-segments",
+        },
+        LOG_FORMAT,
+        DATE_FORMAT,
     )
-    gather_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
-    gather_logger.addHandler(gather_handler)
-    gather_logger.setLevel(logging.DEBUG)
-
-    # Logger for downloading segments
-    download_logger = logging.getLogger("downloading_segments")
-    download_handler = logging.FileHandler(
-        os.path.join(LOG_PATH, f"downloading-segments-{date_suffix}.log")
-    )
-    download_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
-    download_logger.addHandler(download_handler)
-    download_logger.setLevel(logging.DEBUG)
-
-    # Logger for concatenating segments
-    concat_logger = logging.getLogger("concatenating_segments")
-    concat_handler = logging.FileHandler(
-        os.path.join(LOG_PATH, f"concatenating-segments-{date_suffix}.log")
-    )
-    concat_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
-    concat_logger.addHandler(concat_handler)
-    concat_logger.setLevel(logging.DEBUG)
-
-    return main_logger, gather_logger, download_logger, concat_logger
 
 
 # Initialize loggers at module level
 Log, GatherLog, DownloadLog, ConcatLog = setup_task_loggers()
 
 
+class ConcurrencyController:
+    """
+    AIMD limit on in-flight segment requests against a single host.
+
+    Works as a drop-in for `asyncio.Semaphore` (`async with controller:`).
+    Every `limit` completed requests form a window: the limit grows by one
+    while the window's throughput keeps improving and latency stays close to
+    the best seen, and is cut multiplicatively on errors, timeouts and
+    `Retry-After` (which also pauses new requests for the given time).
+    """
+
+    def __init__(
+        self,
+        host: str,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        decrease_factor: float = 0.5,
+    ):
+        self.host = host
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+
+        self._cond = asyncio.Condition()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._base_latency: float | None = None
+        self._best_throughput = 0.0
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._window_latency = 0.0
+        self._window_count = 0
+
+    async def __aenter__(self):
+        while True:
+            if (delay := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            async with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return self
+                await self._cond.wait()
+
+    async def __aexit__(self, *_):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify(max(1, int(self.limit) - self.in_flight))
+
+    def record_success(self, nbytes: int, elapsed: float):
+        elapsed = max(elapsed, 1e-6)
+        if self._base_latency is None or elapsed < self._base_latency:
+            self._base_latency = elapsed
+        else:
+            # Let the baseline drift up slowly so it tracks the path, not one lucky request
+            self._base_latency += (elapsed - self._base_latency) * 0.01
+
+        self._window_bytes += nbytes
+        self._window_latency += elapsed
+        self._window_count += 1
+        if self._window_count < max(1, int(self.limit)):
+            return
+
+        throughput = self._window_bytes / max(
+            time.monotonic() - self._window_start, 1e-6
+        )
+        latency = self._window_latency / self._window_count
+        old_limit = self.limit
+
+        if latency > self._base_latency * 2:
+            # Requests are queueing somewhere; step back gently
+            self.limit = max(self.min_limit, self.limit - 1)
+        elif throughput > self._best_throughput * 1.02 and latency <= self._base_latency * 1.5:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+        # Decay the best so a once-fast host can be probed again later
+        self._best_throughput = max(self._best_throughput * 0.98, throughput)
+        self._reset_window()
+
+        if int(self.limit) != int(old_limit):
+            DownloadLog.debug(
+                f"[Concurrency] {self.host}: {old_limit:.0f} -> {self.limit:.0f} [{throughput=:.0f} B/s; {latency=:.2f}s]"
+            )
+            self._wake()
+
+    def record_failure(self, retry_after: float | None = None):
+        now = time.monotonic()
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+        # One cut per burst of failures, not one per failed request
+        if now - self._last_decrease < max(self._base_latency or 0.0, 1.0):
+            return
+        old_limit = self.limit
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self._last_decrease = now
+        self._reset_window()
+        DownloadLog.debug(
+            f"[Concurrency] {self.host}: {old_limit:.0f} -> {self.limit:.0f} [failure; {retry_after=}]"
+        )
+
+    def _wake(self):
+        async def notify():
+            async with self._cond:
+                self._cond.notify(max(0, int(self.limit) - self.in_flight))
+
+        asyncio.ensure_future(notify())
+
+
+# Limits learned per CDN host, shared by every video in the run
+HOST_CONTROLLERS: dict[str, ConcurrencyController] = {}
+
+
+def host_controller(url: str, initial: int = 4, **kwargs) -> ConcurrencyController:
+    host = urlparse(url).hostname or url
+    if host not in HOST_CONTROLLERS:
+        HOST_CONTROLLERS[host] = ConcurrencyController(host, initial, **kwargs)
+    return HOST_CONTROLLERS[host]
+
+
+# Segments are small and plentiful, so waits between attempts stay short
+SEGMENT_POLICY = RetryPolicy(attempts=5, base=1.0, cap=20.0)
+# A hedge is a second opinion, not another retry loop
+HEDGE_POLICY = RetryPolicy(attempts=1)
+
+
 # Then in your functions, use the appropriate logger:
 async def download_segment(
     sem,
     session: aiohttp.ClientSession,
     segment_url: str,
     download_dir: str,
-    pbar: tqdm,
+    pbar: ProgressJob,
     file_name=None,
-    retry_limit: int = 5,
-    fixed_backoff: int | float = 2.0,
+    manifest: SegmentManifest | None = None,
+    buffer: bytearray | None = None,
+    bandwidth: BandwidthJob | None = None,
+    byterange: tuple[int, int] | None = None,
+    cipher: tuple[bytes, bytes] | None = None,
+    use_cache: bool = True,
+    started: asyncio.Event | None = None,
+    policy: RetryPolicy | None = None,
+    budget: RetryBudget | None = None,
 ):
-    async with sem:
-        try:
-            DownloadLog.debug(f"GET: {segment_url=}; {download_dir=}")
-            segment_name = (
-                (segment_url.split("/")[-1].split("?")
-                 [0] or segment_url.split("/")[-1])
-                if not file_name
-                else file_name
+    """
+    Downloads one segment into `download_dir` (or `buffer`), resuming from
+    the manifest and retrying under `policy` (and the job's `budget`). The
+    concurrency slot is only held while a request is in flight, never while
+    backing off or waiting on an open circuit. Returns the path, or "" if
+    the segment could not be fetched.
+    """
+    policy = policy or SEGMENT_POLICY
+    try:
+        log_event(
+            DownloadLog,
+            logging.DEBUG,
+            "GET",
+            segment_url=segment_url,
+            download_dir=download_dir,
+            byterange=byterange,
+        )
+        host = urlparse(segment_url).hostname
+        segment_name = (
+            (segment_url.split("/")[-1].split("?")
+             [0] or segment_url.split("/")[-1])
+            if not file_name
+            else file_name
+        )
+        download_path = os.path.join(download_dir, segment_name)
+
+        # Already fetched by a previous run
+        if manifest is not None and manifest.is_complete(segment_name, download_path):
+            log_event(
+                DownloadLog,
+                logging.INFO,
+                "Skipping; found complete in manifest",
+                segment_name=segment_name,
             )
-            download_path = os.path.join(download_dir, segment_name)
-
-            is_succesfull = False
-            for i in range(1, retry_limit + 1):
+            pbar.update(1)
+            return download_path
+
+        # Same segment fetched by another video or an earlier run
+        key = (
+            cache_key(segment_url, byterange, cipher)
+            if use_cache and CACHE.enabled
+            else None
+        )
+        if key is not None:
+            if buffer is not None:
+                cached = await asyncio.to_thread(CACHE.read, key)
+                if cached is not None:
+                    del buffer[:]
+                    buffer.extend(cached)
+            elif cached := await asyncio.to_thread(CACHE.link, key, download_path):
+                if manifest is not None:
+                    manifest.record_done(
+                        segment_name,
+                        segment_url,
+                        os.path.getsize(download_path),
+                        None,
+                        None,
+                    )
+            if cached:
+                log_event(
+                    DownloadLog, logging.INFO, "Cache hit", segment_name=segment_name
+                )
+                pbar.update(1)
+                return download_path
+
+        async def attempt() -> str:
+            async with sem:
+                if started is not None:
+                    started.set()
+                request_start = time.perf_counter()
                 try:
-                    async with session.get(segment_url) as r:
+                    # Continue a partly written segment instead of starting over
+                    headers = {}
+                    # CBC needs the previous block to resume, so encrypted
+                    # segments always start over
+                    offset = (
+                        manifest.resume_offset(segment_name, download_path)
+                        if manifest is not None and cipher is None
+                        else 0
+                    )
+                    if byterange and offset >= byterange[0]:
+                        offset = 0
+                    if byterange:
+                        # EXT-X-BYTERANGE: only a slice of the resource is the segment
+                        length, start = byterange
+                        headers["Range"] = f"bytes={start + offset}-{start + length - 1}"
+                    elif offset:
+                        headers["Range"] = f"bytes={offset}-"
+                    if offset:
+                        if validator := manifest.validator(segment_name):
+                            headers["If-Range"] = validator
+                        log_event(
+                            DownloadLog,
+                            logging.DEBUG,
+                            "Resuming",
+                            segment_name=segment_name,
+                            offset=offset,
+                        )
+
+                    async with session.get(segment_url, headers=headers) as r:
+                        if r.status == 416 and offset and not byterange:
+                            # Range starts at the end: the file is complete on disk
+                            total = r.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+                            if total.isdigit() and int(total) == offset:
+                                record = manifest.get(segment_name)
+                                manifest.record_done(
+                                    segment_name,
+                                    segment_url,
+                                    offset,
+                                    record.get("etag"),
+                                    record.get("last_modified"),
+                                )
+                                pbar.update(1)
+                                return download_path
+
                         r.raise_for_status()
-                        DownloadLog.info(f"GET: {segment_url=} [{r.status=}]")
-
-                        DownloadLog.debug(f"{download_path=}; {segment_name=}")
-                        with tqdm(
-                            dynamic_ncols=True,
-                            total=int(r.headers.get("content-length", 0)),
-                            unit="B",
-                            unit_scale=True,
-                            desc=f'\t|-> Downloading "{
-                                segment_name}"'.expandtabs(4),
-                            leave=False,
-                            position=1,
-                        ) as segment_pbar:
-                            async with aiofiles.open(download_path, "wb") as file:
-                                while chunk := await r.content.read(1024 * 1024 * 40):
+                        log_event(
+                            DownloadLog, logging.INFO, "GET", segment_url=segment_url, status=r.status
+                        )
+
+                        # Server ignored the range (or validator changed); start over
+                        if r.status != 206:
+                            if byterange:
+                                raise aiohttp.ClientPayloadError(
+                                    f"Server ignored byte range {byterange} for {segment_url}"
+                                )
+                            offset = 0
+
+                        etag = r.headers.get("ETag")
+                        last_modified = r.headers.get("Last-Modified")
+                        content_length = r.headers.get("content-length")
+                        expected_size = (
+                            offset + int(content_length) if content_length else None
+                        )
+                        if manifest is not None:
+                            manifest.record_start(
+                                segment_name, segment_url, etag, last_modified
+                            )
+
+                        log_event(
+                            DownloadLog,
+                            logging.DEBUG,
+                            "Writing",
+                            download_path=download_path,
+                            segment_name=segment_name,
+                        )
+                        decryptor = SegmentDecryptor(*cipher) if cipher else None
+                        written = offset
+                        stored = offset
+                        # Streaming mode keeps the segment in memory. A resumable
+                        # file is not preallocated: its size on disk is what
+                        # the manifest resumes from, so it must only count
+                        # bytes actually written
+                        file = (
+                            await WRITER.open(
+                                download_path,
+                                offset,
+                                size=(
+                                    expected_size
+                                    if cipher is None and manifest is None
+                                    else None
+                                ),
+                            )
+                            if buffer is None
+                            else None
+                        )
+                        if buffer is not None:
+                            del buffer[:]
+                        try:
+                            while chunk := await r.content.read(1024 * 1024 * 40):
+                                written += len(chunk)
+                                pbar.add_bytes(len(chunk))
+                                await GOVERNOR.consume(len(chunk), host, bandwidth)
+                                if decryptor is not None:
+                                    chunk = decryptor.update(chunk)
+                                stored += len(chunk)
+                                if file is not None:
+                                    await file.write(chunk)
+                                else:
+                                    buffer.extend(chunk)
+                            if decryptor is not None:
+                                chunk = decryptor.finalize()
+                                stored += len(chunk)
+                                if file is not None:
                                     await file.write(chunk)
-                                    segment_pbar.update(len(chunk))
+                                else:
+                                    buffer.extend(chunk)
+                        finally:
+                            if file is not None:
+                                await file.close()
+
+                        if expected_size is not None and written != expected_size:
+                            raise aiohttp.ClientPayloadError(
+                                f"Short read: got {written} of {expected_size} bytes"
+                            )
+
+                        if manifest is not None:
+                            manifest.record_done(
+                                segment_name, segment_url, stored, etag, last_modified
+                            )
 
-                        DownloadLog.info(
-                            f"File Saved at {download_path=} under {segment_name=} [ {
-                                os.path.getsize(download_path) if os.path.exists(download_path) else 0} ]"
+                        if isinstance(sem, ConcurrencyController):
+                            sem.record_success(
+                                written - offset, time.perf_counter() - request_start
+                            )
+
+                        if key is not None and buffer is None:
+                            await asyncio.to_thread(CACHE.store_file, key, download_path)
+                        elif key is not None:
+                            await asyncio.to_thread(CACHE.store_bytes, key, buffer)
+
+                        log_event(
+                            DownloadLog,
+                            logging.INFO,
+                            "File Saved",
+                            download_path=download_path,
+                            segment_name=segment_name,
+                            written=written,
                         )
-                        await asyncio.sleep(0.1)
                         pbar.update(1)
 
-                        is_succesfull = True
                         return download_path
                 except Exception as e:
-                    retry_after = fixed_backoff * i + random.random()
-                    status = getattr(r, "status", "N/A")
-                    DownloadLog.error(
-                        f"[Failed] GET: {segment_url=} [{status}] [exception = {
-                            e}] [{retry_after=}; {retry_limit - i=}]"
-                    )
-                    await asyncio.sleep(retry_after)
+                    if isinstance(sem, ConcurrencyController):
+                        sem.record_failure(retry_after_of(e))
+                    raise
+
+        def on_retry(attempt_number: int, e: Exception, delay: float):
+            pbar.retry()
+            log_event(
+                DownloadLog,
+                logging.ERROR,
+                "[Failed] GET",
+                segment_url=segment_url,
+                status=getattr(e, "status", "N/A"),
+                exception=e,
+                retry_after=delay,
+                retries_left=policy.attempts - attempt_number,
+            )
 
-            if not is_succesfull:
-                raise aiohttp.ServerConnectionError(
-                    f"Unable to Retrive Data from {segment_url}!"
-                )
+        return await retry_call(attempt, segment_url, policy, budget, on_retry)
 
-        except Exception as e:
-            print(f'Unable to download segement "{segment_name}"!')
-            DownloadLog.error(
-                f"[Download Segement Error] {e=}; {segment_name=}; {
-                    download_path=}; {segment_url=}"
+    except Exception as e:
+        print(f'Unable to download segement "{segment_name}"!')
+        DownloadLog.error(
+            f"[Download Segement Error] {e=}; {segment_name=}; {
+                download_path=}; {segment_url=}"
+        )
+        return ""
+
+
+async def download_segment_hedged(
+    hedger: Hedger | None,
+    sem,
+    session: aiohttp.ClientSession,
+    segment: HLSSegment,
+    download_dir: str,
+    pbar: ProgressJob,
+    manifest: SegmentManifest | None = None,
+    buffer: bytearray | None = None,
+    bandwidth: BandwidthJob | None = None,
+    cipher: tuple[bytes, bytes] | None = None,
+    budget: RetryBudget | None = None,
+) -> str:
+    """
+    `download_segment` for one playlist segment. With a `hedger`, a request
+    that runs long for its host is raced against a duplicate written to a
+    side file (or buffer), which replaces the original if it wins.
+    """
+    kwargs = dict(bandwidth=bandwidth, byterange=segment.byterange, cipher=cipher)
+    if hedger is None:
+        kwargs["budget"] = budget
+        return await download_segment(
+            sem,
+            session,
+            segment.uri,
+            download_dir,
+            pbar,
+            file_name=segment.name,
+            manifest=manifest,
+            buffer=buffer,
+            **kwargs,
+        )
+
+    download_path = os.path.join(download_dir, segment.name)
+    hedge_name = segment.name + ".hedge"
+    hedge_path = os.path.join(download_dir, hedge_name)
+    hedge_buffer = bytearray() if buffer is not None else None
+    try:
+        winner = await hedger.race(
+            segment.uri,
+            lambda started: download_segment(
+                sem,
+                session,
+                segment.uri,
+                download_dir,
+                pbar,
+                file_name=segment.name,
+                manifest=manifest,
+                buffer=buffer,
+                started=started,
+                budget=budget,
+                **kwargs,
+            ),
+            # One attempt only: the primary is still retrying on its own
+            lambda hedge_session: download_segment(
+                contextlib.nullcontext(),
+                hedge_session,
+                segment.uri,
+                download_dir,
+                SilentProgress(pbar),
+                file_name=hedge_name,
+                policy=HEDGE_POLICY,
+                buffer=hedge_buffer,
+                **kwargs,
+            ),
+        )
+        hedge_bytes = (
+            len(hedge_buffer)
+            if hedge_buffer is not None
+            else os.path.getsize(hedge_path) if os.path.exists(hedge_path) else 0
+        )
+        if winner == "hedge":
+            log_event(DownloadLog, logging.INFO, "Hedge won", segment_name=segment.name)
+            if buffer is not None:
+                buffer[:] = hedge_buffer
+            else:
+                os.replace(hedge_path, download_path)
+                if manifest is not None:
+                    manifest.record_done(
+                        segment.name,
+                        segment.uri,
+                        os.path.getsize(download_path),
+                        None,
+                        None,
+                    )
+            pbar.update(1)
+        if winner is not None:
+            hedger.account(
+                segment.uri,
+                len(buffer) if buffer is not None else os.path.getsize(download_path),
+                hedge_bytes,
             )
-            return ""
+            return download_path
+        return ""
+    finally:
+        if hedge_buffer is None and os.path.exists(hedge_path):
+            os.remove(hedge_path)
 
 
 async def add_thumbnail(
@@ -164,7 +588,8 @@ async def add_thumbnail(
     video_file: str,
 ):
     """
-    Adds a thumbnail to a video file using ffmpeg.
+    Adds a thumbnail to a video file: as MP4 cover art written in place
+    when possible, otherwise by remuxing with ffmpeg.
 
     Args:
         sem: Semaphore to limit concurrent operations.
@@ -175,6 +600,7 @@ async def add_thumbnail(
     Returns:
         True if the thumbnail was added successfully, False otherwise.
     """
+    session = unwrap_session(session)
     path, name = os.path.split(video_file)
     timestamp = int(time.time())
     thumb_name = f"{timestamp}_thumb_{os.path.basename(video_file)}.png"
@@ -188,39 +614,50 @@ async def add_thumbnail(
 
             # Download the thumbnail
             print(f"[blue]Downloading thumbnail from:[/blue] {thumbnail_url}")
-            async with session.get(thumbnail_url) as response:
-                response.raise_for_status()
-                async with aiofiles.open(thumb_path, "wb") as f:
-                    while chunk := await response.content.read(
-                        1024 * 1024
-                    ):  # 1MB chunks
-                        await f.write(chunk)
+
+            async def fetch_thumbnail():
+                async with session.get(thumbnail_url) as response:
+                    response.raise_for_status()
+                    async with aiofiles.open(thumb_path, "wb") as f:
+                        while chunk := await response.content.read(
+                            1024 * 1024
+                        ):  # 1MB chunks
+                            await f.write(chunk)
+
+            await retry_call(fetch_thumbnail, thumbnail_url)
             print(f"[green]Thumbnail downloaded to:[/green] {thumb_path}")
 
+            # Edit the MP4's moov in place; ffmpeg would copy the whole video
+            if os.path.splitext(video_file)[1].lower() in MP4_EXTENSIONS:
+                try:
+                    async with aiofiles.open(thumb_path, "rb") as f:
+                        image = await f.read()
+                    how = await asyncio.to_thread(embed_cover, video_file, image)
+                    print(f"[green]Thumbnail added ({how}) to:[/green] {video_file}")
+                    return True
+                except MP4Error as e:
+                    print(f"[yellow]Cannot add thumbnail in place ({e}), using ffmpeg...[/yellow]")
+
             # Attach thumbnail using ffmpeg
             print(f"[blue]Adding thumbnail to video:[/blue] {video_file}")
-            cmd = [
-                "ffmpeg",
-                "-i", video_file,
-                "-i", thumb_path,
-                "-map", "0",
-                "-map", "1",
-                "-c", "copy",
-                "-disposition:v:1", "attached_pic",
-                "-y", temp_file_name
-            ]
- 
-            proc = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.DEVNULL,  # Suppress standard output
-                stderr=asyncio.subprocess.PIPE,
-            )
-            _, stderr = await proc.communicate()
-
-            if proc.returncode != 0:
-                print(
-                    f"[red]ffmpeg failed with code {proc.returncode}:[/red] {stderr.decode()}"
+            try:
+                await POSTPROCESS.submit(
+                    lambda threads: run_ffmpeg(
+                        [
+                            "-i", video_file,
+                            "-i", thumb_path,
+                            "-map", "0",
+                            "-map", "1",
+                            "-c", "copy",
+                            "-disposition:v:1", "attached_pic",
+                            "-threads", str(threads),
+                            "-y", temp_file_name
+                        ]
+                    ),
+                    PRIORITY_THUMBNAIL,
                 )
+            except FFmpegError as e:
+                print(f"[red]ffmpeg failed with code {e.returncode}:[/red] {e.stderr}")
                 return False
 
             # Replace the original video file with the modified one
@@ -250,6 +687,206 @@ async def add_thumbnail(
                     print(f"[red]Failed to delete temporary file:[/red] {e}")
 
 
+async def govern_ffmpeg(
+    process: asyncio.subprocess.Process,
+    output_file: str,
+    host: str | None,
+    job: BandwidthJob | None,
+    interval: float = 0.5,
+    progress: ProgressJob | None = None,
+):
+    """
+    Charges an ffmpeg download to the bandwidth governor by watching its
+    output grow. ffmpeg cannot be throttled from outside, so when it is over
+    its share it is suspended until the debt is paid (POSIX only; elsewhere
+    its traffic is only accounted for).
+    """
+    can_suspend = hasattr(signal, "SIGSTOP")
+    seen = 0
+    stopped = False
+    try:
+        while process.returncode is None:
+            await asyncio.sleep(interval)
+            size = os.path.getsize(output_file) if os.path.exists(output_file) else 0
+            if size <= seen:
+                continue
+
+            delay = GOVERNOR.reserve(size - seen, host, job)
+            if progress is not None:
+                progress.add_bytes(size - seen)
+            seen = size
+            if delay and can_suspend and process.returncode is None:
+                process.send_signal(signal.SIGSTOP)
+                stopped = True
+                await asyncio.sleep(delay)
+                process.send_signal(signal.SIGCONT)
+                stopped = False
+    except ProcessLookupError:
+        pass
+    finally:
+        if stopped and process.returncode is None:
+            process.send_signal(signal.SIGCONT)
+
+
+# Encoder settings shared by the one-piece and chunked re-encodes
+VIDEO_ENCODE_ARGS = ["-c:v", "libx264", "-vf", "format=yuv420p", "-preset", "medium"]
+AUDIO_ENCODE_ARGS = ["-c:a", "aac", "-b:a", "192k"]
+# Shorter videos are not worth splitting
+MIN_CHUNK_SECONDS = 60
+
+
+async def reencode_chunked(
+    source: str,
+    output_file: str,
+    video_title: str,
+    duration: float,
+    chunks: int,
+):
+    """
+    Re-encodes `source` in `chunks` pieces at once on the post-processing
+    pool. The video stream is split at keyframes by stream copy, every piece
+    is a separate libx264 job, and the encoded pieces are joined with the
+    concat demuxer (no re-encode) while the audio is encoded in one pass, so
+    there are no encoder-delay gaps at the joins. The result has the same
+    streams as the one-piece encode.
+    """
+    work_dir = f"{output_file}.chunks"
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        await POSTPROCESS.submit(
+            lambda threads: run_ffmpeg(
+                [
+                    "-i", source,
+                    "-map", "0:v:0",
+                    "-c", "copy",
+                    "-f", "segment",
+                    "-segment_time", f"{duration / chunks:.3f}",
+                    "-reset_timestamps", "1",
+                    "-y", os.path.join(work_dir, "part%04d.mp4"),
+                ]
+            ),
+            PRIORITY_REENCODE,
+        )
+        parts = sorted(name for name in os.listdir(work_dir) if name.startswith("part"))
+        ConcatLog.info(f"Re-encoding video in {len(parts)} pieces: {video_title}")
+
+        encoded: dict[str, float] = {}
+        with BOARD.job(video_title, unit="sec") as pbar:
+            pbar.set_stage("re-encode", total=duration)
+
+            def encode(part: str):
+                def on_progress(event: FFmpegProgress):
+                    if event.out_time is not None:
+                        encoded[part] = event.out_time
+                        pbar.n = min(sum(encoded.values()), duration)
+
+                return lambda threads: run_ffmpeg(
+                    [
+                        "-i", os.path.join(work_dir, part),
+                        *VIDEO_ENCODE_ARGS,
+                        "-threads", str(threads),
+                        "-y", os.path.join(work_dir, "x264_" + part),
+                    ],
+                    on_progress,
+                )
+
+            await asyncio.gather(
+                *(POSTPROCESS.submit(encode(part), PRIORITY_REENCODE) for part in parts)
+            )
+
+            segment_list = os.path.join(work_dir, "parts.txt")
+            with open(segment_list, "w") as file:
+                file.write(
+                    "\n".join(
+                        f"file '{os.path.abspath(os.path.join(work_dir, 'x264_' + part))}'"
+                        for part in parts
+                    ).replace("\\", "/")
+                )
+
+            def on_stitch(event: FFmpegProgress):
+                if event.out_time is not None:
+                    pbar.n = min(event.out_time, duration)
+
+            pbar.set_stage("stitch", total=duration)
+            await POSTPROCESS.submit(
+                lambda threads: run_ffmpeg(
+                    [
+                        "-f", "concat",
+                        "-safe", "0",
+                        "-i", segment_list,
+                        "-i", source,
+                        "-map", "0:v:0",
+                        "-map", "1:a:0?",
+                        "-c:v", "copy",
+                        *AUDIO_ENCODE_ARGS,
+                        "-threads", str(threads),
+                        "-y", output_file,
+                    ],
+                    on_stitch,
+                ),
+                PRIORITY_REENCODE,
+            )
+    finally:
+        shutil.rmtree(work_dir, True)
+
+
+async def reencode_video(
+    source: str,
+    output_file: str,
+    video_title: str,
+    duration: float | None = None,
+    chunks: int | None = None,
+) -> bool:
+    """
+    Re-encodes `source` into `output_file` (H.264/AAC) on the post-processing
+    pool, so callers should not hold a download slot while waiting. Long
+    videos are encoded as `chunks` pieces in parallel (default: one per pool
+    worker; 1 encodes in one piece). Returns False if ffmpeg failed, leaving
+    `source` as it was.
+    """
+    chunks = min(chunks or POSTPROCESS.workers, int((duration or 0) // MIN_CHUNK_SECONDS))
+    if chunks > 1:
+        try:
+            await reencode_chunked(source, output_file, video_title, duration, chunks)
+            ConcatLog.info(f"Re-encoding successful for video: {video_title}")
+            return True
+        except FFmpegError as e:
+            ConcatLog.warning(
+                f"Chunked re-encoding failed for video {video_title}, encoding in one piece: {e.stderr[-500:]}"
+            )
+
+    async def encode(threads: int):
+        command = [
+            "-i",
+            source,
+            *VIDEO_ENCODE_ARGS,
+            *AUDIO_ENCODE_ARGS,
+            "-threads",
+            str(threads),
+            "-y",
+            output_file,
+        ]
+        ConcatLog.info(f"Re-encoding video: {video_title} [ { command = } ]")
+        with BOARD.job(video_title, unit="sec") as pbar:
+            pbar.set_stage("re-encode", total=duration)
+
+            def on_progress(event: FFmpegProgress):
+                if event.out_time is not None:
+                    pbar.n = event.out_time
+
+            await run_ffmpeg(command, on_progress)
+
+    try:
+        await POSTPROCESS.submit(encode, PRIORITY_REENCODE)
+    except FFmpegError as e:
+        ConcatLog.error(
+            f"Error occurred during re-encoding for video {video_title}: {e.stderr}"
+        )
+        return False
+    ConcatLog.info(f"Re-encoding successful for video: {video_title}")
+    return True
+
+
 async def download_video_with_ffmpeg(
     sem: asyncio.Semaphore,
     video_title: str,
@@ -258,6 +895,8 @@ async def download_video_with_ffmpeg(
     download_dir: str,
     re_encode: bool = False,
     make_subfolders: bool = True,
+    duration: float | None = None,
+    encode_chunks: int | None = None,
 ):
     async with sem:
         start = time.perf_counter()
@@ -268,84 +907,324 @@ async def download_video_with_ffmpeg(
         os.makedirs(download_dir, exist_ok=True)
 
         output_file = os.path.join(download_dir, f"{video_title}{video_ext}")
-        Log.debug(f"[ffmpeg File Setup] { output_file = }")
+        # A re-encode runs once the download is done, on the post-processing pool
+        download_file = (
+            os.path.join(download_dir, f"remux_{video_title}{video_ext}")
+            if re_encode
+            else output_file
+        )
+        Log.debug(f"[ffmpeg File Setup] { output_file = }; { download_file = }")
 
         command = [
-            "ffmpeg",
             "-i",
             hls_url,
-            *(["-c", "copy"] if not re_encode else ["-c:v", "libx264", "-c:a", "aac"]),
+            "-c",
+            "copy",
             "-fflags",
             "+genpts",
-            "-threads",
-            "10",
             "-y",
-            "-hide_banner",
-            "-loglevel",
-            "debug",
-            output_file,
+            download_file,
         ]
 
-        pattern = re.compile(r"^frame=.*time=(\d+):(\d+):(\d+)\.(\d+)")
-        duration_pattern = re.compile(r"Duration:\s(\d+):(\d+):(\d+)\.(\d+)")
-
         start = time.perf_counter()
-        process = await asyncio.create_subprocess_exec(
-            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        Log.debug(f"[ffmpeg] proccess initilized { command = }; { start = }")
+        bandwidth = GOVERNOR.job(video_title)
+        governor_task = None
+
+        def on_start(ffmpeg: FFmpegProcess):
+            nonlocal governor_task
+            governor_task = asyncio.create_task(
+                govern_ffmpeg(
+                    ffmpeg.process,
+                    download_file,
+                    urlparse(hls_url).hostname,
+                    bandwidth,
+                    progress=pbar,
+                )
+            )
+
+        def on_progress(event: FFmpegProgress):
+            if event.out_time is not None:
+                log_event(DownloadLog, logging.DEBUG, "Elapsed", elapsed=event.out_time)
+                pbar.n = min(event.out_time, pbar.total or event.out_time)
+
+        with BOARD.job(video_title, unit="sec") as pbar:
+            pbar.set_stage("ffmpeg", total=duration)
+            try:
+                await run_ffmpeg(command, on_progress, on_start)
+            except FFmpegError as e:
+                Log.error(
+                    f"[FFmpeg Error] Download failed for {video_title}:\n{e.stderr[-500:]}"
+                )
+                raise RuntimeError(f"FFmpeg failed for {video_title}") from e
+            finally:
+                if governor_task is not None:
+                    governor_task.cancel()
+                bandwidth.close()
+
+    if re_encode:
+        if await reencode_video(
+            download_file, output_file, video_title, duration, encode_chunks
+        ):
+            os.remove(download_file)
+        else:
+            # Keep the video as downloaded rather than nothing
+            os.replace(download_file, output_file)
+
+    end = time.perf_counter()
+    file_size = os.path.getsize(output_file) if os.path.exists(output_file) else 0
+    Log.info(
+        f"[FFmpeg Complete] {video_title} | Size: {file_size} bytes | Time: {round(end - start, 2)}s"
+    )
+
+    return file_size, round(end - start, 2), output_file
+
+
+def raise_first_failure(tasks: list[asyncio.Task]):
+    for task in tasks:
+        if task.done() and not task.cancelled() and task.exception():
+            raise task.exception()
+
+
+async def repair_segments(
+    download_sem,
+    session: aiohttp.ClientSession,
+    segments: list[HLSSegment],
+    ciphers: list[tuple[bytes, bytes] | None],
+    temp_dir: str,
+    manifest: SegmentManifest,
+    progress: ProgressJob,
+    bandwidth: BandwidthJob | None = None,
+    rounds: int = 2,
+    budget: RetryBudget | None = None,
+) -> list[SegmentCheck]:
+    """
+    Verifies every downloaded segment before muxing and re-fetches only the
+    ones that fail, up to `rounds` times. Raises `OSError` if a segment is
+    still missing or broken afterwards; segments that only have soft
+    problems (continuity counters, a short PTS span) are kept with a warning
+    since a clean re-fetch would give the same bytes.
+    """
+    for round_ in range(rounds + 1):
+        checks = await asyncio.to_thread(verify_segments, segments, temp_dir, manifest)
+        bad = [
+            (segment, cipher, check)
+            for segment, cipher, check in zip(segments, ciphers, checks)
+            if not check.ok and (check.hard or round_ == 0)
+        ]
+        if not bad or round_ == rounds:
+            break
+
+        GatherLog.warning(
+            f"Re-fetching {len(bad)} of {len(segments)} segments [round {round_ + 1}; {', '.join(f'{c.name}: {c.reason}' for _, _, c in bad)}]"
+        )
+        progress.set_stage("repair", total=len(bad), unit="seg")
+        for segment, cipher, _ in bad:
+            CACHE.forget(cache_key(segment.uri, segment.byterange, cipher))
+            path = os.path.join(temp_dir, segment.name)
+            if os.path.exists(path):
+                os.remove(path)
+        await asyncio.gather(
+            *(
+                download_segment(
+                    download_sem,
+                    session,
+                    segment.uri,
+                    temp_dir,
+                    progress,
+                    file_name=segment.name,
+                    manifest=manifest,
+                    bandwidth=bandwidth,
+                    byterange=segment.byterange,
+                    cipher=cipher,
+                    budget=budget,
+                )
+                for segment, cipher, _ in bad
+            )
         )
 
-        Log.debug(
-            f"[ffmpeg] proccess initilized { command = }; { pattern = }; { duration_pattern = }; { start = }"
+    for check in checks:
+        if not check.ok:
+            GatherLog.warning(f"Segment {check.name} failed verification [{check.reason}]")
+    if broken := [check for check in checks if check.hard]:
+        raise OSError(
+            f"{len(broken)} segments still broken after {rounds} re-fetches: "
+            + ", ".join(f"{check.name} ({check.reason})" for check in broken)
         )
-        with tqdm(
-            desc="Downloaded (seconds)",
-            unit="sec",
-            unit_divisor=60,
-            unit_scale=True,
-            dynamic_ncols=True,
-        ) as pbar:
-            while True:
-                line = (await process.stderr.readline()).decode(errors="ignore")
-                if not line:
+    return checks
+
+
+async def stream_segments(
+    download_sem: asyncio.Semaphore,
+    session: aiohttp.ClientSession,
+    segments: list[HLSSegment],
+    output_file: str,
+    manifest: SegmentManifest,
+    pipe_to_ffmpeg: bool = False,
+    max_buffered: int = 16,
+    bandwidth: BandwidthJob | None = None,
+    ciphers: list[tuple[bytes, bytes] | None] | None = None,
+    follow: AsyncIterator[HLSSegment] | None = None,
+    progress: ProgressJob | None = None,
+    verify_rounds: int = 2,
+    hedger: Hedger | None = None,
+    budget: RetryBudget | None = None,
+):
+    """
+    Downloads `segments` in parallel and appends them in order to `output_file`
+    (or into ffmpeg's stdin), without a temp directory or a concat pass.
+    `ciphers` holds the AES-128 `(key, iv)` of each encrypted segment, and
+    segments yielded by `follow` (a live playlist) are appended as they come.
+    A segment that fails verification is fetched again, up to `verify_rounds`
+    times, before it is appended. With a `hedger`, slow segments are raced
+    against a duplicate request.
+
+    When writing straight to a file, segments already appended by an earlier
+    run are kept and the download resumes after them.
+    """
+    ciphers = list(ciphers) if ciphers else [None] * len(segments)
+    start_index = start_offset = 0
+    if pipe_to_ffmpeg:
+        # ffmpeg's output cannot be appended to, so there is nothing to resume
+        manifest.remove()
+    else:
+        for segment in segments:
+            record = manifest.get(segment.name)
+            if not record or not record.get("done"):
+                break
+            start_index += 1
+            start_offset += record.get("size", 0)
+
+        if not os.path.exists(output_file) or os.path.getsize(output_file) < start_offset:
+            start_index = start_offset = 0
+
+    if start_index:
+        Log.info(f"Resuming stream into {output_file=} at segment {start_index}")
+
+    def on_written(index: int, size: int):
+        segment = segments[index]
+        manifest.record_done(segment.name, segment.uri, size, None, None)
+
+    writer = OrderedSegmentWriter(
+        output_file,
+        max_buffered=max_buffered,
+        pipe_to_ffmpeg=pipe_to_ffmpeg,
+        start_index=start_index,
+        start_offset=start_offset,
+        on_written=None if pipe_to_ffmpeg else on_written,
+    )
+
+    async def fetch(index: int, segment: HLSSegment, pbar: ProgressJob):
+        try:
+            await writer.reserve(index)
+            buffer = bytearray()
+            check = None
+            for attempt in range(verify_rounds + 1):
+                if attempt:
+                    GatherLog.warning(
+                        f"Re-fetching segment {segment.name} [{check.reason}]"
+                    )
+                    pbar.update(-1)
+                    CACHE.forget(cache_key(segment.uri, segment.byterange, ciphers[index]))
+                if not await download_segment_hedged(
+                    hedger,
+                    download_sem,
+                    session,
+                    segment,
+                    "",
+                    pbar,
+                    buffer=buffer,
+                    bandwidth=bandwidth,
+                    cipher=ciphers[index],
+                    budget=budget,
+                ):
+                    raise aiohttp.ServerConnectionError(
+                        f"Unable to download segment {segment.name}"
+                    )
+                # Checked before it is written, since appended bytes cannot be replaced
+                check = await asyncio.to_thread(
+                    check_segment_data,
+                    SegmentCheck(name=segment.name),
+                    buffer,
+                    segment.duration,
+                )
+                if not check.hard:
                     break
+            else:
+                raise OSError(
+                    f"Segment {segment.name} still broken after {verify_rounds} re-fetches [{check.reason}]"
+                )
+            if not check.ok:
+                GatherLog.warning(
+                    f"Segment {segment.name} failed verification [{check.reason}]"
+                )
+            await writer.put(index, buffer)
+        except Exception as e:
+            await writer.fail(e)
+            raise
 
-                if duration_match := duration_pattern.search(line):
-                    DownloadLog.debug(
-                        f"[{line = }] Line matched { duration_pattern = }"
+    await writer.open()
+    pbar = progress or BOARD.job(os.path.basename(output_file))
+    pbar.set_stage("stream", total=len(segments), unit="seg")
+    pbar.update(start_index)
+    try:
+        tasks = [
+            asyncio.create_task(fetch(index, segment, pbar))
+            for index, segment in enumerate(segments)
+            if index >= start_index
+        ]
+        try:
+            if follow is not None:
+                async for segment in follow:
+                    raise_first_failure(tasks)
+                    segments.append(segment)
+                    ciphers.append(await segment_cipher(session, segment))
+                    pbar.total += 1
+                    tasks.append(
+                        asyncio.create_task(fetch(len(segments) - 1, segment, pbar))
                     )
-                    h, m, s, ms = map(int, duration_match.groups())
-                    total = h * 3600 + m * 60 + s + ms / 100
-                    DownloadLog.info(f"Total duration found: {total =}")
-                    pbar.total = total
-
-                if line_match := pattern.match(line):
-                    DownloadLog.debug(f"[{line =}] Line matched { pattern = }")
-                    h, m, s, ms = map(int, line_match.groups())
-                    elapsed = h * 3600 + m * 60 + s + ms / 100
-                    DownloadLog.info(f"Elapsed: { elapsed = }")
-                    pbar.n = min(elapsed, pbar.total or elapsed)
-                    pbar.refresh()
-
-            if pbar.n < (pbar.total or 0):
-                DownloadLog.debug(f'Progress bar "n" is less...')
-                pbar.update(pbar.total - pbar.n)
-        await process.wait()
-
-        if process.returncode != 0:
-            stderr_remaining = await process.stderr.read()
-            err_msg = stderr_remaining.decode(errors="ignore")
-            Log.error(
-                f"[FFmpeg Error] Download failed for {video_title}:\n{err_msg[-500:]}"
-            )
-            raise RuntimeError(f"FFmpeg failed for {video_title}")
+            await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    finally:
+        if progress is None:
+            pbar.close()
+        await writer.close()
 
-        end = time.perf_counter()
-        file_size = os.path.getsize(output_file) if os.path.exists(output_file) else 0
-        Log.info(
-            f"[FFmpeg Complete] {video_title} | Size: {file_size} bytes | Time: {round(end - start, 2)}s"
-        )
+    GatherLog.info(
+        f"Streamed {writer.next_index} segments [{writer.bytes_written} bytes] into {output_file=}"
+    )
 
-        return file_size, round(end - start, 2), output_file
+
+# Content types downloaded as one progressive file; anything else is read as a playlist
+PROGRESSIVE_TYPES = frozenset(
+    {
+        "video/mp4",
+        "video/x-m4v",
+        "video/quicktime",
+        "video/webm",
+        "video/x-matroska",
+        "video/x-flv",
+        "video/mp2t",
+        "application/mp4",
+        "application/octet-stream",
+        "binary/octet-stream",
+    }
+)
+
+
+async def read_head(response: aiohttp.ClientResponse, size: int = 64) -> bytes:
+    """Up to the first `size` bytes of the body (fewer only at its end)."""
+    head = b""
+    while len(head) < size:
+        chunk = await response.content.read(size - len(head))
+        if not chunk:
+            break
+        head += chunk
+    return head
 
 
 async def download_video(
@@ -357,14 +1236,25 @@ async def download_video(
     download_dir: str,
     cleanup: bool = True,
     re_encode: bool = False,
+    encode_chunks: int | None = None,
     download_sem_limit: int = 4,
     make_subfolder: bool = True,
     subfoler_name: str = "videos",
+    stream: bool = False,
+    stream_buffer: int = 16,
+    adaptive_concurrency: bool = True,
+    follow: bool = True,
+    ranged_connections: int = 8,
+    ranged_min_size: int = 4 * 1024 * 1024,
+    hedge: bool = True,
+    retry_budget: RetryBudget | None = None,
 ):
+    # Retries happen here, per request, under the policies above
+    session = unwrap_session(session)
+    budget = retry_budget or RetryBudget()
     async with sem:
         video_title = sanitize_filename(video_title)
         download_sem = asyncio.Semaphore(download_sem_limit)
-        random_name = str(uuid4())
         start = time.perf_counter()
 
         if make_subfolder:
@@ -373,6 +1263,19 @@ async def download_video(
                 "videos" if subfoler_name.strip() in [None, ""] else subfoler_name,
             )
 
+        # Same url + title always maps to the same working files, so an
+        # interrupted download picks up where it left off
+        manifest = SegmentManifest.for_video(download_dir, video_url, video_title)
+        bandwidth = GOVERNOR.job(manifest.key)
+        progress = BOARD.job(video_title)
+        # Races segments that run long for their host against a duplicate
+        hedger = Hedger(session) if hedge else None
+        random_name = manifest.key
+
+        def track_out_time(event: FFmpegProgress):
+            if event.out_time is not None:
+                progress.n = event.out_time
+
         # File Setup
         temp_dir = os.path.join(download_dir, "temp_" + random_name)
         segement_infofile = os.path.join(download_dir, f"{random_name}_seginfo.txt")
@@ -380,25 +1283,75 @@ async def download_video(
             download_dir, random_name + "_" + video_title + video_ext
         )
         Log.debug(
-            f"[File Setup] { temp_dir = }; { segement_infofile = }; { output_file_temp = }"
+            f"[File Setup] { temp_dir = }; { segement_infofile = }; { output_file_temp = }; { manifest.path = }"
         )
+        if manifest.segments:
+            Log.info(
+                f"Resuming video: {video_title} [{len(manifest.segments)} segments in manifest]"
+            )
 
-        os.makedirs(temp_dir, exist_ok=True)
-        m3u8_urls = []
+        os.makedirs(download_dir if stream else temp_dir, exist_ok=True)
+        segments: list[HLSSegment] = []
+        merged = False
 
         try:
             GatherLog.info(
                 f"Parsing index for video: {video_title} [ { video_url = } ]"
             )
-            async with session.get(video_url) as m3u8_r:
+            async with await request(
+                session,
+                "GET",
+                video_url,
+                budget=budget,
+                headers=conditional_headers(video_url),
+            ) as m3u8_r:
                 GatherLog.debug(
-                    f"GET: {video_url} [{ m3u8_r.status = }; { m3u8_r.headers['content-type'] = }]"
+                    f"GET: {video_url} [{ m3u8_r.status = }; { m3u8_r.headers.get('content-type') = }]"
                 )
-                m3u8_r.raise_for_status()
-                allowed_types = ("video", "octet", "stream")
-
-                if m3u8_r.content_type in allowed_types:
-                    with tqdm(total=1, unit="file", desc="Downloading...") as pbar:
+                if m3u8_r.status == 304 and (playlist := cached_playlist(video_url)):
+                    GatherLog.debug(f"Playlist not modified, using cached parse [{video_url}]")
+                else:
+                    m3u8_r.raise_for_status()
+                    progressive = media_type(m3u8_r.content_type) in PROGRESSIVE_TYPES
+                    head = b""
+                    if progressive:
+                        # Playlists are often served as octet-stream: trust the bytes, not the type
+                        head = await read_head(m3u8_r)
+                        progressive = not is_playlist(head)
+
+                    if progressive:
+                        # A progressive file: split it over parallel ranges if the server allows
+                        size = int(m3u8_r.headers.get("Content-Length") or 0)
+                        if supports_ranges(m3u8_r.headers) and size >= ranged_min_size:
+                            start = time.perf_counter()
+                            validator = m3u8_r.headers.get("ETag")
+                            if not validator or validator.startswith("W/"):
+                                validator = m3u8_r.headers.get("Last-Modified")
+                            m3u8_r.close()
+                            try:
+                                fp = await download_ranged(
+                                    host_controller(video_url, initial=ranged_connections),
+                                    session,
+                                    video_url,
+                                    output_file_temp,
+                                    size,
+                                    connections=ranged_connections,
+                                    bandwidth=bandwidth,
+                                    validator=validator,
+                                    progress=progress,
+                                    budget=budget,
+                                    manifest=manifest,
+                                )
+                            except RangeIgnored as e:
+                                # What was written may be another version of the file
+                                Log.warning(f"Ranged download abandoned, using one connection [{e}]")
+                                manifest.remove()
+                            else:
+                                manifest.remove()
+                                end = time.perf_counter()
+                                return size, round(end - start, 2), fp
+
+                        progress.set_stage("download", total=1, unit="file")
                         start = time.perf_counter()
                         try:
                             fp = await download_segment(
@@ -406,13 +1359,18 @@ async def download_video(
                                 session=session,
                                 segment_url=video_url,
                                 download_dir=download_dir,
-                                pbar=pbar,
+                                pbar=progress,
                                 file_name=os.path.basename(output_file_temp),
+                                manifest=manifest,
+                                bandwidth=bandwidth,
+                                use_cache=False,
+                                budget=budget,
                             )
                             if not fp:
                                 raise Exception(
                                     "Error Occureed While Downloading. Check Logs"
                                 )
+                            manifest.remove()
                             end = time.perf_counter()
                             size = (
                                 os.path.getsize(fp) if os.path.exists(fp) and fp else 0
@@ -425,209 +1383,199 @@ async def download_video(
                             )
                             raise e
 
-                raw = await m3u8_r.text()
-
-                data = ""
-                for line in raw.splitlines():
-                    if line.startswith("#"):
-                        data += ("\n" if line[0] != "\n" else "") + line
-
-                # Remove trailing slash if present
-                base_url = video_url.rsplit("/", 1)[0] + "/"  # Ensures trailing slash
-                m3u8_urls = []
-
-                for i, line in enumerate(raw.splitlines(), start=1):
-                    line = line.strip()
+                    playlist = load_playlist(
+                        (head + await m3u8_r.read()).decode(m3u8_r.charset or "utf-8")
+                        if head
+                        else await m3u8_r.text(),
+                        video_url,
+                        m3u8_r.headers.get("ETag"),
+                        m3u8_r.headers.get("Last-Modified"),
+                    )
 
-                    if not line or line.startswith("#"):
-                        GatherLog.debug(f"Skipping line {i}: Empty or comment [{line}]")
+            # A master playlist: follow the best variant
+            if playlist.is_master:
+                variant = max(playlist.variants, key=lambda v: v.bandwidth)
+                GatherLog.info(f"Master playlist, using variant {variant.uri}")
+                playlist = await fetch_playlist(session, variant.uri)
 
-                        # Handle init segment (EXT-X-MAP)
-                        if line.startswith("#EXT-X-MAP:"):
-                            match = re.search(r'URI="(.+?)"', line)
-                            if match:
-                                init_path = match.group(1)
-                                full_url = urljoin(base_url, init_path)
-                                segment_name = init_path.split("/")[-1]
-                                GatherLog.debug(
-                                    f"Adding init segment {segment_name} from {full_url}"
-                                )
-                                m3u8_urls.append((segment_name, full_url))
-                        continue
+            segments = list(playlist.segments)
+            GatherLog.info(
+                f"{len(segments)} segments url found for video: {video_title} [{playlist.duration:.1f}s; {playlist.endlist=}]"
+            )
 
-                    # This is a media segment (e.g., .ts)
-                    segment_url = urljoin(base_url, line)
-                    segment_name = f"seg-{i}.ts"
+            # EVENT / live: keep reloading and download new segments as they appear
+            followed = (
+                follow_playlist(session, playlist)
+                if follow and playlist.is_live
+                else None
+            )
+            if followed is not None:
+                GatherLog.info(
+                    f"Following {playlist.playlist_type or 'live'} playlist for video: {video_title} [{playlist.target_duration=}]"
+                )
 
-                    GatherLog.debug(
-                        f"Adding segment {i}: {segment_name} from {segment_url}"
-                    )
-                    m3u8_urls.append((segment_name, segment_url))
+            # EXT-X-KEY: fetch every key once up front; anything but clear or
+            # AES-128 raises here so the caller can fall back to ffmpeg
+            ciphers = await asyncio.gather(
+                *(segment_cipher(session, segment) for segment in segments)
+            )
+            if any(ciphers):
+                GatherLog.info(f"Decrypting AES-128 segments in-process for video: {video_title}")
 
-                GatherLog.info(
-                    f"{len(m3u8_urls)} segments url found for video: {video_title}"
+            # Let the segment host decide how many requests it can take
+            if adaptive_concurrency and segments:
+                download_sem = host_controller(
+                    segments[-1].uri, initial=download_sem_limit
                 )
 
-            # Download all segments
-            with tqdm(
-                total=len(m3u8_urls),
-                position=0,
-                desc="Segment progress",
-                unit="seg",
-                colour="green",
-                dynamic_ncols=True,
-            ) as pbar:
+            if stream:
+                # Anything other than fMP4 -> .mp4 or TS -> .ts needs a remux
+                pipe_to_ffmpeg = not (
+                    (playlist.is_fmp4 and video_ext.lower() in (".mp4", ".m4v"))
+                    or (not playlist.is_fmp4 and video_ext.lower() == ".ts")
+                )
+                await stream_segments(
+                    download_sem,
+                    session,
+                    segments,
+                    output_file_temp,
+                    manifest,
+                    pipe_to_ffmpeg=pipe_to_ffmpeg,
+                    max_buffered=stream_buffer,
+                    bandwidth=bandwidth,
+                    ciphers=ciphers,
+                    follow=followed,
+                    progress=progress,
+                    hedger=hedger,
+                    budget=budget,
+                )
+            else:
+                # Download all segments
+                progress.set_stage("download", total=len(segments), unit="seg")
                 tasks = []
                 filenames = []
-                for name, link in m3u8_urls:
+
+                def schedule(segment: HLSSegment, cipher):
                     tasks.append(
                         asyncio.create_task(
-                            download_segment(
+                            download_segment_hedged(
+                                hedger,
                                 download_sem,
                                 session,
-                                link,
+                                segment,
                                 temp_dir,
-                                pbar,
-                                file_name=name,
+                                progress,
+                                manifest=manifest,
+                                bandwidth=bandwidth,
+                                cipher=cipher,
+                                budget=budget,
                             )
                         )
                     )
-                    filenames.append(os.path.join(temp_dir, name))
+                    filenames.append(os.path.join(temp_dir, segment.name))
 
-                await asyncio.gather(*tasks)
+                for segment, cipher in zip(segments, ciphers):
+                    schedule(segment, cipher)
 
-            # Create the segmentInfo.txt file with correct formating
-            with open(segement_infofile, "w") as file:
-                file.write(
-                    "\n".join(
-                        [f'file \'{a.replace("\\", "/")}\'' for a in filenames if a]
-                    )
+                try:
+                    if followed is not None:
+                        async for segment in followed:
+                            segments.append(segment)
+                            ciphers.append(await segment_cipher(session, segment))
+                            progress.total += 1
+                            schedule(segment, ciphers[-1])
+                finally:
+                    await asyncio.gather(*tasks)
+
+                # Check every segment before muxing; only the bad ones are fetched again
+                await repair_segments(
+                    download_sem,
+                    session,
+                    segments,
+                    ciphers,
+                    temp_dir,
+                    manifest,
+                    progress,
+                    bandwidth=bandwidth,
+                    budget=budget,
                 )
 
-            # Concate (e.g. combine) all segments
-            command = [
-                "ffmpeg",
-                "-f",
-                "concat",
-                "-safe",
-                "0",
-                "-i",
-                os.path.abspath(segement_infofile),
-                "-c",
-                "copy",
-                "-y",
-                "-hide_banner",
-                "-loglevel",
-                "debug",
-                "-fflags",
-                "+genpts",
-                os.path.abspath(output_file_temp),
-            ]
-            ConcatLog.info(
-                f"Concating segments for video: {video_title} [{ command = }]"
-            )
-            proccess = await asyncio.create_subprocess_exec(
-                *command, stderr=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE
-            )
-
-            # Progress bar
-            total_files = len(
-                [
-                    file
-                    for file in open(segement_infofile, "r").read().splitlines()
-                    if file.startswith("file")
-                ]
-            )
-            line_match_pattern = re.compile(
-                r"\[concat\s+?@\s+?(\w)+\]\s+?file:(\d+)\s+?stream:\d+?\s+?pts:\d+\s+?"
-            )
-
-            with tqdm(
-                total=total_files,
-                desc="Concatenating",
-                unit="file",
-                unit_divisor=10,
-                unit_scale=False,
-            ) as concate_bar:
-                while True:
-                    line = await proccess.stderr.readline()
-                    if not line:
-                        break
-
-                    line_match = line_match_pattern.match(line.decode(errors="ignore"))
-                    if line_match:
-                        try:
-                            file_no = int(line_match.group(2)) - concate_bar.n
-                            concate_bar.update(file_no + 1)
-                        except Exception as e:
-                            ConcatLog.error(
-                                f'Unable to gather file no from "{line.decode(errors='ignore').replace('\n', '\\n')}": {e}'
-                            )
-                            concate_bar.update(1)
-
-            await proccess.wait()
-
-            if proccess.returncode != 0:
-                ConcatLog.error(
-                    f"Error occurred during concat for video {video_title}: \n{(await proccess.stderr.read()).decode(errors='ignore')[:-200]}\n"
-                )
-                raise OSError("Unable to Concate file!")
-            else:
-                ConcatLog.info(f"Concat successful for video: {video_title}")
+                # Create the segmentInfo.txt file with correct formating
+                with open(segement_infofile, "w") as file:
+                    file.write(
+                        "\n".join(
+                            [f'file \'{a.replace("\\", "/")}\'' for a in filenames if a]
+                        )
+                    )
 
-            # Re-encode for smoother playback if 're_encode'
-            output_file = os.path.join(download_dir, video_title + video_ext)
-            if re_encode:
+                # Concate (e.g. combine) all segments
                 command = [
-                    "ffmpeg",
+                    "-f",
+                    "concat",
+                    "-safe",
+                    "0",
                     "-i",
-                    output_file_temp,
-                    "-hide_banner",
-                    "-c:v",
-                    "libx264",
-                    "-vf",
-                    '"format=yuv420p"',
-                    "-preset",
-                    "medium",
-                    "-c:a",
-                    "aac",
-                    "-b:a",
-                    "192k",
-                    output_file,
+                    os.path.abspath(segement_infofile),
+                    "-c",
+                    "copy",
+                    "-y",
+                    "-fflags",
+                    "+genpts",
+                    os.path.abspath(output_file_temp),
                 ]
-                ConcatLog.info(f"Re-encoding video: {video_title} [ { command = } ]")
-                proccess = await asyncio.create_subprocess_exec(
-                    *command,
-                    stderr=asyncio.subprocess.PIPE,
-                    stdout=asyncio.subprocess.PIPE,
+                ConcatLog.info(
+                    f"Concating segments for video: {video_title} [{ command = }]"
+                )
+
+                # Progress bar, in seconds of output against the playlist's duration
+                progress.set_stage(
+                    "concat",
+                    total=sum(segment.duration for segment in segments) or None,
+                    unit="sec",
                 )
-                _, stderr = await proccess.communicate()
 
-                if proccess.returncode != 0:
+                try:
+                    await run_ffmpeg(command, track_out_time)
+                except FFmpegError as e:
                     ConcatLog.error(
-                        f"Error occurred during re-encoding for video {video_title}: {stderr.decode()}"
+                        f"Error occurred during concat for video {video_title}: \n{e.stderr}\n"
                     )
-                else:
-                    ConcatLog.info(f"Re-encoding successful for video: {video_title}")
-            else:
-                if not os.path.exists(output_file):
-                    os.rename(output_file_temp, output_file)
+                    raise OSError("Unable to Concate file!") from e
+                ConcatLog.info(f"Concat successful for video: {video_title}")
+
+            # Re-encode for smoother playback if 're_encode': queued on the
+            # post-processing pool once this download's slot is released
+            output_file = os.path.join(download_dir, video_title + video_ext)
+            merged = True
+            if not re_encode and not os.path.exists(output_file):
+                os.rename(output_file_temp, output_file)
 
         except Exception as e:
             Log.error(f"Error processing video {video_title}: {str(e)}")
             raise
         finally:
-            # Cleanup the temp files if 'cleanup'
-            if cleanup and os.path.exists(
-                os.path.join(download_dir, video_title + video_ext)
+            bandwidth.close()
+            progress.close()
+            if hedger is not None:
+                await hedger.close()
+            Log.info(
+                f"[Bandwidth] {video_title}: {bandwidth.meter.total} bytes at {bandwidth.meter.average:.0f} B/s average"
+            )
+
+            # Cleanup the temp files if 'cleanup' (the merged file waits for its re-encode)
+            if cleanup and (
+                os.path.exists(os.path.join(download_dir, video_title + video_ext))
+                or (re_encode and merged)
             ):
                 Log.info(
                     f"Cleaning temp files for video: {video_title} [{ temp_dir = }; { segement_infofile = }; { output_file_temp = }]"
                 )
                 try:
                     shutil.rmtree(temp_dir, True)
-                    os.remove(segement_infofile)
-                    if os.path.exists(output_file_temp):
+                    manifest.remove()
+                    if os.path.exists(segement_infofile):
+                        os.remove(segement_infofile)
+                    if os.path.exists(output_file_temp) and not re_encode:
                         os.remove(output_file_temp)
                     Log.info(f"Cleanup successful for video: {video_title}")
                 except Exception as e:
@@ -635,15 +1583,30 @@ async def download_video(
                         f"Error occurred during cleanup for video {video_title}: {e}"
                     )
             else:
+                manifest.close()
                 Log.info(f"Skipping cleaning temp files for video: {video_title}")
 
-        end = time.perf_counter()
-        duration = round(end - start, 2)
-        file_size = os.path.getsize(output_file) if os.path.exists(output_file) else 0
-        Log.info(
-            f"Completed processing video: {video_title} | Size: {file_size} bytes | Took: {duration} seconds"
-        )
-        return file_size, duration, output_file
+    if re_encode and merged:
+        if await reencode_video(
+            output_file_temp,
+            output_file,
+            video_title,
+            sum(segment.duration for segment in segments) or None,
+            encode_chunks,
+        ):
+            if cleanup:
+                os.remove(output_file_temp)
+        elif not os.path.exists(output_file):
+            # Keep the video as downloaded rather than nothing
+            os.rename(output_file_temp, output_file)
+
+    end = time.perf_counter()
+    duration = round(end - start, 2)
+    file_size = os.path.getsize(output_file) if os.path.exists(output_file) else 0
+    Log.info(
+        f"Completed processing video: {video_title} | Size: {file_size} bytes | Took: {duration} seconds"
+    )
+    return file_size, duration, output_file
 
 
 def parse_arguments() -> list[str | Any | None]:
@@ -0,0 +1,134 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Callable
+from pydantic import BaseModel, Field
+
+
+class FFmpegProgress(BaseModel):
+    frame: int | None = Field(default=None, description="Frames written so far")
+    fps: float | None = Field(default=None)
+    bitrate: str | None = Field(default=None, description="e.g. 1024.5kbits/s")
+    total_size: int | None = Field(default=None, description="Bytes written to the output")
+    out_time: float | None = Field(default=None, description="Output position in seconds")
+    speed: float | None = Field(default=None, description="Multiple of realtime")
+    done: bool = Field(default=False, description="ffmpeg reported progress=end")
+
+
+class FFmpegError(RuntimeError):
+    def __init__(self, returncode: int, stderr: str):
+        super().__init__(f"ffmpeg exited with {returncode}: {stderr[-500:]}")
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+def _number(value: str | None, cast=float):
+    try:
+        return cast(value) if value not in (None, "", "N/A") else None
+    except ValueError:
+        return None
+
+
+def parse_progress(fields: dict[str, str]) -> FFmpegProgress:
+    """One block of `-progress` output (key=value lines up to `progress=`)."""
+    out_time_us = _number(fields.get("out_time_us"), int)
+    return FFmpegProgress(
+        frame=_number(fields.get("frame"), int),
+        fps=_number(fields.get("fps")),
+        bitrate=fields.get("bitrate") if fields.get("bitrate") != "N/A" else None,
+        total_size=_number(fields.get("total_size"), int),
+        out_time=out_time_us / 1_000_000 if out_time_us is not None else None,
+        speed=_number(fields.get("speed", "").rstrip("x")),
+        done=fields.get("progress") == "end",
+    )
+
+
+class FFmpegProcess:
+    """
+    ffmpeg run with `-progress pipe:1 -nostats -loglevel error`: progress
+    arrives as small key=value blocks on stdout and stderr only carries
+    errors, of which the last `tail_lines` are kept for the exception.
+    """
+
+    def __init__(self, args: list[str], stdin: bool = False, tail_lines: int = 50):
+        self.command = [
+            "ffmpeg",
+            "-hide_banner",
+            "-nostats",
+            "-loglevel",
+            "error",
+            "-progress",
+            "pipe:1",
+            *([] if stdin else ["-nostdin"]),
+            *args,
+        ]
+        self.stdin = stdin
+        self.process: asyncio.subprocess.Process | None = None
+        self.stderr_tail: deque[str] = deque(maxlen=tail_lines)
+        self.last: FFmpegProgress | None = None
+        self._stderr_task: asyncio.Task | None = None
+
+    async def start(self) -> "FFmpegProcess":
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE if self.stdin else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        # Always drained, so a chatty error can never fill the pipe and stall ffmpeg
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+        return self
+
+    async def _drain_stderr(self):
+        while line := await self.process.stderr.readline():
+            self.stderr_tail.append(line.decode(errors="ignore").rstrip())
+
+    async def progress(self) -> AsyncIterator[FFmpegProgress]:
+        fields: dict[str, str] = {}
+        while line := await self.process.stdout.readline():
+            key, _, value = line.decode(errors="ignore").strip().partition("=")
+            if not key:
+                continue
+            fields[key] = value
+            if key == "progress":
+                self.last = parse_progress(fields)
+                fields = {}
+                yield self.last
+
+    async def wait(self) -> int:
+        """Waits for ffmpeg to exit; raises `FFmpegError` if it failed."""
+        # Anything left on stdout has to be read or ffmpeg may block on exit
+        async for _ in self.progress():
+            pass
+        await self.process.wait()
+        await self._stderr_task
+        if self.process.returncode != 0:
+            raise FFmpegError(self.process.returncode, "\n".join(self.stderr_tail))
+        return self.process.returncode
+
+    def kill(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+
+
+async def run_ffmpeg(
+    args: list[str],
+    on_progress: Callable[[FFmpegProgress], None] | None = None,
+    on_start: Callable[[FFmpegProcess], None] | None = None,
+) -> FFmpegProgress | None:
+    """
+    Runs ffmpeg with `args` (everything after the binary and the global
+    logging/progress options), calling `on_progress` for every progress
+    block. Returns the last block, or raises `FFmpegError`.
+    """
+    ffmpeg = await FFmpegProcess(args).start()
+    try:
+        if on_start is not None:
+            on_start(ffmpeg)
+        async for event in ffmpeg.progress():
+            if on_progress is not None:
+                on_progress(event)
+        await ffmpeg.wait()
+    except BaseException:
+        ffmpeg.kill()
+        raise
+    return ffmpeg.last
@@ -0,0 +1,166 @@
+import time
+import asyncio
+import aiohttp
+from collections import deque
+from typing import Awaitable, Callable
+from urllib.parse import urlparse
+
+
+class HostLatency:
+    """Recent segment download times and hedging spend for one host."""
+
+    def __init__(self, samples: int = 256):
+        self.samples: deque[float] = deque(maxlen=samples)
+        self.primary_bytes = 0
+        self.hedge_bytes = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record(self, elapsed: float):
+        self.samples.append(elapsed)
+
+    def percentile(self, q: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# Latency learned per CDN host, shared by every video in the run
+HOST_LATENCY: dict[str, HostLatency] = {}
+
+
+def host_latency(url: str) -> HostLatency:
+    host = urlparse(url).hostname or url
+    if host not in HOST_LATENCY:
+        HOST_LATENCY[host] = HostLatency()
+    return HOST_LATENCY[host]
+
+
+class SilentProgress:
+    """Passes a hedge's bytes and retries to the job but not its completion."""
+
+    def __init__(self, job):
+        self.job = job
+
+    def update(self, n: float = 1):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self.job, name)
+
+
+class Hedger:
+    """
+    Races a slow request against a duplicate.
+
+    Once a request has been running longer than the `percentile` of recent
+    download times for its host (after `min_samples` have been seen), the
+    same request is started again on a fresh connection and whichever
+    finishes first wins; the other is cancelled. Hedges are capped at
+    `max_hedges` in flight and at `extra_bytes_ratio` of the bytes the
+    host has delivered, counting what cancelled requests had already read.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        min_delay: float = 0.5,
+        extra_bytes_ratio: float = 0.05,
+        max_hedges: int = 4,
+    ):
+        self.session = session
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.extra_bytes_ratio = extra_bytes_ratio
+        self.max_hedges = max_hedges
+        self.in_flight = 0
+        self._hedge_session: aiohttp.ClientSession | None = None
+
+    def delay(self, stats: HostLatency) -> float | None:
+        """How long to wait before hedging, None to never hedge (yet)."""
+        if len(stats.samples) < self.min_samples:
+            return None
+        return max(self.min_delay, stats.percentile(self.percentile))
+
+    def may_hedge(self, stats: HostLatency) -> bool:
+        return (
+            self.in_flight < self.max_hedges
+            and stats.hedge_bytes < stats.primary_bytes * self.extra_bytes_ratio
+        )
+
+    def hedge_session(self) -> aiohttp.ClientSession:
+        """Same headers and cookies, but never a pooled (possibly stuck) connection."""
+        if self._hedge_session is None or self._hedge_session.closed:
+            self._hedge_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(force_close=True),
+                headers=self.session.headers,
+                cookie_jar=self.session.cookie_jar,
+            )
+        return self._hedge_session
+
+    def account(self, url: str, nbytes: int, hedge_bytes: int = 0):
+        stats = host_latency(url)
+        stats.primary_bytes += nbytes
+        stats.hedge_bytes += hedge_bytes
+
+    async def race(
+        self,
+        url: str,
+        primary: Callable[[asyncio.Event], Awaitable[str]],
+        hedge: Callable[[aiohttp.ClientSession], Awaitable[str]],
+    ) -> str | None:
+        """
+        Runs `primary(started)` (which sets `started` once its request is
+        actually sent, so queueing does not count) and, if it is slow,
+        `hedge(session)`. Returns "primary" or "hedge" for the one that
+        produced a result, or None if neither did.
+        """
+        stats = host_latency(url)
+        started = asyncio.Event()
+        primary_task = asyncio.create_task(primary(started))
+        hedge_task = None
+        tasks = {primary_task}
+        try:
+            waiter = asyncio.create_task(started.wait())
+            await asyncio.wait({primary_task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            begin = time.monotonic()
+
+            if (delay := self.delay(stats)) is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self.may_hedge(stats):
+                    hedge_task = asyncio.create_task(hedge(self.hedge_session()))
+                    tasks.add(hedge_task)
+                    self.in_flight += 1
+                    stats.hedges += 1
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if not task.exception() and task.result():
+                        stats.record(time.monotonic() - begin)
+                        if task is hedge_task:
+                            stats.hedge_wins += 1
+                            return "hedge"
+                        return "primary"
+            if primary_task.exception():
+                raise primary_task.exception()
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if hedge_task is not None:
+                self.in_flight -= 1
+
+    async def close(self):
+        if self._hedge_session is not None:
+            await self._hedge_session.close()
+            self._hedge_session = None
@@ -0,0 +1,329 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from urllib.parse import urljoin, urlparse
+from pydantic import BaseModel, Field
+
+from .retry import request
+
+GatherLog = logging.getLogger("gathering_segments")
+
+
+class HLSKey(BaseModel):
+    method: str = Field(default="NONE", description="AES-128, SAMPLE-AES or NONE")
+    uri: str | None = Field(default=None, description="Absolute key url")
+    iv: str | None = Field(default=None, description="IV as a 0x prefixed hex string")
+    keyformat: str = Field(default="identity", description="KEYFORMAT attribute")
+
+
+class HLSSegment(BaseModel):
+    sequence: int = Field(..., description="Media sequence number (-1 for init sections)")
+    uri: str = Field(..., description="Absolute segment url")
+    name: str = Field(..., description="File name the segment is saved under")
+    duration: float = Field(default=0.0, description="EXTINF duration in seconds")
+    title: str = Field(default="", description="EXTINF title")
+    byterange: tuple[int, int] | None = Field(
+        default=None, description="(length, offset) from EXT-X-BYTERANGE"
+    )
+    key: HLSKey | None = Field(default=None, description="Key the segment is encrypted with")
+    discontinuity: bool = Field(
+        default=False, description="Preceded by EXT-X-DISCONTINUITY"
+    )
+    is_init: bool = Field(default=False, description="EXT-X-MAP init section")
+
+
+class HLSVariant(BaseModel):
+    uri: str = Field(..., description="Absolute media playlist url")
+    bandwidth: int = Field(default=0, description="BANDWIDTH attribute")
+    resolution: str | None = Field(default=None, description="e.g. 1920x1080")
+    attributes: dict = Field(default_factory=dict, description="All STREAM-INF attributes")
+
+
+class HLSPlaylist(BaseModel):
+    url: str = Field(..., description="Url the playlist was loaded from")
+    version: int = Field(default=1)
+    target_duration: float = Field(default=0.0)
+    media_sequence: int = Field(default=0)
+    playlist_type: str | None = Field(default=None, description="VOD, EVENT or None")
+    endlist: bool = Field(default=False, description="EXT-X-ENDLIST was seen")
+    segments: list[HLSSegment] = Field(
+        default_factory=list,
+        description="Init sections and media segments in playlist order",
+    )
+    variants: list[HLSVariant] = Field(
+        default_factory=list, description="Variant streams of a master playlist"
+    )
+
+    @property
+    def media_segments(self) -> list[HLSSegment]:
+        return [segment for segment in self.segments if not segment.is_init]
+
+    @property
+    def is_fmp4(self) -> bool:
+        return any(segment.is_init for segment in self.segments)
+
+    @property
+    def duration(self) -> float:
+        return sum(segment.duration for segment in self.segments)
+
+    @property
+    def is_master(self) -> bool:
+        return bool(self.variants)
+
+    @property
+    def is_live(self) -> bool:
+        """More segments may still be appended (EVENT or live, no ENDLIST yet)."""
+        return not self.endlist and self.playlist_type != "VOD" and not self.is_master
+
+
+_attribute_regex = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+def parse_attributes(value: str) -> dict[str, str]:
+    """Parses an HLS attribute list (`A=1,B="x,y"`), unquoting string values."""
+    return {
+        name: raw[1:-1] if raw.startswith('"') else raw
+        for name, raw in _attribute_regex.findall(value)
+    }
+
+
+def is_playlist(head: bytes) -> bool:
+    """True if a body starting with `head` is an M3U8 playlist, whatever its Content-Type."""
+    return head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"#EXTM3U")
+
+
+def _parse_byterange(value: str, previous_end: int) -> tuple[int, int]:
+    length, _, offset = value.partition("@")
+    return int(length), int(offset) if offset else previous_end
+
+
+def _extension(uri: str, default: str = ".ts") -> str:
+    return os.path.splitext(urlparse(uri).path)[1] or default
+
+
+def parse_playlist(text: str, url: str) -> HLSPlaylist:
+    """
+    Parses a media (or master) playlist in a single pass over its lines.
+
+    Tags that describe the next segment (EXTINF, EXT-X-BYTERANGE,
+    EXT-X-DISCONTINUITY) are held until its URI line; EXT-X-KEY and
+    EXT-X-MAP apply to every segment after them.
+    """
+    playlist = HLSPlaylist(url=url)
+
+    duration, title = 0.0, ""
+    byterange = None
+    discontinuity = False
+    key: HLSKey | None = None
+    previous_end = 0
+    variant_attributes = None
+    sequence = None
+    init_count = 0
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        if line[0] != "#":
+            uri = urljoin(url, line)
+            if variant_attributes is not None:
+                playlist.variants.append(
+                    HLSVariant(
+                        uri=uri,
+                        bandwidth=int(variant_attributes.get("BANDWIDTH", 0) or 0),
+                        resolution=variant_attributes.get("RESOLUTION"),
+                        attributes=variant_attributes,
+                    )
+                )
+                variant_attributes = None
+                continue
+
+            if sequence is None:
+                sequence = playlist.media_sequence
+            playlist.segments.append(
+                HLSSegment(
+                    sequence=sequence,
+                    uri=uri,
+                    name=f"seg-{sequence}{_extension(uri)}",
+                    duration=duration,
+                    title=title,
+                    byterange=byterange,
+                    key=key,
+                    discontinuity=discontinuity,
+                )
+            )
+            if byterange:
+                previous_end = byterange[1] + byterange[0]
+            sequence += 1
+            duration, title = 0.0, ""
+            byterange = None
+            discontinuity = False
+            continue
+
+        tag, _, value = line.partition(":")
+        if tag == "#EXTINF":
+            raw_duration, _, title = value.partition(",")
+            duration = float(raw_duration or 0)
+        elif tag == "#EXT-X-BYTERANGE":
+            byterange = _parse_byterange(value, previous_end)
+        elif tag == "#EXT-X-KEY":
+            attributes = parse_attributes(value)
+            method = attributes.get("METHOD", "NONE")
+            key = (
+                None
+                if method == "NONE"
+                else HLSKey(
+                    method=method,
+                    uri=urljoin(url, attributes["URI"]) if "URI" in attributes else None,
+                    iv=attributes.get("IV"),
+                    keyformat=attributes.get("KEYFORMAT", "identity"),
+                )
+            )
+        elif tag == "#EXT-X-MAP":
+            attributes = parse_attributes(value)
+            if "URI" in attributes:
+                uri = urljoin(url, attributes["URI"])
+                init_count += 1
+                playlist.segments.append(
+                    HLSSegment(
+                        sequence=-1,
+                        uri=uri,
+                        name=f"init-{init_count}{_extension(uri, '.mp4')}",
+                        byterange=(
+                            _parse_byterange(attributes["BYTERANGE"], 0)
+                            if "BYTERANGE" in attributes
+                            else None
+                        ),
+                        key=key,
+                        is_init=True,
+                    )
+                )
+        elif tag == "#EXT-X-DISCONTINUITY":
+            discontinuity = True
+        elif tag == "#EXT-X-TARGETDURATION":
+            playlist.target_duration = float(value)
+        elif tag == "#EXT-X-MEDIA-SEQUENCE":
+            playlist.media_sequence = int(value)
+        elif tag == "#EXT-X-PLAYLIST-TYPE":
+            playlist.playlist_type = value.strip()
+        elif tag == "#EXT-X-VERSION":
+            playlist.version = int(value)
+        elif tag == "#EXT-X-ENDLIST":
+            playlist.endlist = True
+        elif tag == "#EXT-X-STREAM-INF":
+            variant_attributes = parse_attributes(value)
+
+    return playlist
+
+
+# Parsed playlists by url, with the validators they were served with
+_CACHE: OrderedDict[str, tuple[str | None, str | None, HLSPlaylist]] = OrderedDict()
+CACHE_SIZE = 128
+
+
+def cached_playlist(url: str) -> HLSPlaylist | None:
+    if url in _CACHE:
+        _CACHE.move_to_end(url)
+        return _CACHE[url][2]
+    return None
+
+
+def conditional_headers(url: str) -> dict[str, str]:
+    """Headers that let the server answer 304 if the cached copy is current."""
+    if url not in _CACHE:
+        return {}
+    etag, last_modified, _ = _CACHE[url]
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def load_playlist(
+    text: str, url: str, etag: str | None = None, last_modified: str | None = None
+) -> HLSPlaylist:
+    """Parses `text`, reusing the cached parse when the ETag has not changed."""
+    if etag and url in _CACHE and _CACHE[url][0] == etag:
+        return cached_playlist(url)
+
+    playlist = parse_playlist(text, url)
+    if etag or last_modified:
+        _CACHE[url] = (etag, last_modified, playlist)
+        _CACHE.move_to_end(url)
+        while len(_CACHE) > CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return playlist
+
+
+async def fetch_playlist(session, url: str, **kwargs) -> HLSPlaylist:
+    headers = {**conditional_headers(url), **kwargs.pop("headers", {})}
+    async with await request(session, "GET", url, headers=headers, **kwargs) as r:
+        if r.status == 304 and (playlist := cached_playlist(url)):
+            return playlist
+        r.raise_for_status()
+        return load_playlist(
+            await r.text(), url, r.headers.get("ETag"), r.headers.get("Last-Modified")
+        )
+
+
+async def follow_playlist(
+    session, playlist: HLSPlaylist, idle_timeout: float | None = None, **kwargs
+):
+    """
+    Yields the segments appended to a live or EVENT `playlist` after the
+    snapshot given, reloading it until EXT-X-ENDLIST.
+
+    Reloads follow RFC 8216 6.3.4: one target duration after the previous
+    load, or half of one when nothing changed. Segments are matched by
+    media sequence number, so a sliding live window never yields a segment
+    twice. Stops after `idle_timeout` seconds without a new segment (six
+    target durations by default), like an ENDLIST: a stalled stream still
+    ends up with the segments it had.
+    """
+    last_sequence = max(
+        (segment.sequence for segment in playlist.media_segments),
+        default=playlist.media_sequence - 1,
+    )
+    inits = {(s.uri, s.byterange) for s in playlist.segments if s.is_init}
+    target = playlist.target_duration or 2.0
+    idle_timeout = idle_timeout if idle_timeout is not None else target * 6
+    delay = target
+    last_new = time.monotonic()
+
+    while not playlist.endlist:
+        await asyncio.sleep(delay)
+        loaded = time.monotonic()
+        playlist = await fetch_playlist(session, playlist.url, **kwargs)
+        target = playlist.target_duration or target
+
+        new = False
+        for segment in playlist.segments:
+            if segment.is_init:
+                if (segment.uri, segment.byterange) in inits:
+                    continue
+                inits.add((segment.uri, segment.byterange))
+                # Names restart at init-1 on every parse; keep them unique
+                segment = segment.model_copy(
+                    update={"name": f"init-{len(inits)}{_extension(segment.uri, '.mp4')}"}
+                )
+            elif segment.sequence > last_sequence:
+                last_sequence = segment.sequence
+                new = True
+            else:
+                continue
+            yield segment
+
+        if new:
+            last_new = loaded
+        elif loaded - last_new > idle_timeout:
+            GatherLog.warning(
+                f"No new segments in {playlist.url} for {loaded - last_new:.0f}s, ending the follow"
+            )
+            return
+        delay = max(0.0, (target if new else target / 2) - (time.monotonic() - loaded))
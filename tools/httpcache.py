@@ -0,0 +1,368 @@
+import os
+import json
+import time
+import zlib
+import asyncio
+import hashlib
+import threading
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlparse
+
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from .retry import RequestContext, unwrap_session
+
+# Seconds each content type is served from disk without asking the server;
+# 0 = revalidate every time. Types not listed are never cached
+DEFAULT_TTLS = {
+    "text/html": 0,
+    "text/plain": 0,
+    "application/json": 0,
+    "application/vnd.apple.mpegurl": 600,
+    "application/x-mpegurl": 600,
+    "audio/mpegurl": 600,
+}
+# Pages and playlists; anything bigger is passed through uncached
+MAX_ENTRY_BYTES = 16 * 1024 * 1024
+# Describe the bytes on the wire, not the decoded body we keep (cookies are not replayed)
+DROPPED_HEADERS = frozenset(
+    {"set-cookie", "content-encoding", "content-length", "transfer-encoding", "connection"}
+)
+
+
+def media_type(content_type: str) -> str:
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+class CacheEntry:
+    """A stored response: its `meta` (url, headers, validators, age) and body."""
+
+    __slots__ = ("meta", "compressed")
+
+    def __init__(self, meta: dict, compressed: bytes):
+        self.meta = meta
+        self.compressed = compressed
+
+    @property
+    def body(self) -> bytes:
+        return zlib.decompress(self.compressed)
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() - self.meta["stored_at"] < self.meta["ttl"]
+
+    def validators(self) -> dict[str, str]:
+        """Headers for a conditional request; empty if the server gave none."""
+        headers = {}
+        if etag := self.meta.get("etag"):
+            headers["If-None-Match"] = etag
+        if last_modified := self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+
+class CachedResponse:
+    """
+    A response served from the cache, with the parts of
+    `aiohttp.ClientResponse` the extractors use.
+    """
+
+    from_cache = True
+    status = 200
+    reason = "OK"
+    ok = True
+    history = ()
+
+    def __init__(self, entry: CacheEntry):
+        self.url = URL(entry.meta["url"])
+        self.headers = CIMultiDictProxy(CIMultiDict(entry.meta["headers"]))
+        self.cookies = SimpleCookie()
+        self._body = entry.body
+
+    @property
+    def content_type(self) -> str:
+        return media_type(self.headers.get("Content-Type", "application/octet-stream"))
+
+    @property
+    def charset(self) -> str | None:
+        for part in self.headers.get("Content-Type", "").split(";")[1:]:
+            name, _, value = part.partition("=")
+            if name.strip().lower() == "charset":
+                return value.strip().strip('"') or None
+        return None
+
+    def raise_for_status(self):
+        pass
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: str | None = None, errors: str = "strict") -> str:
+        return self._body.decode(encoding or self.charset or "utf-8", errors)
+
+    async def json(self, *, encoding: str | None = None, loads=json.loads, **_):
+        return loads(await self.text(encoding))
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        pass
+
+
+class HTTPCache:
+    """
+    On-disk cache of pages and playlists, shared by every session and run.
+
+    Each response is one file under `root`: a JSON line of metadata (url,
+    headers, ETag / Last-Modified, when it was stored and for how long it
+    is fresh) followed by the zlib-compressed body. Fresh entries are
+    served without a request; stale ones are revalidated, so an unchanged
+    page costs a round trip and no body.
+
+    Entries are evicted least recently used first (by mtime, bumped on
+    every hit) once they take more than `max_bytes`. `bypass` refetches
+    everything while still refreshing the cache. Like the segment cache it
+    never fails a request: any OS or decode error is just a miss.
+    """
+
+    def __init__(
+        self,
+        root: str | None = None,
+        max_bytes: int = 256 * 1024**2,
+        ttls: dict[str, int] | None = None,
+        bypass: bool = False,
+    ):
+        self.configure(root, max_bytes, ttls, bypass)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def configure(
+        self,
+        root: str | None,
+        max_bytes: int = 256 * 1024**2,
+        ttls: dict[str, int] | None = None,
+        bypass: bool = False,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttls = {media_type(kind): ttl for kind, ttl in (ttls or DEFAULT_TTLS).items()}
+        self.bypass = bypass
+        self.size = 0
+        self.stats = {"fresh": 0, "revalidated": 0, "fetched": 0}
+        self._loaded = False
+
+    def ttl_for(self, content_type: str) -> int | None:
+        """How long a response of this type stays fresh; None if it is not cached."""
+        kind = media_type(content_type)
+        if kind in self.ttls:
+            return self.ttls[kind]
+        return self.ttls.get(kind.split("/", 1)[0] + "/*")
+
+    @staticmethod
+    def key(method: str, url: str, params=None) -> str:
+        if params:
+            url += ("&" if "?" in url else "?") + urlencode(sorted(dict(params).items()))
+        return hashlib.sha256(f"{method.upper()} {url}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _load(self):
+        if self._loaded:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        self.size = sum(
+            entry.stat().st_size
+            for folder in os.scandir(self.root)
+            if folder.is_dir()
+            for entry in os.scandir(folder.path)
+        )
+        self._loaded = True
+
+    def lookup(self, key: str) -> CacheEntry | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            try:
+                self._load()
+                path = self._path(key)
+                with open(path, "rb") as file:
+                    meta = json.loads(file.readline())
+                    compressed = file.read()
+                os.utime(path)
+                return CacheEntry(meta, compressed)
+            except (OSError, ValueError):
+                return None
+
+    def _write(self, key: str, entry: CacheEntry) -> bool:
+        with self._lock:
+            try:
+                self._load()
+                path = self._path(key)
+                old = os.path.getsize(path) if os.path.exists(path) else 0
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + ".tmp", "wb") as file:
+                    file.write(json.dumps(entry.meta).encode("utf-8") + b"\n")
+                    file.write(entry.compressed)
+                os.replace(path + ".tmp", path)
+                self.size += os.path.getsize(path) - old
+                self._evict()
+                return True
+            except OSError:
+                return False
+
+    def store(self, key: str, url: str, headers, body: bytes) -> bool:
+        """Adds a 200 response; False if its type, size, Cache-Control or missing validators rule it out."""
+        if not self.enabled or len(body) > MAX_ENTRY_BYTES:
+            return False
+        ttl = self.ttl_for(headers.get("Content-Type", ""))
+        if ttl is None or "no-store" in headers.get("Cache-Control", "").lower():
+            return False
+        # Never fresh and nothing to revalidate with: it would only be refetched
+        if ttl == 0 and not (headers.get("ETag") or headers.get("Last-Modified")):
+            return False
+        meta = {
+            "url": url,
+            "headers": [
+                (name, value) for name, value in headers.items() if name.lower() not in DROPPED_HEADERS
+            ],
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "stored_at": time.time(),
+            "ttl": ttl,
+        }
+        return self._write(key, CacheEntry(meta, zlib.compress(body, 6)))
+
+    def refresh(self, key: str, entry: CacheEntry, headers) -> bool:
+        """The server said 304: the entry is fresh again (with any new validators)."""
+        entry.meta["stored_at"] = time.time()
+        entry.meta["etag"] = headers.get("ETag") or entry.meta.get("etag")
+        entry.meta["last_modified"] = headers.get("Last-Modified") or entry.meta.get("last_modified")
+        return self._write(key, entry)
+
+    def _evict(self):
+        if self.size <= self.max_bytes:
+            return
+        entries = [
+            entry
+            for folder in os.scandir(self.root)
+            if folder.is_dir()
+            for entry in os.scandir(folder.path)
+            if not entry.name.endswith(".tmp")
+        ]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        # Down to 90% of the budget, so every store does not trigger a scan
+        for entry in entries:
+            if self.size <= self.max_bytes * 0.9:
+                break
+            size = entry.stat().st_size
+            os.remove(entry.path)
+            self.size -= size
+
+
+HTTP_CACHE = HTTPCache()
+
+
+def configure_http_cache(
+    root: str | None,
+    max_bytes: int = 256 * 1024**2,
+    ttls: dict[str, int] | None = None,
+    bypass: bool = False,
+):
+    """Enable the shared HTTP cache at `root` (None disables it)."""
+    HTTP_CACHE.configure(root, max_bytes, ttls, bypass)
+
+
+class CachingSession:
+    """
+    Wraps a session (usually a `RetryingSession`) so its GETs go through
+    `HTTP_CACHE`: fresh entries come from disk with no request, stale ones
+    are revalidated with If-None-Match / If-Modified-Since, and cacheable
+    200s are stored. `cache=False` on a request skips the cache for it.
+    Everything else is the wrapped session's.
+    """
+
+    def __init__(self, inner, cache: HTTPCache | None = None):
+        self.inner = inner
+        self.cache = cache or HTTP_CACHE
+
+    @property
+    def session(self):
+        """The plain `aiohttp.ClientSession`, like `RetryingSession.session`."""
+        return unwrap_session(self.inner)
+
+    def request(self, method: str, url: str, *, cache: bool = True, **kwargs) -> RequestContext:
+        return RequestContext(self._request(method, str(url), cache, kwargs))
+
+    def get(self, url: str, **kwargs) -> RequestContext:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> RequestContext:
+        return self.request("POST", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> RequestContext:
+        return self.request("HEAD", url, **kwargs)
+
+    def absolute_url(self, url: str) -> str:
+        if urlparse(url).hostname:
+            return url
+        base = getattr(self.session, "_base_url", None)
+        return str(base.join(URL(url))) if base is not None else url
+
+    async def _request(self, method: str, url: str, cache: bool, kwargs: dict):
+        headers = dict(kwargs.pop("headers", None) or {})
+        if (
+            not cache
+            or not self.cache.enabled
+            or method.upper() != "GET"
+            or "data" in kwargs
+            or "json" in kwargs
+            or any(name.lower() == "range" for name in headers)
+        ):
+            return await self.inner.request(method, url, headers=headers or None, **kwargs)
+
+        key = self.cache.key(method, self.absolute_url(url), kwargs.get("params"))
+        entry = None if self.cache.bypass else await asyncio.to_thread(self.cache.lookup, key)
+        if entry is not None and entry.fresh:
+            self.cache.stats["fresh"] += 1
+            return CachedResponse(entry)
+
+        if entry is not None:
+            headers.update(entry.validators())
+        response = await self.inner.request(method, url, headers=headers or None, **kwargs)
+
+        if response.status == 304 and entry is not None:
+            response.release()
+            self.cache.stats["revalidated"] += 1
+            await asyncio.to_thread(self.cache.refresh, key, entry, response.headers)
+            return CachedResponse(entry)
+
+        self.cache.stats["fetched"] += 1
+        if response.status == 200 and self.cache.ttl_for(response.headers.get("Content-Type", "")) is not None:
+            length = response.content_length
+            if length is None or length <= MAX_ENTRY_BYTES:
+                body = await response.read()
+                await asyncio.to_thread(
+                    self.cache.store, key, str(response.url), response.headers, body
+                )
+        return response
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.inner.close()
@@ -0,0 +1,137 @@
+import os
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+class StructuredMessage:
+    """
+    An event name plus fields, turned into text only when a handler formats
+    the record (on the listener thread), never by the code that logs it.
+    """
+
+    __slots__ = ("event", "fields")
+
+    def __init__(self, event: str, fields: dict):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        if not self.fields:
+            return self.event
+        return f"{self.event} [{'; '.join(f'{k}={v!r}' for k, v in self.fields.items())}]"
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields):
+    """Log `event` with `fields`, doing nothing at all if `level` is disabled."""
+    if logger.isEnabledFor(level):
+        logger.log(level, StructuredMessage(event, fields), stacklevel=2)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Puts records on the queue as they are; formatting is the listener's job."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class RoutingHandler(logging.Handler):
+    """
+    Sends each record to the file of the logger it came from. A file is
+    only opened when its logger writes its first record, and rolls over
+    once it reaches `max_bytes`.
+    """
+
+    def __init__(self, fmt: str, datefmt: str, max_bytes: int, backup_count: int):
+        super().__init__()
+        self.formatter = logging.Formatter(fmt, datefmt)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        # Logger name -> log file path without the date suffix
+        self.routes: dict[str, str] = {}
+        self._handlers: dict[str, logging.Handler] = {}
+
+    def _handler_for(self, name: str) -> logging.Handler | None:
+        if name not in self._handlers:
+            if name not in self.routes:
+                return None
+            prefix = self.routes[name]
+            os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+            now = datetime.now()
+            date_suffix = f"{now.month:02d}-{now.day:02d}-{now.year:02d}-{now.hour:02d}"
+            handler = RotatingFileHandler(
+                f"{prefix}-{date_suffix}.log",
+                maxBytes=self.max_bytes,
+                backupCount=self.backup_count,
+                encoding="utf-8",
+                delay=True,
+            )
+            handler.setFormatter(self.formatter)
+            self._handlers[name] = handler
+        return self._handlers[name]
+
+    def emit(self, record: logging.LogRecord):
+        if handler := self._handler_for(record.name):
+            handler.handle(record)
+
+    def close(self):
+        for handler in self._handlers.values():
+            handler.close()
+        super().close()
+
+
+_QUEUE: queue.SimpleQueue = queue.SimpleQueue()
+_ROUTER: RoutingHandler | None = None
+_LISTENER: QueueListener | None = None
+_LOCK = threading.Lock()
+
+
+def stop_logging():
+    """Drain the queue and close every log file (also runs at exit)."""
+    global _LISTENER
+    with _LOCK:
+        if _LISTENER is not None:
+            _LISTENER.stop()
+            _LISTENER = None
+        if _ROUTER is not None:
+            _ROUTER.close()
+
+
+def setup_queue_loggers(
+    log_path: str,
+    files: dict[str, str],
+    fmt: str,
+    datefmt: str,
+    level: int = logging.DEBUG,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+) -> list[logging.Logger]:
+    """
+    Returns the loggers named in `files` (logger name -> file name prefix),
+    all writing through one queue drained by a single background thread.
+    Calling the loggers only costs a queue put; no file is touched until a
+    logger actually emits.
+    """
+    global _ROUTER, _LISTENER
+    with _LOCK:
+        if _ROUTER is None:
+            _ROUTER = RoutingHandler(fmt, datefmt, max_bytes, backup_count)
+        if _LISTENER is None:
+            _LISTENER = QueueListener(_QUEUE, _ROUTER)
+            _LISTENER.start()
+            atexit.register(stop_logging)
+        _ROUTER.routes.update(
+            {name: os.path.join(log_path, prefix) for name, prefix in files.items()}
+        )
+
+    loggers = []
+    for name in files:
+        logger = logging.getLogger(name)
+        if not any(isinstance(h, DeferredQueueHandler) for h in logger.handlers):
+            logger.addHandler(DeferredQueueHandler(_QUEUE))
+        logger.setLevel(level)
+        loggers.append(logger)
+    return loggers
@@ -0,0 +1,173 @@
+import os
+import json
+import hashlib
+
+
+def manifest_key(video_url: str, video_title: str) -> str:
+    """Stable key for a video, derived from its playlist url and title."""
+    return hashlib.sha1(f"{video_url}\n{video_title}".encode("utf-8")).hexdigest()[:16]
+
+
+class SegmentManifest:
+    """
+    Append-only journal of the segments downloaded for one video.
+
+    Every line is a JSON record for a single segment; the last record of a
+    segment wins when the journal is replayed. Records are flushed as soon as
+    they are written so a crash only ever loses the segment in flight, which
+    is then resumed with a `Range` request.
+    """
+
+    def __init__(self, path: str, key: str, video_url: str, video_title: str):
+        self.path = path
+        self.key = key
+        self.video_url = video_url
+        self.video_title = video_title
+        self.segments: dict[str, dict] = {}
+        self._file = None
+        self._load()
+
+    @classmethod
+    def for_video(cls, download_dir: str, video_url: str, video_title: str):
+        key = manifest_key(video_url, video_title)
+        return cls(
+            os.path.join(download_dir, f"{key}_manifest.jsonl"),
+            key,
+            video_url,
+            video_title,
+        )
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r", encoding="utf-8", errors="ignore") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash; everything before it is valid
+                    continue
+                if name := record.get("name"):
+                    self.segments[name] = record
+
+    def _append(self, record: dict):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.segments[record["name"]] = record
+
+    def get(self, name: str) -> dict | None:
+        return self.segments.get(name)
+
+    def is_complete(self, name: str, path: str) -> bool:
+        """True if the segment was finished and is still fully on disk."""
+        record = self.segments.get(name)
+        if not record or not record.get("done"):
+            return False
+        return os.path.exists(path) and os.path.getsize(path) == record.get("size")
+
+    def resume_offset(self, name: str, path: str) -> int:
+        """Bytes of a partly written segment that can be kept, 0 to start over."""
+        record = self.segments.get(name)
+        if not record or not os.path.exists(path):
+            return 0
+
+        on_disk = os.path.getsize(path)
+        if record.get("done") and on_disk > record.get("size", 0):
+            return 0
+        return on_disk
+
+    def validator(self, name: str) -> str | None:
+        """The value to send as `If-Range` when resuming a segment."""
+        record = self.segments.get(name) or {}
+        etag = record.get("etag")
+        # Weak validators are not allowed in If-Range
+        if etag and not etag.startswith("W/"):
+            return etag
+        return record.get("last_modified")
+
+    def record_start(
+        self, name: str, url: str, etag: str | None, last_modified: str | None
+    ):
+        self._append(
+            {
+                "name": name,
+                "url": url,
+                "done": False,
+                "size": 0,
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+        )
+
+    def record_done(
+        self,
+        name: str,
+        url: str,
+        size: int,
+        etag: str | None,
+        last_modified: str | None,
+    ):
+        self._append(
+            {
+                "name": name,
+                "url": url,
+                "done": True,
+                "size": size,
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+        )
+
+    def record_range(self, url: str, start: int, end: int, total: int, validator: str | None):
+        """Bytes `[start, end)` of a file fetched over parallel ranges are on disk."""
+        self._append(
+            {
+                "name": f"range:{start}",
+                "url": url,
+                "done": end > start,
+                "size": end - start,
+                "start": start,
+                "total": total,
+                "validator": validator,
+            }
+        )
+
+    def ranges(self, url: str, total: int, validator: str | None) -> list[tuple[int, int]]:
+        """
+        The `[start, end)` extents recorded for `url`, merged and sorted; none
+        if they were for another size or version of the file.
+        """
+        extents = []
+        for record in self.segments.values():
+            if "start" not in record or not record.get("done"):
+                continue
+            if (
+                record.get("url") != url
+                or record.get("total") != total
+                or record.get("validator") != validator
+            ):
+                return []
+            extents.append((record["start"], record["start"] + record["size"]))
+
+        merged: list[tuple[int, int]] = []
+        for start, end in sorted(extents):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.segments.clear()
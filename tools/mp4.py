@@ -0,0 +1,196 @@
+import os
+import struct
+
+# Boxes whose payload is a list of boxes; everything else is kept as raw bytes
+CONTAINERS = frozenset(
+    {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"udta", b"edts", b"dinf", b"meta", b"ilst"}
+)
+FREE_BOXES = frozenset({b"free", b"skip"})
+MP4_EXTENSIONS = frozenset({".mp4", ".m4v", ".m4a", ".mov"})
+
+# `data` box type indicators for cover art
+COVER_TYPES = {
+    b"\xff\xd8\xff": 13,  # JPEG
+    b"\x89PNG\r\n\x1a\n": 14,  # PNG
+    b"BM": 27,  # BMP
+}
+
+MAX_UINT32 = 0xFFFFFFFF
+
+
+class MP4Error(ValueError):
+    """The file is not an MP4 this module can edit in place."""
+
+
+class Box:
+    """
+    An MP4 box held in memory. Containers keep their `children` (plus any
+    version/flags `prefix` and trailing bytes `tail`), leaves their `payload`.
+    """
+
+    __slots__ = ("kind", "payload", "children", "prefix", "tail")
+
+    def __init__(
+        self,
+        kind: bytes,
+        payload: bytes = b"",
+        children: list["Box"] | None = None,
+        prefix: bytes = b"",
+        tail: bytes = b"",
+    ):
+        self.kind = kind
+        self.payload = payload
+        self.children = children
+        self.prefix = prefix
+        self.tail = tail
+
+    @classmethod
+    def parse(cls, kind: bytes, data: bytes, start: int, end: int) -> "Box":
+        if kind not in CONTAINERS:
+            return cls(kind, payload=data[start:end])
+        prefix = b""
+        # iTunes-style meta is a full box; QuickTime's goes straight to hdlr
+        if kind == b"meta" and data[start + 4 : start + 8] != b"hdlr":
+            prefix, start = data[start : start + 4], start + 4
+        children, tail_at = parse_boxes(data, start, end)
+        return cls(kind, children=children, prefix=prefix, tail=data[tail_at:end])
+
+    def child(self, kind: bytes) -> "Box | None":
+        return next((box for box in self.children or () if box.kind == kind), None)
+
+    def walk(self):
+        yield self
+        for box in self.children or ():
+            yield from box.walk()
+
+    def to_bytes(self) -> bytes:
+        if self.children is None:
+            body = bytes(self.payload)
+        else:
+            body = self.prefix + b"".join(box.to_bytes() for box in self.children) + self.tail
+        if len(body) + 8 > MAX_UINT32:
+            return struct.pack(">I4sQ", 1, self.kind, len(body) + 16) + body
+        return struct.pack(">I4s", len(body) + 8, self.kind) + body
+
+
+def read_header(data: bytes, pos: int, end: int) -> tuple[bytes, int, int]:
+    """(type, header length, box size) of the box at `pos`."""
+    size, kind = struct.unpack_from(">I4s", data, pos)
+    header = 8
+    if size == 1:
+        (size,) = struct.unpack_from(">Q", data, pos + 8)
+        header = 16
+    elif size == 0:
+        size = end - pos
+    if size < header or pos + size > end:
+        raise MP4Error(f"Corrupt {kind!r} box at {pos} ({size=})")
+    return kind, header, size
+
+
+def parse_boxes(data: bytes, start: int, end: int) -> tuple[list[Box], int]:
+    """The boxes in `data[start:end]` and where the bytes too short for a box begin."""
+    boxes, pos = [], start
+    while pos + 8 <= end:
+        kind, header, size = read_header(data, pos, end)
+        boxes.append(Box.parse(kind, data, pos + header, pos + size))
+        pos += size
+    return boxes, pos
+
+
+def top_level_boxes(f) -> list[tuple[bytes, int, int, int]]:
+    """(type, offset, header length, size) of every top level box in the file."""
+    end = os.fstat(f.fileno()).st_size
+    boxes, pos = [], 0
+    while pos + 8 <= end:
+        f.seek(pos)
+        head = f.read(16)
+        kind, header, size = read_header(head.ljust(16, b"\0"), 0, end - pos)
+        boxes.append((kind, pos, header, size))
+        pos += size
+    return boxes
+
+
+def free_box(size: int) -> bytes:
+    return struct.pack(">I4s", size, b"free") + bytes(size - 8)
+
+
+def cover_type(image: bytes) -> int:
+    for magic, kind in COVER_TYPES.items():
+        if image.startswith(magic):
+            return kind
+    raise MP4Error("Cover art must be a JPEG, PNG or BMP image")
+
+
+def set_cover(moov: Box, image: bytes):
+    """Adds (or replaces) `moov/udta/meta/ilst/covr`."""
+    data = Box(b"data", struct.pack(">II", cover_type(image), 0) + image)
+
+    if (udta := moov.child(b"udta")) is None:
+        udta = Box(b"udta", children=[])
+        moov.children.append(udta)
+    if (meta := udta.child(b"meta")) is None:
+        hdlr = Box(b"hdlr", struct.pack(">II4s4sII", 0, 0, b"mdir", b"appl", 0, 0) + b"\0")
+        meta = Box(b"meta", children=[hdlr], prefix=bytes(4))
+        udta.children.append(meta)
+    if (ilst := meta.child(b"ilst")) is None:
+        ilst = Box(b"ilst", children=[])
+        meta.children.append(ilst)
+
+    ilst.children = [box for box in ilst.children if box.kind != b"covr"]
+    ilst.children.append(Box(b"covr", children=[data]))
+
+
+def embed_cover(path: str, image: bytes) -> str:
+    """
+    Puts `image` into the MP4 at `path` as its cover art without rewriting
+    or moving the media data. Returns how the new `moov` was written:
+
+    "in-place": over the old one, growing into free space after it (or the
+    end of the file) when it needs to.
+    "appended": the old one became a `free` box and the new one went to the
+    end of the file. Nothing else moves, so no chunk offset changes; a
+    faststart file just has its `moov` at the end from then on.
+
+    Raises `MP4Error` before touching the file if it cannot be edited.
+    """
+    with open(path, "r+b") as f:
+        boxes = top_level_boxes(f)
+        kinds = [kind for kind, *_ in boxes]
+        if b"moov" not in kinds:
+            raise MP4Error("No moov box")
+        if b"moof" in kinds:
+            raise MP4Error("Fragmented MP4")
+
+        index = kinds.index(b"moov")
+        _, offset, header, size = boxes[index]
+        f.seek(offset)
+        data = f.read(size)
+        moov = Box.parse(b"moov", data, header, size)
+        set_cover(moov, image)
+        new = moov.to_bytes()
+
+        # The old moov plus any free boxes right after it can be reused
+        room = size
+        for kind, _, _, free_size in boxes[index + 1 :]:
+            if kind not in FREE_BOXES:
+                break
+            room += free_size
+        at_end = offset + room == os.fstat(f.fileno()).st_size
+
+        if at_end or len(new) == room or room - len(new) >= 8:
+            f.seek(offset)
+            f.write(new)
+            if at_end:
+                f.truncate()
+            elif room > len(new):
+                f.write(free_box(room - len(new)))
+            return "in-place"
+
+        # Written before the old one is retired, so an interrupted write
+        # never leaves the file without a moov
+        f.seek(0, os.SEEK_END)
+        f.write(new)
+        f.flush()
+        f.seek(offset + 4)
+        f.write(b"free")
+        return "appended"
@@ -0,0 +1,119 @@
+import os
+import asyncio
+import itertools
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Lower starts first: a thumbnail finishes a video in moments, an encode takes minutes
+PRIORITY_THUMBNAIL = 0
+PRIORITY_REENCODE = 10
+
+
+def cpu_cores() -> int:
+    """Cores this process may run on."""
+    count = os.process_cpu_count() if hasattr(os, "process_cpu_count") else os.cpu_count()
+    return count or 1
+
+
+def load_average() -> float:
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return 0.0
+
+
+class PostProcessor:
+    """
+    A pool for CPU-bound post-processing (re-encodes, thumbnails), apart
+    from the downloads: callers hand in work and wait for it without holding
+    a download slot, so the network stays busy while encodes run.
+
+    `workers` jobs run at once (default: one per `cores_per_job` cores).
+    Each job is called with its ffmpeg thread count: its share of the cores,
+    less whatever the machine is already busy with besides our own jobs.
+    Waiting jobs start by priority, then in the order they came.
+    """
+
+    def __init__(self, workers: int | None = None, cores_per_job: int = 4):
+        self.configure(workers, cores_per_job)
+        self.running = 0
+        self.running_threads = 0
+        self._order = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.PriorityQueue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def configure(self, workers: int | None = None, cores_per_job: int = 4):
+        """Takes effect for workers started afterwards (at the next run)."""
+        self.cores = cpu_cores()
+        self.workers = max(1, workers or self.cores // max(1, cores_per_job))
+        self.share = max(1, self.cores // self.workers)
+
+    def threads(self) -> int:
+        """Thread count for a job starting now."""
+        others = max(0.0, load_average() - self.running_threads)
+        return max(1, min(self.share, int(self.cores - others)))
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def submit(
+        self,
+        func: Callable[[int], Awaitable[T]],
+        priority: int = PRIORITY_REENCODE,
+    ) -> T:
+        """Queues `func(threads)` and waits for its result."""
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((priority, next(self._order), func, future))
+        return await future
+
+    async def _work(self):
+        while True:
+            _, _, func, future = await self._queue.get()
+            if future.cancelled():
+                continue
+
+            threads = self.threads()
+            self.running += 1
+            self.running_threads += threads
+            task = asyncio.ensure_future(func(threads))
+            # The caller gave up: stop the job too
+            future.add_done_callback(lambda f, task=task: f.cancelled() and task.cancel())
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self.running -= 1
+                self.running_threads -= threads
+
+            if future.done():
+                continue
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+POSTPROCESS = PostProcessor()
+
+
+def configure_postprocess(workers: int | None = None, cores_per_job: int = 4):
+    """Size the shared post-processing pool (None = from the core count)."""
+    POSTPROCESS.configure(workers, cores_per_job)
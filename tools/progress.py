@@ -0,0 +1,142 @@
+import time
+import threading
+from rich import get_console
+from rich.console import Console
+from rich.live import Live
+from rich.progress_bar import ProgressBar
+from rich.table import Table
+
+from .bandwidth import RateMeter
+from .utils import format_bytes_readable, format_elapsed_time
+
+
+class ProgressJob:
+    """
+    Counters for one video on the board. Workers only bump plain numbers
+    here; nothing is drawn until the board's next refresh.
+
+    Keeps the parts of the `tqdm` interface the downloaders use (`n`,
+    `total`, `update`, `refresh`, `write`) so it can be passed where a bar
+    used to be.
+    """
+
+    def __init__(self, board: "ProgressBoard", name: str, total: float | None, unit: str):
+        self.board = board
+        self.name = name
+        self.meter = RateMeter()
+        self.retries = 0
+        self.set_stage("download", total, unit)
+
+    def set_stage(self, stage: str, total: float | None = None, unit: str | None = None):
+        """Start counting a new phase (e.g. concat) from zero."""
+        self.stage = stage
+        self.total = total
+        self.unit = unit or getattr(self, "unit", "seg")
+        self.n = 0
+        self.stage_started = time.monotonic()
+
+    def update(self, n: float = 1):
+        self.n += n
+
+    def add_bytes(self, nbytes: int):
+        self.meter.add(nbytes)
+
+    def retry(self):
+        self.retries += 1
+
+    def refresh(self):
+        pass
+
+    def write(self, message: str):
+        self.board.console.print(message)
+
+    @property
+    def eta(self) -> float | None:
+        elapsed = time.monotonic() - self.stage_started
+        if not self.total or not self.n or elapsed <= 0:
+            return None
+        return max(0.0, self.total - self.n) / (self.n / elapsed)
+
+    def close(self):
+        self.board.remove(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class ProgressBoard:
+    """
+    One live table for every active download, redrawn `refresh_per_second`
+    times a second by rich's refresh thread no matter how many segments are
+    in flight.
+    """
+
+    def __init__(self, refresh_per_second: float = 4, console: Console | None = None):
+        self.refresh_per_second = refresh_per_second
+        self.console = console or get_console()
+        self.jobs: dict[int, ProgressJob] = {}
+        self._lock = threading.Lock()
+        self._live: Live | None = None
+
+    def job(self, name: str, total: float | None = None, unit: str = "seg") -> ProgressJob:
+        job = ProgressJob(self, name, total, unit)
+        with self._lock:
+            self.jobs[id(job)] = job
+            if self._live is None:
+                self._live = Live(
+                    get_renderable=self.render,
+                    console=self.console,
+                    refresh_per_second=self.refresh_per_second,
+                    transient=True,
+                )
+                self._live.start()
+        return job
+
+    def remove(self, job: ProgressJob):
+        with self._lock:
+            self.jobs.pop(id(job), None)
+            if not self.jobs and self._live is not None:
+                live, self._live = self._live, None
+                live.stop()
+
+    def render(self) -> Table:
+        table = Table(expand=True, box=None, pad_edge=False)
+        table.add_column("Video", ratio=3, no_wrap=True, overflow="ellipsis")
+        table.add_column("Stage", no_wrap=True)
+        table.add_column("Progress", ratio=2)
+        table.add_column("Done", justify="right", no_wrap=True)
+        table.add_column("Speed", justify="right", no_wrap=True)
+        table.add_column("ETA", justify="right", no_wrap=True)
+        table.add_column("Retries", justify="right", no_wrap=True)
+
+        total_speed = 0.0
+        for job in list(self.jobs.values()):
+            speed = job.meter.instant
+            total_speed += speed
+            done = (
+                format_bytes_readable(int(job.n))
+                if job.unit == "B"
+                else f"{job.n:.0f}/{job.total:.0f} {job.unit}"
+                if job.total
+                else f"{job.n:.0f} {job.unit}"
+            )
+            table.add_row(
+                job.name,
+                job.stage,
+                ProgressBar(total=job.total or None, completed=job.n),
+                done,
+                f"{format_bytes_readable(int(speed))}/s",
+                format_elapsed_time(max(1, int(job.eta))) if job.eta is not None else "-",
+                str(job.retries) if job.retries else "",
+            )
+
+        table.caption = (
+            f"{len(self.jobs)} active | {format_bytes_readable(int(total_speed))}/s"
+        )
+        return table
+
+
+BOARD = ProgressBoard()
@@ -0,0 +1,215 @@
+import os
+import time
+import asyncio
+import aiohttp
+from urllib.parse import urlparse
+
+from .bandwidth import GOVERNOR, BandwidthJob
+from .manifest import SegmentManifest
+from .writer import WRITER
+from .progress import BOARD, ProgressJob
+from .retry import RetryBudget, RetryPolicy, retry_after_of, retry_call
+
+
+class RangeIgnored(Exception):
+    """
+    A Range request came back as the whole file: the server does not really
+    support ranges, or `If-Range` no longer matches. Retrying cannot help.
+    """
+
+
+class ByteRange:
+    """Half-open `[position, end)` slice of the file owned by one worker."""
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.position = start
+        self.end = end
+        # Handed to the writer / recorded in the manifest, both from `start`
+        self.written = start
+        self.recorded = start
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.position
+
+    def __repr__(self):
+        return f"ByteRange({self.start}, {self.position}, {self.end})"
+
+
+def supports_ranges(headers) -> bool:
+    return (
+        headers.get("Accept-Ranges", "").lower() == "bytes"
+        and headers.get("Content-Length", "").isdigit()
+    )
+
+
+async def download_ranged(
+    sem,
+    session: aiohttp.ClientSession,
+    url: str,
+    output_file: str,
+    size: int,
+    connections: int = 8,
+    min_chunk: int = 1024 * 1024,
+    read_size: int = 256 * 1024,
+    policy: RetryPolicy | None = None,
+    budget: RetryBudget | None = None,
+    bandwidth: BandwidthJob | None = None,
+    validator: str | None = None,
+    progress: ProgressJob | None = None,
+    manifest: SegmentManifest | None = None,
+    checkpoint_bytes: int = 8 * 1024 * 1024,
+) -> str:
+    """
+    Downloads `url` over up to `connections` parallel Range requests into a
+    preallocated `output_file`, writing every chunk at its own offset.
+
+    The file starts out split into equal ranges, one per worker. A worker
+    that runs out of work takes the back half of the range with the most
+    bytes left; the worker that owned it just stops reading at the new end,
+    so a slow connection never holds up the download by more than
+    `min_chunk` bytes.
+
+    `sem` limits the open connections (a `ConcurrencyController` also learns
+    from them) and `validator` (ETag or Last-Modified) is sent as `If-Range`
+    so a file that changes mid-download fails instead of being mixed. Each
+    range is retried under `policy`, drawing on the job's `budget`; a range
+    answered with the whole file raises `RangeIgnored` and stops the job.
+
+    With a `manifest`, every range records how far it got (each
+    `checkpoint_bytes` and when it ends, once the bytes are on disk), and a
+    later call for the same size and `validator` only fetches the gaps.
+    """
+    host = urlparse(url).hostname
+    done = manifest.ranges(url, size, validator) if manifest is not None else []
+    on_disk = os.path.getsize(output_file) if os.path.exists(output_file) else 0
+    done = [(start, min(end, on_disk)) for start, end in done if start < on_disk]
+    if manifest is not None and not done:
+        # Nothing usable (another version of the file, or no file): start clean
+        manifest.remove()
+
+    gaps, cursor = [], 0
+    for start, end in done:
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < size:
+        gaps.append((cursor, size))
+    remaining = sum(end - start for start, end in gaps)
+
+    connections = max(1, min(connections, remaining // max(min_chunk, 1) or 1))
+    step = max(1, -(-remaining // connections))
+    ranges = [
+        ByteRange(start, min(start + step, gap_end))
+        for gap_start, gap_end in gaps
+        for start in range(gap_start, gap_end, step)
+    ]
+    pending = list(ranges)
+
+    def record(part: ByteRange, written: int):
+        if manifest is not None and written > part.recorded:
+            part.recorded = written
+            manifest.record_range(url, part.start, written, size, validator)
+
+    async def checkpoint(part: ByteRange):
+        written = part.written
+        if manifest is not None and written > part.recorded:
+            await file.drain()
+            record(part, written)
+
+    def steal() -> ByteRange | None:
+        if pending:
+            return pending.pop(0)
+        victim = max(ranges, key=lambda r: r.remaining, default=None)
+        if victim is None or victim.remaining < min_chunk * 2:
+            return None
+        middle = victim.position + victim.remaining // 2
+        stolen = ByteRange(middle, victim.end)
+        victim.end = middle
+        ranges.append(stolen)
+        return stolen
+
+    async def fetch(part: ByteRange, pbar: ProgressJob):
+        async def attempt():
+            request_start = time.perf_counter()
+            received = 0
+            try:
+                async with sem:
+                    headers = {"Range": f"bytes={part.position}-{part.end - 1}"}
+                    if validator:
+                        headers["If-Range"] = validator
+                    async with session.get(url, headers=headers) as r:
+                        r.raise_for_status()
+                        if r.status != 206:
+                            raise RangeIgnored(
+                                f"Server answered {r.status} to range {headers['Range']} for {url}"
+                            )
+                        while part.position < part.end:
+                            chunk = await r.content.read(
+                                min(read_size, part.end - part.position)
+                            )
+                            if not chunk:
+                                break
+                            # The range may have been cut short by a stealer meanwhile
+                            chunk = chunk[: part.end - part.position]
+                            offset = part.position
+                            part.position += len(chunk)
+                            received += len(chunk)
+                            await file.pwrite(chunk, offset)
+                            part.written = offset + len(chunk)
+                            pbar.update(len(chunk))
+                            pbar.add_bytes(len(chunk))
+                            await GOVERNOR.consume(len(chunk), host, bandwidth)
+                            if part.written - part.recorded >= checkpoint_bytes:
+                                await checkpoint(part)
+
+                    if part.position < part.end:
+                        raise aiohttp.ClientPayloadError(
+                            f"Short read: range ended at {part.position} of {part.end}"
+                        )
+                    if hasattr(sem, "record_success"):
+                        sem.record_success(received, time.perf_counter() - request_start)
+                await checkpoint(part)
+            except RangeIgnored:
+                raise
+            except Exception as e:
+                if hasattr(sem, "record_failure"):
+                    sem.record_failure(retry_after_of(e))
+                raise
+
+        def on_retry(attempt_number: int, e: Exception, delay: float):
+            pbar.retry()
+            pbar.write(
+                f"[Ranged] retrying {part} of {os.path.basename(output_file)} in {delay:.1f}s [{e}]"
+            )
+
+        await retry_call(attempt, url, policy, budget, on_retry)
+
+    async def worker(pbar: ProgressJob):
+        while (part := steal()) is not None:
+            await fetch(part, pbar)
+
+    # Kept when resuming: the recorded extents are already in place
+    file = await WRITER.open(output_file, size=size, keep=bool(done))
+    pbar = progress or BOARD.job(os.path.basename(output_file))
+    pbar.set_stage(f"ranged x{connections}", total=size, unit="B")
+    pbar.update(size - remaining)
+    try:
+        workers = [asyncio.create_task(worker(pbar)) for _ in range(connections)]
+        try:
+            await asyncio.gather(*workers)
+        except Exception:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+    finally:
+        if progress is None:
+            pbar.close()
+        await file.close()
+        # Closed cleanly, so everything handed to the writer is on disk
+        for part in ranges:
+            record(part, part.written)
+
+    return output_file
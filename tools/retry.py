@@ -0,0 +1,374 @@
+import time
+import random
+import asyncio
+import aiohttp
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, TypeVar
+from urllib.parse import urlparse
+
+T = TypeVar("T")
+
+# Statuses worth asking again for; anything else 4xx will not change on retry
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a `Retry-After` header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after_of(error: BaseException) -> float | None:
+    if isinstance(error, aiohttp.ClientResponseError) and error.headers:
+        return parse_retry_after(error.headers.get("Retry-After"))
+    return None
+
+
+def is_host_failure(error: BaseException) -> bool:
+    """The host itself is unwell (unreachable, timing out, 5xx or throttling)."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(
+        error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, TimeoutError)
+    )
+
+
+class CircuitOpenError(Exception):
+    """Requests to the host are paused because it kept failing."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host}, retry in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class RetryPolicy:
+    """
+    How many attempts and how long between them: capped exponential backoff
+    with full jitter (a random wait up to `base * multiplier**(attempt - 1)`,
+    at most `cap`), so clients that failed together do not retry together.
+    A server's `Retry-After` is always honoured, up to `max_retry_after`.
+
+    HTTP errors are retried for `statuses` only; other errors when they are
+    one of `exceptions` (network errors by default).
+    """
+
+    def __init__(
+        self,
+        attempts: int = 5,
+        base: float = 1.0,
+        multiplier: float = 2.0,
+        cap: float = 30.0,
+        max_retry_after: float = 300.0,
+        max_circuit_wait: float | None = 60.0,
+        statuses: frozenset[int] = RETRYABLE_STATUSES,
+        exceptions: tuple[type[BaseException], ...] = (
+            aiohttp.ClientError,
+            TimeoutError,
+            ConnectionError,
+        ),
+    ):
+        self.attempts = attempts
+        self.base = base
+        self.multiplier = multiplier
+        self.cap = cap
+        self.max_retry_after = max_retry_after
+        self.max_circuit_wait = max_circuit_wait
+        self.statuses = statuses
+        self.exceptions = exceptions
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        delay = random.uniform(0, min(self.cap, self.base * self.multiplier ** (attempt - 1)))
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+    def is_retryable(self, error: BaseException) -> bool:
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in self.statuses
+        return isinstance(error, self.exceptions)
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+class CircuitBreaker:
+    """
+    Stops hammering a host that keeps failing.
+
+    closed: requests pass; `failure_threshold` host failures in a row open it.
+    open: requests wait (or fail with `CircuitOpenError` if that would take
+    longer than they may wait) until `reset_timeout` has passed.
+    half-open: a single probe request goes through; success closes the
+    circuit, failure opens it again for twice as long (up to
+    `max_reset_timeout`). Everyone else waits for the probe's outcome.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        max_reset_timeout: float = 120.0,
+    ):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.open_for = reset_timeout
+        self._opened_at = 0.0
+        self._probe_done: asyncio.Event | None = None
+
+    async def acquire(self, max_wait: float | None = None) -> bool:
+        """Waits until a request may be sent; True if it is the half-open probe."""
+        waited = 0.0
+        while True:
+            if self.state == self.CLOSED:
+                return False
+
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.open_for - time.monotonic()
+                if remaining <= 0:
+                    self.state = self.HALF_OPEN
+                    self._probe_done = asyncio.Event()
+                    return True
+                if max_wait is not None and waited + remaining > max_wait:
+                    raise CircuitOpenError(self.host, remaining)
+                await asyncio.sleep(remaining)
+                waited += remaining
+                continue
+
+            # Half-open: someone else is probing
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(
+                    self._probe_done.wait(),
+                    None if max_wait is None else max(0.0, max_wait - waited),
+                )
+            except TimeoutError:
+                raise CircuitOpenError(self.host, self.open_for) from None
+            waited += time.monotonic() - started
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != self.CLOSED:
+            self.state = self.CLOSED
+            self.open_for = self.reset_timeout
+            self._wake()
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self._trip(min(self.open_for * 2, self.max_reset_timeout))
+        elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+            self._trip(self.reset_timeout)
+
+    def abandon(self):
+        """The probe went away without an answer; let the next request probe."""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic() - self.open_for
+            self._wake()
+
+    def _trip(self, open_for: float):
+        self.state = self.OPEN
+        self.open_for = open_for
+        self._opened_at = time.monotonic()
+        self.trips += 1
+        self._wake()
+
+    def _wake(self):
+        if self._probe_done is not None:
+            self._probe_done.set()
+            self._probe_done = None
+
+
+# One breaker per host, shared by every job in the run
+BREAKERS: dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(url: str) -> CircuitBreaker:
+    host = urlparse(url).hostname or url
+    if host not in BREAKERS:
+        BREAKERS[host] = CircuitBreaker(host)
+    return BREAKERS[host]
+
+
+class RetryBudget:
+    """
+    Retries one job may spend. Starts with `initial` tokens; every retry
+    costs one and every success earns `ratio` back (up to `initial`), so a
+    job against a failing host runs out instead of retrying forever, while a
+    long healthy job can still ride out the odd error.
+    """
+
+    def __init__(self, initial: float = 20, ratio: float = 0.1):
+        self.initial = initial
+        self.ratio = ratio
+        self.tokens = float(initial)
+        self.spent = 0
+
+    def spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.spent += 1
+        return True
+
+    def earn(self):
+        self.tokens = min(self.initial, self.tokens + self.ratio)
+
+
+async def retry_call(
+    func: Callable[[], Awaitable[T]],
+    url: str | None = None,
+    policy: RetryPolicy | None = None,
+    budget: RetryBudget | None = None,
+    on_retry: Callable[[int, Exception, float], None] | None = None,
+) -> T:
+    """
+    Awaits `func()` until it succeeds, the error is not retryable, or the
+    policy's attempts or the job's `budget` run out (then the last error is
+    raised). With a `url`, every attempt goes through the host's circuit
+    breaker first. `on_retry(attempt, error, delay)` is called before each
+    wait.
+    """
+    policy = policy or DEFAULT_POLICY
+    breaker = breaker_for(url) if url else None
+    for attempt in range(1, policy.attempts + 1):
+        probe = await breaker.acquire(policy.max_circuit_wait) if breaker else False
+        try:
+            result = await func()
+        except Exception as e:
+            if breaker is not None:
+                if is_host_failure(e):
+                    breaker.record_failure()
+                else:
+                    # The host answered; the problem is the request or its handling
+                    breaker.record_success()
+            if (
+                attempt >= policy.attempts
+                or not policy.is_retryable(e)
+                or (budget is not None and not budget.spend())
+            ):
+                raise
+            delay = policy.backoff(attempt, retry_after_of(e))
+            if on_retry is not None:
+                on_retry(attempt, e, delay)
+            await asyncio.sleep(delay)
+        except BaseException:
+            if probe:
+                breaker.abandon()
+            raise
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            if budget is not None:
+                budget.earn()
+            return result
+
+
+async def request(
+    session: aiohttp.ClientSession,
+    method: str,
+    url: str,
+    policy: RetryPolicy | None = None,
+    budget: RetryBudget | None = None,
+    on_retry: Callable[[int, Exception, float], None] | None = None,
+    **kwargs,
+) -> aiohttp.ClientResponse:
+    """
+    `session.request(method, url, **kwargs)` through `retry_call`. A
+    retryable status raises `ClientResponseError` like `raise_for_status`
+    would; any other response is returned for the caller to check (and
+    release, e.g. with `async with`).
+    """
+    policy = policy or DEFAULT_POLICY
+
+    async def send() -> aiohttp.ClientResponse:
+        response = await session.request(method, url, **kwargs)
+        if response.status in policy.statuses:
+            response.release()
+            raise aiohttp.ClientResponseError(
+                response.request_info,
+                response.history,
+                status=response.status,
+                message=response.reason or "",
+                headers=response.headers,
+            )
+        return response
+
+    # Relative urls (sessions with a base_url) are broken per base host
+    host_url = url if urlparse(url).hostname else str(getattr(session, "_base_url", None) or url)
+    return await retry_call(send, host_url, policy, budget, on_retry)
+
+
+class RequestContext:
+    """Awaitable and `async with`-able, like aiohttp's request context manager."""
+
+    def __init__(self, coroutine: Awaitable[aiohttp.ClientResponse]):
+        self._coroutine = coroutine
+        self._response: aiohttp.ClientResponse | None = None
+
+    def __await__(self):
+        return self._coroutine.__await__()
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        self._response = await self._coroutine
+        return self._response
+
+    async def __aexit__(self, *_):
+        self._response.release()
+
+
+class RetryingSession:
+    """
+    Wraps an `aiohttp.ClientSession` so every request made through it goes
+    through `request` (retries, backoff, circuit breakers). Everything else
+    is the wrapped session's; `session` is the session itself, for code
+    that does its own retrying.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, policy: RetryPolicy | None = None):
+        self.session = session
+        self.policy = policy
+
+    def request(self, method: str, url: str, **kwargs) -> RequestContext:
+        return RequestContext(
+            request(self.session, method, str(url), self.policy, **kwargs)
+        )
+
+    def get(self, url: str, **kwargs) -> RequestContext:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> RequestContext:
+        return self.request("POST", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> RequestContext:
+        return self.request("HEAD", url, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self.session, name)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.session.close()
+
+
+def unwrap_session(session) -> aiohttp.ClientSession:
+    """The plain session behind a `RetryingSession` (or the session given)."""
+    return getattr(session, "session", session)
@@ -0,0 +1,123 @@
+import asyncio
+from typing import Callable
+
+from .writer import WRITER
+from .ffmpeg import FFmpegProcess
+
+
+class OrderedSegmentWriter:
+    """
+    Appends segments to a single output in playlist order while they are
+    downloaded out of order.
+
+    Segments that arrive early wait in a bounded reorder buffer; `reserve`
+    keeps downloads from running more than `max_buffered` segments ahead of
+    the next one to be written, so memory stays bounded by the window.
+
+    The output is either a plain file (fMP4 / raw TS) or the stdin of one
+    long-lived ffmpeg process that remuxes the stream into `output_file`.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        max_buffered: int = 16,
+        pipe_to_ffmpeg: bool = False,
+        start_index: int = 0,
+        start_offset: int = 0,
+        on_written: Callable[[int, int], None] | None = None,
+    ):
+        self.output_file = output_file
+        self.max_buffered = max(1, max_buffered)
+        self.pipe_to_ffmpeg = pipe_to_ffmpeg
+        self.next_index = start_index
+        self.start_offset = start_offset
+        self.on_written = on_written
+        self.bytes_written = start_offset
+
+        self._pending: dict[int, bytes | bytearray] = {}
+        self._cond = asyncio.Condition()
+        self._error: BaseException | None = None
+        self._file = None
+        self._ffmpeg: FFmpegProcess | None = None
+        self._progress_task: asyncio.Task | None = None
+
+    async def open(self):
+        if self.pipe_to_ffmpeg:
+            self._ffmpeg = await FFmpegProcess(
+                ["-fflags", "+genpts", "-i", "pipe:0", "-c", "copy", "-y", self.output_file],
+                stdin=True,
+            ).start()
+            # Keep the progress pipe drained while segments are fed in
+            self._progress_task = asyncio.create_task(self._drain_progress())
+        else:
+            # Drops anything past the last segment known to be complete
+            self._file = await WRITER.open(self.output_file, self.start_offset)
+
+    async def reserve(self, index: int):
+        """Wait until `index` is inside the reorder window."""
+        async with self._cond:
+            await self._cond.wait_for(
+                lambda: self._error is not None
+                or index < self.next_index + self.max_buffered
+            )
+            if self._error is not None:
+                raise self._error
+
+    async def put(self, index: int, data: bytes | bytearray):
+        async with self._cond:
+            if self._error is not None:
+                raise self._error
+
+            self._pending[index] = data
+            try:
+                while self.next_index in self._pending:
+                    chunk = self._pending.pop(self.next_index)
+                    await self._write(chunk)
+                    self.bytes_written += len(chunk)
+                    if self.on_written:
+                        self.on_written(self.next_index, len(chunk))
+                    self.next_index += 1
+            except Exception as e:
+                self._error = e
+                raise
+            finally:
+                self._cond.notify_all()
+
+    async def _drain_progress(self):
+        async for _ in self._ffmpeg.progress():
+            pass
+
+    async def _write(self, chunk: bytes | bytearray):
+        if self._ffmpeg is not None:
+            self._ffmpeg.process.stdin.write(chunk)
+            await self._ffmpeg.process.stdin.drain()
+        else:
+            await self._file.write(chunk)
+
+    async def fail(self, error: BaseException):
+        """Abort the stream; every waiting and future caller gets `error`."""
+        async with self._cond:
+            if self._error is None:
+                self._error = error
+            self._pending.clear()
+            self._cond.notify_all()
+
+    async def close(self):
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+
+        if self._ffmpeg is not None:
+            ffmpeg, self._ffmpeg = self._ffmpeg, None
+            if self._error is not None:
+                ffmpeg.kill()
+                await ffmpeg.process.wait()
+                self._progress_task.cancel()
+                return
+
+            ffmpeg.process.stdin.close()
+            await ffmpeg.process.stdin.wait_closed()
+            await self._progress_task
+            # Raises FFmpegError with the tail of ffmpeg's stderr
+            await ffmpeg.wait()
@@ -0,0 +1,254 @@
+import os
+import mmap
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pydantic import BaseModel, Field
+
+from .hls import HLSSegment
+from .manifest import SegmentManifest
+
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+NULL_PID = 0x1FFF
+PTS_CLOCK = 90_000
+PTS_WRAP = 1 << 33
+
+
+class TSScan(BaseModel):
+    packets: int = Field(default=0, description="Whole 188 byte packets in the data")
+    bad_packet: int | None = Field(
+        default=None, description="Index of the first packet without a sync byte"
+    )
+    trailing_bytes: int = Field(default=0, description="Bytes after the last whole packet")
+    continuity_errors: int = Field(
+        default=0, description="Continuity counter jumps not flagged as discontinuities"
+    )
+    duration: float | None = Field(
+        default=None, description="Longest PTS span of any elementary stream, in seconds"
+    )
+
+
+class SegmentCheck(BaseModel):
+    name: str
+    ok: bool = True
+    hard: bool = Field(
+        default=False,
+        description="Missing or broken data; soft failures (timing, counters) may be the source's",
+    )
+    reason: str | None = None
+    size: int = 0
+    scan: TSScan | None = None
+
+    def fail(self, reason: str, hard: bool = True) -> "SegmentCheck":
+        self.ok = False
+        self.hard = self.hard or hard
+        self.reason = reason if self.reason is None else f"{self.reason}; {reason}"
+        return self
+
+
+def _pes_pts(packet) -> int | None:
+    """PTS of the PES packet starting in this TS packet, if it carries one."""
+    offset = 4 + (packet[4] + 1 if (packet[3] >> 4) & 0x2 else 0)
+    pes = packet[offset : offset + 14]
+    if len(pes) < 14 or bytes(pes[:3]) != b"\x00\x00\x01" or not pes[7] & 0x80:
+        return None
+    return (
+        ((pes[9] >> 1) & 0x07) << 30
+        | pes[10] << 22
+        | (pes[11] >> 1) << 15
+        | pes[12] << 7
+        | pes[13] >> 1
+    )
+
+
+def _pts_delta(value: int, origin: int) -> int:
+    """Signed distance from `origin`, across the 2**33 wrap and B-frame reordering."""
+    delta = (value - origin) % PTS_WRAP
+    return delta - PTS_WRAP if delta > PTS_WRAP // 2 else delta
+
+
+def _pts_span(timestamps: dict[int, list[int]]) -> float | None:
+    longest = None
+    for values in timestamps.values():
+        if len(values) < 2:
+            continue
+        deltas = [_pts_delta(value, values[0]) for value in values]
+        span = (max(deltas) - min(deltas)) / PTS_CLOCK
+        longest = span if longest is None else max(longest, span)
+    return longest
+
+
+def _collect_pts(view, starts) -> dict[int, list[int]]:
+    timestamps: dict[int, list[int]] = {}
+    for index in starts:
+        packet = view[index * TS_PACKET_SIZE : (index + 1) * TS_PACKET_SIZE]
+        pid = ((packet[1] & 0x1F) << 8) | packet[2]
+        if (pts := _pes_pts(packet)) is not None:
+            timestamps.setdefault(pid, []).append(pts)
+    return timestamps
+
+
+def _scan_numpy(view: memoryview) -> TSScan:
+    count = len(view) // TS_PACKET_SIZE
+    packets = np.frombuffer(view, dtype=np.uint8, count=count * TS_PACKET_SIZE).reshape(
+        count, TS_PACKET_SIZE
+    )
+    scan = TSScan(packets=count, trailing_bytes=len(view) - count * TS_PACKET_SIZE)
+
+    bad = np.flatnonzero(packets[:, 0] != TS_SYNC_BYTE)
+    if len(bad):
+        scan.bad_packet = int(bad[0])
+        return scan
+
+    pid = ((packets[:, 1].astype(np.uint16) & 0x1F) << 8) | packets[:, 2]
+    adaptation = (packets[:, 3] >> 4) & 0x3
+    counter = (packets[:, 3] & 0x0F).astype(np.int16)
+    discontinuity = (
+        ((adaptation & 0x2) > 0) & (packets[:, 4] > 0) & ((packets[:, 5] & 0x80) > 0)
+    )
+    # The counter only advances on packets that carry payload
+    counted = ((adaptation & 0x1) > 0) & (pid != NULL_PID)
+    for value in np.unique(pid[counted]):
+        rows = np.flatnonzero(counted & (pid == value))
+        step = (counter[rows[1:]] - counter[rows[:-1]]) & 0x0F
+        # 0 is an allowed duplicate packet
+        scan.continuity_errors += int(
+            np.count_nonzero((step > 1) & ~discontinuity[rows[1:]])
+        )
+
+    starts = np.flatnonzero((packets[:, 1] & 0x40) > 0).tolist()
+    del packets, pid, adaptation, counter, discontinuity, counted
+    scan.duration = _pts_span(_collect_pts(view, starts))
+    return scan
+
+
+def _scan_python(view: memoryview) -> TSScan:
+    count = len(view) // TS_PACKET_SIZE
+    scan = TSScan(packets=count, trailing_bytes=len(view) - count * TS_PACKET_SIZE)
+    counters: dict[int, int] = {}
+    starts = []
+    for index in range(count):
+        packet = view[index * TS_PACKET_SIZE : (index + 1) * TS_PACKET_SIZE]
+        if packet[0] != TS_SYNC_BYTE:
+            scan.bad_packet = index
+            return scan
+
+        pid = ((packet[1] & 0x1F) << 8) | packet[2]
+        adaptation = (packet[3] >> 4) & 0x3
+        if pid == NULL_PID or not adaptation & 0x1:
+            continue
+        counter = packet[3] & 0x0F
+        discontinuity = adaptation & 0x2 and packet[4] > 0 and packet[5] & 0x80
+        previous = counters.get(pid)
+        if previous is not None and not discontinuity and (counter - previous) & 0x0F > 1:
+            scan.continuity_errors += 1
+        counters[pid] = counter
+        if packet[1] & 0x40:
+            starts.append(index)
+
+    scan.duration = _pts_span(_collect_pts(view, starts))
+    return scan
+
+
+def scan_ts(data) -> TSScan:
+    """
+    Checks MPEG-TS data (bytes, a buffer or a memory map): the sync byte of
+    every packet, per-PID continuity counters and the PTS span. Uses NumPy
+    to scan the packet headers when it is installed.
+    """
+    with memoryview(data) as view:
+        return _scan_numpy(view) if np is not None else _scan_python(view)
+
+
+def looks_like_ts(data, probe_packets: int = 3) -> bool:
+    """Sync bytes at the start of the first few packets, as ffmpeg's probe does."""
+    count = max(1, min(probe_packets, len(data) // TS_PACKET_SIZE))
+    return all(
+        data[index * TS_PACKET_SIZE] == TS_SYNC_BYTE
+        for index in range(count)
+        if index * TS_PACKET_SIZE < len(data)
+    )
+
+
+def check_segment_data(
+    check: SegmentCheck,
+    data,
+    duration: float = 0.0,
+    min_duration_ratio: float = 0.5,
+) -> SegmentCheck:
+    """Fills `check` from the segment's bytes and its `EXTINF` duration."""
+    check.size = len(data)
+    if not check.size:
+        return check.fail("empty")
+    if not looks_like_ts(data):
+        # Not a transport stream (fMP4, init sections); only the size is known
+        return check
+
+    scan = check.scan = scan_ts(data)
+    if scan.bad_packet is not None:
+        check.fail(f"lost sync at packet {scan.bad_packet}")
+    elif scan.trailing_bytes:
+        check.fail(f"{scan.trailing_bytes} bytes of a cut off packet")
+    if scan.continuity_errors:
+        check.fail(f"{scan.continuity_errors} continuity counter errors", hard=False)
+    if (
+        duration > 0
+        and scan.duration is not None
+        and scan.duration < duration * min_duration_ratio
+    ):
+        check.fail(f"{scan.duration:.2f}s of media for EXTINF {duration:.2f}s", hard=False)
+    return check
+
+
+def verify_segment_file(
+    segment: HLSSegment,
+    path: str,
+    manifest: SegmentManifest | None = None,
+    min_duration_ratio: float = 0.5,
+) -> SegmentCheck:
+    """
+    Checks a downloaded segment on disk: it exists, matches the size the
+    manifest recorded when it finished (the `Content-Length` it was checked
+    against), and is sound MPEG-TS if it is one. The file is memory-mapped
+    rather than read.
+    """
+    check = SegmentCheck(name=segment.name)
+    if not os.path.exists(path):
+        return check.fail("missing")
+
+    size = os.path.getsize(path)
+    if manifest is not None:
+        record = manifest.get(segment.name)
+        if not record or not record.get("done"):
+            return check.fail("never finished")
+        if record.get("size") != size:
+            return check.fail(f"{size} bytes on disk, expected {record.get('size')}")
+    if not size:
+        check.size = 0
+        return check.fail("empty")
+
+    with open(path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        return check_segment_data(check, data, segment.duration, min_duration_ratio)
+
+
+def verify_segments(
+    segments: list[HLSSegment],
+    directory: str,
+    manifest: SegmentManifest | None = None,
+    min_duration_ratio: float = 0.5,
+) -> list[SegmentCheck]:
+    return [
+        verify_segment_file(
+            segment,
+            os.path.join(directory, segment.name),
+            manifest,
+            min_duration_ratio,
+        )
+        for segment in segments
+    ]